@@ -15,5 +15,7 @@ os.environ.setdefault(
     "DJANGO_SETTINGS_MODULE",
     "Planetarium_API_Service.settings"
 )
+# Keeps the middleware chain fully async, see MIDDLEWARE in settings
+os.environ.setdefault("PLANETARIUM_ASGI", "1")
 
 application = get_asgi_application()
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "debug_toolbar",
     "rest_framework",
     "drf_spectacular",
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "planetarium.metrics.ServerTimingMiddleware",
+    "planetarium.routers.ReplicaRoutingMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -56,6 +59,11 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# django-debug-toolbar's middleware is sync only, under an ASGI server it
+# would push every async view back onto a worker thread
+if os.environ.get("PLANETARIUM_ASGI"):
+    MIDDLEWARE.remove("debug_toolbar.middleware.DebugToolbarMiddleware")
+
 ROOT_URLCONF = "Planetarium_API_Service.urls"
 
 TEMPLATES = [
@@ -80,17 +88,109 @@ WSGI_APPLICATION = "Planetarium_API_Service.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.postgresql",
-        "NAME": os.environ["POSTGRES_DB"],
-        "USER": os.environ["POSTGRES_USER"],
-        "PASSWORD": os.environ["POSTGRES_PASSWORD"],
-        "HOST": os.environ["POSTGRES_HOST"],
-        "PORT": os.environ["POSTGRES_PORT"],
+# USE_SQLITE=1 runs on a local SQLite file, like for benchmarks,
+# otherwise every POSTGRES_* variable is required
+if os.environ.get("USE_SQLITE") == "1":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ["POSTGRES_DB"],
+            "USER": os.environ["POSTGRES_USER"],
+            "PASSWORD": os.environ["POSTGRES_PASSWORD"],
+            "HOST": os.environ["POSTGRES_HOST"],
+            "PORT": os.environ["POSTGRES_PORT"],
+        }
+    }
+
+# Read replicas, comma separated Postgres hosts, or SQLite files when
+# running on SQLite, a copy of db.sqlite3 works as a replica locally
+for index, replica in enumerate(
+    filter(None, os.environ.get("DATABASE_REPLICAS", "").split(","))
+):
+    key = "NAME" if "sqlite" in DATABASES["default"]["ENGINE"] else "HOST"
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        key: replica.strip(),
+        "TEST": {"MIRROR": "default"},
     }
+
+DATABASE_ROUTERS = ["planetarium.routers.ReplicaRouter"]
+
+# Safe catalog and schedule reads go to one of these, clients that wrote
+# read from the primary for PLANETARIUM_PRIMARY_PIN_SECONDS afterwards.
+# A replica lagging more than that gets no reads, the lag is measured
+# at most every PLANETARIUM_REPLICA_LAG_CHECK_INTERVAL seconds
+PLANETARIUM_READ_REPLICAS = [
+    alias for alias in DATABASES if alias != "default"
+]
+PLANETARIUM_PRIMARY_PIN_SECONDS = 5
+PLANETARIUM_REPLICA_LAG_CHECK_INTERVAL = 5
+
+# The pin lives in a cookie of the client that wrote. A cache alias here
+# also pins the user's other clients, it has to be shared by every
+# process, like Redis, the local-memory default would pin only the
+# clients that land on the process that took the write
+PLANETARIUM_PRIMARY_PIN_CACHE = None
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Versioned list responses, local memory evicts least recently used
+    "planetarium": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "planetarium",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 1000, "CULL_FREQUENCY": 10},
+    },
 }
 
+PLANETARIUM_RESPONSE_CACHE_TIMEOUT = 60
+
+# Build show and show session list pages from .values() rows instead of
+# the DRF list serializers, the output is the same
+PLANETARIUM_FAST_LIST_SERIALIZERS = False
+
+# Most show sessions one recurrence rule may create at
+# /api/planetarium/show_sessions/bulk/ or with schedule_show_sessions
+PLANETARIUM_BULK_SCHEDULE_LIMIT = 5000
+
+# Seat holds, CacheSeatHoldStore keeps them in the local cache instead
+PLANETARIUM_SEAT_HOLD_STORE = "planetarium.holds.DatabaseSeatHoldStore"
+PLANETARIUM_SEAT_HOLD_TTL = 5 * 60
+
+# Throttle counters, CacheThrottleStore keeps them in the default cache,
+# shared by every worker only when that cache is
+PLANETARIUM_THROTTLE_STORE = "planetarium.throttling.DatabaseThrottleStore"
+
+# Reservations retry deadlocks and serialization failures with
+# exponential backoff starting at PLANETARIUM_RESERVATION_BACKOFF seconds
+PLANETARIUM_RESERVATION_ATTEMPTS = 4
+PLANETARIUM_RESERVATION_BACKOFF = 0.05
+
+# Threads building resized WebP variants of uploaded show images,
+# 0 builds them inline during the upload request
+PLANETARIUM_IMAGE_WORKERS = 2
+
+# Show image uploads are streamed to disk and rejected past this size
+PLANETARIUM_MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+
+# Report db, serializer and render time of every response in a
+# Server-Timing header, the histograms at /api/planetarium/metrics/
+# are collected either way
+PLANETARIUM_SERVER_TIMING = True
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -154,16 +254,30 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "planetarium.throttling.AnonRateThrottle",
+        "planetarium.throttling.UserRateThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "100/day", "user": "1000/day"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "100/day",
+        "user": "1000/day",
+        "reservations": "30/hour",
+    },
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "planetarium.permissions.IsAdminOrIfAuthenticatedReadOnly",
-    )
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "planetarium.renderers.FastJSONRenderer",
+        "planetarium.renderers.StdlibJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "planetarium.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -179,6 +293,17 @@ SPECTACULAR_SETTINGS = {
     },
 }
 
+# JWT users are cached per process, by id and a version every save of
+# the user bumps. With a per-process default cache another process's
+# change is seen after the TTL at the latest
+PLANETARIUM_AUTH_USER_CACHE_SIZE = 10_000
+PLANETARIUM_AUTH_USER_CACHE_TTL = 60
+
+# Safe requests to the catalog and schedule get a user built from the
+# token claims, without loading the user at all. A deactivated user
+# keeps reading until the token expires
+PLANETARIUM_JWT_CLAIMS_ONLY_READS = False
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
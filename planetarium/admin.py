@@ -6,7 +6,8 @@ from planetarium.models import (
     AstronomyShow,
     ShowSession,
     Reservation,
-    Ticket
+    Ticket,
+    SeatHold,
 )
 
 admin.site.register(PlanetariumDome)
@@ -15,3 +16,4 @@ admin.site.register(AstronomyShow)
 admin.site.register(ShowSession)
 admin.site.register(Reservation)
 admin.site.register(Ticket)
+admin.site.register(SeatHold)
@@ -0,0 +1,206 @@
+from abc import ABC, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    NotAuthenticated,
+    NotFound,
+    PermissionDenied,
+)
+from rest_framework.request import Request
+
+from planetarium.cache import (
+    CachedListMixin,
+    get_cache,
+    response_cache_stats,
+)
+from planetarium.metrics import timed
+from planetarium.renderers import FastJSONRenderer
+from planetarium.views import (
+    AstronomyShowViewSet,
+    PlanetariumDomeViewSet,
+    ShowSessionViewSet,
+    ShowThemeViewSet,
+)
+from user.authentication import AsyncJWTAuthentication
+
+
+class AsyncReadView(View, ABC):
+    """Async GET endpoint answering like an action of viewset_class
+
+    Querysets, filters, permissions, throttles, pagination and
+    serializers all come from the viewset, so the payloads match the
+    sync endpoints. The user is authenticated with JWT, users missing
+    from the user cache are loaded with the async ORM. Cursor
+    pagination, the search backends and throttles have no async API,
+    they go through sync_to_async, the way the async ORM runs its own
+    queries. Responses are always JSON, conditional GETs are not
+    answered with 304.
+    """
+
+    http_method_names = ["get", "head"]
+    viewset_class = None
+    action = None
+
+    async def get(self, request, *args, **kwargs):
+        self.response_headers = {}
+        drf_request = Request(request)
+        view = self.viewset_class(
+            request=drf_request,
+            args=args,
+            kwargs=kwargs,
+            action=self.action,
+            format_kwarg=None,
+            headers={},
+        )
+        drf_request.parser_context = view.get_parser_context(request)
+        try:
+            await self.initial(drf_request, view)
+            data = await self.get_data(view)
+        except ObjectDoesNotExist:
+            return self.handle_exception(request, NotFound())
+        except APIException as exc:
+            return self.handle_exception(request, exc)
+        return self.render(data, headers=self.response_headers)
+
+    async def initial(self, request, view):
+        authenticated = await AsyncJWTAuthentication().aauthenticate(request)
+        request.user = (
+            authenticated[0] if authenticated is not None else AnonymousUser()
+        )
+        for permission in view.get_permissions():
+            if not permission.has_permission(request, view):
+                if not request.user.is_authenticated:
+                    raise NotAuthenticated()
+                raise PermissionDenied(getattr(permission, "message", None))
+        await sync_to_async(view.check_throttles)(request)
+
+    @abstractmethod
+    async def get_data(self, view):
+        """Payload of the action, raise APIException to answer an error"""
+
+    def handle_exception(self, request, exc):
+        headers = {}
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            headers["WWW-Authenticate"] = (
+                AsyncJWTAuthentication().authenticate_header(request)
+            )
+        if getattr(exc, "wait", None):
+            headers["Retry-After"] = "%d" % exc.wait
+        data = exc.detail
+        if not isinstance(data, (list, dict)):
+            data = {"detail": data}
+        return self.render(data, status=exc.status_code, headers=headers)
+
+    @staticmethod
+    def render(data, status=200, headers=None):
+        with timed("render"):
+            content = FastJSONRenderer().render(data)
+        return HttpResponse(
+            content,
+            status=status,
+            headers=headers,
+            content_type="application/json",
+        )
+
+
+class AsyncListView(AsyncReadView):
+    """List action, served from the viewset's response cache if it has one
+
+    The cache lives in process memory, it is read without a thread
+    switch. Keys get their own prefix because the pagination links
+    point at the async endpoint.
+    """
+
+    action = "list"
+
+    async def get_data(self, view):
+        if not isinstance(view, CachedListMixin):
+            return await self.build(view)
+
+        cache = get_cache()
+        key = view.get_cache_key("async-list")
+        data = cache.get(key)
+        if data is not None:
+            response_cache_stats.hit()
+            self.response_headers["X-Cache"] = "HIT"
+            return data
+
+        response_cache_stats.miss()
+        data = await self.build(view)
+        cache.set(key, data, view.get_response_cache_timeout())
+        self.response_headers["X-Cache"] = "MISS"
+        return data
+
+    async def build(self, view):
+        if view.paginator is None:
+            queryset = view.filter_queryset(view.get_queryset())
+            objects = [obj async for obj in queryset]
+            return view.get_serializer(objects, many=True).data
+
+        page = await sync_to_async(self.paginate)(view)
+        data = view.get_serializer(page, many=True).data
+        return view.get_paginated_response(data).data
+
+    @staticmethod
+    def paginate(view):
+        return view.paginate_queryset(
+            view.filter_queryset(view.get_queryset())
+        )
+
+
+class AsyncDetailView(AsyncReadView):
+    action = "retrieve"
+
+    async def get_data(self, view):
+        obj = await sync_to_async(self.get_object)(view)
+        await self.load_related(obj)
+        return view.get_serializer(obj).data
+
+    @staticmethod
+    def get_object(view):
+        # Filters like search may query the database to build the queryset
+        queryset = view.filter_queryset(view.get_queryset())
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        obj = queryset.get(
+            **{view.lookup_field: view.kwargs[lookup_url_kwarg]}
+        )
+        view.check_object_permissions(view.request, obj)
+        return obj
+
+    async def load_related(self, obj):
+        """Load what the serializer would otherwise query lazily"""
+
+
+class ShowThemeListView(AsyncListView):
+    viewset_class = ShowThemeViewSet
+
+
+class PlanetariumDomeListView(AsyncListView):
+    viewset_class = PlanetariumDomeViewSet
+
+
+class AstronomyShowListView(AsyncListView):
+    viewset_class = AstronomyShowViewSet
+
+
+class AstronomyShowDetailView(AsyncDetailView):
+    viewset_class = AstronomyShowViewSet
+
+
+class ShowSessionListView(AsyncListView):
+    viewset_class = ShowSessionViewSet
+
+
+class ShowSessionDetailView(AsyncDetailView):
+    viewset_class = ShowSessionViewSet
+
+    async def load_related(self, show_session):
+        show_session.taken_places = [
+            place async for place in show_session.tickets.values("row", "seat")
+        ]
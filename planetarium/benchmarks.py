@@ -0,0 +1,48 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+class Rollback(Exception):
+    """Raised to discard the data seeded for a benchmark run"""
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back"""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def summarize(timings):
+    """Latency percentiles in milliseconds"""
+    timings = sorted(timings)
+    last = len(timings) - 1
+    return {
+        "runs": len(timings),
+        "min_ms": round(timings[0] * 1000, 3),
+        "p50_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(timings[round(last * 0.95)] * 1000, 3),
+        "max_ms": round(timings[-1] * 1000, 3),
+    }
+
+
+def measure(func, repeat=5, setup=None):
+    """Call func repeat times and summarize its wall-clock latency
+
+    setup, when given, runs untimed before every call.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
@@ -0,0 +1,161 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+from planetarium.routers import get_pin_seconds, read_from_replica
+
+CACHE_ALIAS = "planetarium"
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(model):
+    return f"version:{model._meta.label_lower}"
+
+
+def get_counters(cache, *keys):
+    """Current value of every version counter in keys"""
+    values = cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    for key in missing:
+        # Seed from the clock so an evicted counter never comes back
+        # with a value that older cache entries were stored under
+        cache.add(key, time.time_ns(), timeout=None)
+    if missing:
+        values.update(cache.get_many(missing))
+    return tuple(values.get(key, 0) for key in keys)
+
+
+def bump_counter(cache, key):
+    """Move a version counter past every value it had"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def get_versions(*models):
+    """Current data version of every given model"""
+    return get_counters(
+        get_cache(), *(_version_key(model) for model in models)
+    )
+
+
+def bump_version(*models):
+    """Invalidate every cached response built from the given models"""
+    cache = get_cache()
+    for model in models:
+        bump_counter(cache, _version_key(model))
+
+
+class CacheStats:
+    """Process-wide hit/miss counters of the response cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def as_dict(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+response_cache_stats = CacheStats()
+
+
+class CachedListMixin:
+    """Serve list responses from a cache versioned by the source models
+
+    cache_models lists every model the response is built from, a write
+    to any of them changes the key. cache_query_params are the only
+    query parameters that take part in the key, cache_list_params are
+    comma separated ones whose order does not matter.
+    """
+
+    cache_models = ()
+    cache_query_params = ()
+    cache_list_params = ()
+    cache_timeout = None
+
+    def get_cache_timeout(self):
+        if self.cache_timeout is not None:
+            return self.cache_timeout
+        return getattr(settings, "PLANETARIUM_RESPONSE_CACHE_TIMEOUT", 60)
+
+    def get_response_cache_timeout(self):
+        timeout = self.get_cache_timeout()
+        if read_from_replica():
+            # The replica may lag behind the version in the key, keep
+            # what it returned no longer than a client stays pinned
+            timeout = min(timeout, get_pin_seconds())
+        return timeout
+
+    def normalize_query_params(self):
+        params = []
+        for name in self.cache_query_params:
+            value = self.request.query_params.get(name, "").strip()
+            if not value:
+                continue
+            if name in self.cache_list_params:
+                value = ",".join(
+                    sorted({item.strip() for item in value.split(",")})
+                )
+            params.append(f"{name}={value}")
+        return "&".join(params)
+
+    def get_cache_key(self, prefix="list"):
+        raw = "|".join(
+            (
+                self.__class__.__name__,
+                self.request.build_absolute_uri("/"),
+                ",".join(str(v) for v in get_versions(*self.cache_models)),
+                self.normalize_query_params(),
+            )
+        )
+        return f"{prefix}:" + hashlib.md5(
+            raw.encode(), usedforsecurity=False
+        ).hexdigest()
+
+    def cached_response(self, prefix, build_response):
+        """Return a cached copy of build_response() for this request"""
+        cache = get_cache()
+        key = self.get_cache_key(prefix)
+        data = cache.get(key)
+        if data is not None:
+            response_cache_stats.hit()
+            return Response(data, headers={"X-Cache": "HIT"})
+
+        response_cache_stats.miss()
+        response = build_response()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, self.get_response_cache_timeout())
+        response["X-Cache"] = "MISS"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            "list", lambda: super(CachedListMixin, self).list(
+                request, *args, **kwargs
+            )
+        )
@@ -0,0 +1,94 @@
+import hashlib
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+
+from planetarium.models import ModelChange
+
+
+def record_change(*models):
+    """Move the validators of every view built from the given models
+
+    Call it in the transaction of the write, signals do for saves and
+    deletes. update() and bulk_create() callers do it themselves.
+    """
+    now = timezone.now()
+    for model in models:
+        changes = ModelChange.objects.filter(label=model._meta.label_lower)
+        if changes.update(version=F("version") + 1, changed_at=now):
+            continue
+        _, created = ModelChange.objects.get_or_create(
+            label=model._meta.label_lower,
+            defaults={"version": 1, "changed_at": now},
+        )
+        if not created:
+            changes.update(version=F("version") + 1, changed_at=now)
+
+
+class ConditionalGetMixin:
+    """Answer conditional list GETs with 304 Not Modified
+
+    Validators come from the ModelChange rows of conditional_models, one
+    query before the view queries or serializes anything. Deletes move
+    both the ETag and Last-Modified. Other read actions can use
+    conditional_response too.
+    """
+
+    conditional_models = ()
+
+    def get_validators(self):
+        parts = [
+            self.__class__.__name__,
+            self.action,
+            str(sorted(self.kwargs.items())),
+            self.request.accepted_media_type or "",
+            "&".join(sorted(self.request.GET.urlencode().split("&"))),
+        ]
+        labels = [model._meta.label_lower for model in self.conditional_models]
+        changes = {
+            label: (version, changed_at)
+            for label, version, changed_at in ModelChange.objects.filter(
+                label__in=labels
+            ).values_list("label", "version", "changed_at")
+        }
+        last_modified = None
+        for label in labels:
+            version, changed_at = changes.get(label, (0, None))
+            parts.append(f"{label}:{version}")
+            if changed_at and (
+                last_modified is None or changed_at > last_modified
+            ):
+                last_modified = changed_at
+        digest = hashlib.md5(
+            "|".join(parts).encode(), usedforsecurity=False
+        ).hexdigest()
+        return f'"{digest}"', last_modified
+
+    def conditional_response(self, build_response):
+        etag, last_modified = self.get_validators()
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        timestamp = None
+        if last_modified is not None:
+            timestamp = int(last_modified.timestamp())
+            headers["Last-Modified"] = http_date(timestamp)
+
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = build_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            lambda: super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs
+            )
+        )
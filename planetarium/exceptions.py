@@ -0,0 +1,54 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.fields import DateTimeField
+
+
+class SeatConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Some of the requested seats are no longer available."
+    default_code = "seat_conflict"
+
+    def __init__(self, seats, detail=None):
+        """seats is an iterable of (show_session_id, row, seat)"""
+        super().__init__(detail)
+        # Kept as plain values so seat numbers are rendered as integers
+        self.detail = {
+            "detail": self.detail,
+            "seats": [
+                {"show_session": show_session, "row": row, "seat": seat}
+                for show_session, row, seat in sorted(seats)
+            ],
+        }
+
+
+class ScheduleConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The dome already has show sessions at some of the times."
+    default_code = "schedule_conflict"
+
+    def __init__(self, show_times, detail=None):
+        super().__init__(detail)
+        field = DateTimeField()
+        self.detail = {
+            "detail": self.detail,
+            "show_times": [
+                field.to_representation(show_time)
+                for show_time in sorted(show_times)
+            ],
+        }
+
+
+class ReservationUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many concurrent reservations, please try again."
+    default_code = "reservation_unavailable"
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_code = "upload_too_large"
+
+    def __init__(self, max_size):
+        super().__init__(
+            f"Uploaded file must not be larger than {max_size} bytes."
+        )
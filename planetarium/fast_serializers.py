@@ -0,0 +1,195 @@
+from operator import itemgetter
+
+from django.conf import settings
+from rest_framework.response import Response
+
+from planetarium.metrics import timed_serializer
+from planetarium.models import AstronomyShow, ShowSession
+
+
+def _lookup(source):
+    return source.replace(".", "__")
+
+
+def _model_field(model, source):
+    """Model field a dotted source ends at, following relations"""
+    *relations, name = source.split(".")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+class ValueField:
+    """Column copied as is, dotted sources follow relations"""
+
+    def __init__(self, source):
+        self.source = source
+
+    def lookups(self):
+        return [_lookup(self.source)]
+
+    def compile(self, model, context):
+        return itemgetter(_lookup(self.source))
+
+
+class ProductField:
+    """Product of two integer columns, like PlanetariumDome.capacity"""
+
+    def __init__(self, left, right):
+        self.sources = (left, right)
+
+    def lookups(self):
+        return [_lookup(source) for source in self.sources]
+
+    def compile(self, model, context):
+        left, right = self.lookups()
+        return lambda row: row[left] * row[right]
+
+
+class ImageURLField:
+    """URL of the first non-empty image column, absolute with a request
+
+    Mirrors ImageVariantField: sources are tried in order, so a variant
+    can fall back to the original upload.
+    """
+
+    def __init__(self, *sources):
+        self.sources = sources
+
+    def lookups(self):
+        return [_lookup(source) for source in self.sources]
+
+    def compile(self, model, context):
+        candidates = [
+            (_lookup(source), _model_field(model, source).storage)
+            for source in self.sources
+        ]
+        request = context.get("request")
+
+        def get_url(row):
+            for key, storage in candidates:
+                name = row[key]
+                if name:
+                    url = storage.url(name)
+                    if request is not None:
+                        return request.build_absolute_uri(url)
+                    return url
+            return None
+
+        return get_url
+
+
+class FastListSerializer:
+    """Read-only rows built from .values() with a precompiled mapping
+
+    fields maps output names, in output order, to ValueField-like specs.
+    Output matches the equivalent ModelSerializer for the same rows.
+    """
+
+    model = None
+    fields = {}
+
+    def __init__(self, context=None):
+        context = context or {}
+        self.getters = [
+            (name, spec.compile(self.model, context))
+            for name, spec in self.fields.items()
+        ]
+
+    @classmethod
+    def lookups(cls):
+        lookups = []
+        for spec in cls.fields.values():
+            for lookup in spec.lookups():
+                if lookup not in lookups:
+                    lookups.append(lookup)
+        return lookups
+
+    @classmethod
+    def values(cls, queryset, *extra):
+        """queryset narrowed to the needed columns plus extra ones"""
+        lookups = cls.lookups()
+        return queryset.values(
+            *lookups, *(name for name in extra if name not in lookups)
+        )
+
+    def to_representation(self, rows):
+        getters = self.getters
+        return [
+            {name: getter(row) for name, getter in getters} for row in rows
+        ]
+
+
+class AstronomyShowFastListSerializer(FastListSerializer):
+    """Fast AstronomyShowListSerializer
+
+    show_themes is left out as the serializer skips it, AstronomyShow
+    has no such attribute.
+    """
+
+    model = AstronomyShow
+    fields = {
+        "id": ValueField("id"),
+        "title": ValueField("title"),
+        "image": ImageURLField("image_small", "image"),
+    }
+
+
+class ShowSessionFastListSerializer(FastListSerializer):
+    """Fast ShowSessionListSerializer"""
+
+    model = ShowSession
+    fields = {
+        "id": ValueField("id"),
+        "astronomy_show_title": ValueField("astronomy_show.title"),
+        "astronomy_show_image": ImageURLField(
+            "astronomy_show.image_small", "astronomy_show.image"
+        ),
+        "planetarium_dome_name": ValueField("planetarium_dome.name"),
+        "planetarium_dome_capacity": ProductField(
+            "planetarium_dome.rows", "planetarium_dome.seats_in_row"
+        ),
+        "tickets_available": ValueField("tickets_available"),
+    }
+
+
+class FastListMixin:
+    """Serve list with fast_list_serializer_class when it is enabled
+
+    Opt in with PLANETARIUM_FAST_LIST_SERIALIZERS, otherwise the
+    regular serializer is used.
+    """
+
+    fast_list_serializer_class = None
+
+    def get_fast_list_serializer_class(self):
+        if not getattr(settings, "PLANETARIUM_FAST_LIST_SERIALIZERS", False):
+            return None
+        return self.fast_list_serializer_class
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_fast_list_serializer_class()
+        if serializer_class is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = timed_serializer(
+            serializer_class(context=self.get_serializer_context())
+        )
+        ordering = ()
+        if self.paginator is not None:
+            # Cursor pagination reads its position from the row dicts
+            ordering = [
+                name.lstrip("-")
+                for name in self.paginator.get_ordering(
+                    request, queryset, self
+                )
+            ]
+        rows = serializer_class.values(queryset, *ordering)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page)
+            )
+        return Response(serializer.to_representation(rows))
@@ -0,0 +1,290 @@
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from planetarium.models import SeatHold, Ticket
+
+
+class SeatsUnavailable(Exception):
+    """Raised when some of the requested seats are sold or held"""
+
+    def __init__(self, seats):
+        super().__init__("Some of the requested seats are unavailable.")
+        self.seats = sorted(seats)
+
+
+@dataclass
+class Hold:
+    token: uuid.UUID
+    show_session_id: int
+    user_id: int
+    expires_at: datetime
+    seats: list = field(default_factory=list)
+
+
+def get_hold_ttl():
+    return timedelta(
+        seconds=getattr(settings, "PLANETARIUM_SEAT_HOLD_TTL", 300)
+    )
+
+
+def taken_seats(places):
+    """Subset of (show_session_id, row, seat) that already have a ticket"""
+    if not places:
+        return set()
+    seats_filter = Q()
+    for show_session_id, row, seat in places:
+        seats_filter |= Q(show_session_id=show_session_id, row=row, seat=seat)
+    return set(
+        Ticket.objects.filter(seats_filter)
+        .order_by()
+        .values_list("show_session_id", "row", "seat")
+    )
+
+
+class BaseSeatHoldStore(ABC):
+    @abstractmethod
+    def place(self, show_session_id, seats, user_id):
+        """Hold all seats or none, raise SeatsUnavailable on conflict"""
+
+    @abstractmethod
+    def get(self, token, user_id):
+        """Active hold with the given token owned by user, or None"""
+
+    @abstractmethod
+    def release(self, token):
+        """Drop the hold, unknown tokens are ignored"""
+
+    @abstractmethod
+    def held_seats(self, show_session_id, exclude_user_id=None):
+        """Set of (row, seat) pairs under an active hold"""
+
+    @abstractmethod
+    def reap_expired(self):
+        """Drop expired holds, return how many seats were freed"""
+
+
+class DatabaseSeatHoldStore(BaseSeatHoldStore):
+    """Holds kept in the SeatHold table, shared by every process"""
+
+    def place(self, show_session_id, seats, user_id):
+        now = timezone.now()
+        hold = Hold(
+            token=uuid.uuid4(),
+            show_session_id=show_session_id,
+            user_id=user_id,
+            expires_at=now + get_hold_ttl(),
+            seats=list(seats),
+        )
+        SeatHold.objects.filter(
+            show_session_id=show_session_id, expires_at__lte=now
+        ).delete()
+
+        conflicts = self._conflicts(show_session_id, hold.seats)
+        if conflicts:
+            raise SeatsUnavailable(conflicts)
+        try:
+            with transaction.atomic():
+                SeatHold.objects.bulk_create(
+                    SeatHold(
+                        token=hold.token,
+                        show_session_id=show_session_id,
+                        user_id=user_id,
+                        row=row,
+                        seat=seat,
+                        expires_at=hold.expires_at,
+                    )
+                    for row, seat in hold.seats
+                )
+        except IntegrityError:
+            raise SeatsUnavailable(
+                self._conflicts(show_session_id, hold.seats)
+            )
+        return hold
+
+    def _conflicts(self, show_session_id, seats):
+        seats = set(seats)
+        sold = {
+            (row, seat)
+            for _, row, seat in taken_seats(
+                [(show_session_id, row, seat) for row, seat in seats]
+            )
+        }
+        return (self.held_seats(show_session_id) & seats) | sold
+
+    def get(self, token, user_id):
+        rows = list(
+            SeatHold.objects.filter(
+                token=token, user_id=user_id, expires_at__gt=timezone.now()
+            ).values_list("show_session_id", "row", "seat", "expires_at")
+        )
+        if not rows:
+            return None
+        return Hold(
+            token=token,
+            show_session_id=rows[0][0],
+            user_id=user_id,
+            expires_at=rows[0][3],
+            seats=[(row, seat) for _, row, seat, _ in rows],
+        )
+
+    def release(self, token):
+        SeatHold.objects.filter(token=token).delete()
+
+    def held_seats(self, show_session_id, exclude_user_id=None):
+        queryset = SeatHold.objects.filter(
+            show_session_id=show_session_id, expires_at__gt=timezone.now()
+        )
+        if exclude_user_id is not None:
+            queryset = queryset.exclude(user_id=exclude_user_id)
+        return set(queryset.order_by().values_list("row", "seat"))
+
+    def reap_expired(self):
+        deleted, _ = SeatHold.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+        return deleted
+
+
+class CacheSeatHoldStore(BaseSeatHoldStore):
+    """Holds kept in a Django cache, expiry is left to the cache TTL
+
+    With the default local-memory cache holds are only visible to the
+    process that placed them, use it for a single worker deployment.
+    """
+
+    def __init__(self, alias="default"):
+        self.cache = caches[alias]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _seat_key(show_session_id, row, seat):
+        return f"seat-hold:{show_session_id}:{row}:{seat}"
+
+    @staticmethod
+    def _token_key(token):
+        return f"seat-hold:{token}"
+
+    @staticmethod
+    def _index_key(show_session_id):
+        return f"seat-hold-index:{show_session_id}"
+
+    def place(self, show_session_id, seats, user_id):
+        ttl = get_hold_ttl()
+        hold = Hold(
+            token=uuid.uuid4(),
+            show_session_id=show_session_id,
+            user_id=user_id,
+            expires_at=timezone.now() + ttl,
+            seats=list(seats),
+        )
+        timeout = ttl.total_seconds()
+
+        sold = {
+            (row, seat)
+            for _, row, seat in taken_seats(
+                [(show_session_id, row, seat) for row, seat in hold.seats]
+            )
+        }
+        if sold:
+            raise SeatsUnavailable(sold)
+
+        with self._lock:
+            taken = []
+            placed = []
+            for row, seat in hold.seats:
+                key = self._seat_key(show_session_id, row, seat)
+                if self.cache.add(key, (str(hold.token), user_id), timeout):
+                    placed.append(key)
+                else:
+                    taken.append((row, seat))
+            if taken:
+                self.cache.delete_many(placed)
+                raise SeatsUnavailable(taken)
+
+            index_key = self._index_key(show_session_id)
+            index = self._active(self.cache.get(index_key, {}))
+            expires = hold.expires_at.timestamp()
+            for row, seat in hold.seats:
+                index[(row, seat)] = (user_id, expires)
+            self.cache.set(index_key, index, timeout)
+            self.cache.set(self._token_key(hold.token), hold, timeout)
+        return hold
+
+    @staticmethod
+    def _active(index):
+        now = timezone.now().timestamp()
+        return {
+            place: (user_id, expires)
+            for place, (user_id, expires) in index.items()
+            if expires > now
+        }
+
+    def get(self, token, user_id):
+        hold = self.cache.get(self._token_key(token))
+        if hold is None or hold.user_id != user_id:
+            return None
+        if hold.expires_at <= timezone.now():
+            return None
+        return hold
+
+    def release(self, token):
+        with self._lock:
+            hold = self.cache.get(self._token_key(token))
+            if hold is None:
+                return
+            self.cache.delete_many(
+                [self._token_key(token)]
+                + [
+                    self._seat_key(hold.show_session_id, row, seat)
+                    for row, seat in hold.seats
+                ]
+            )
+            index_key = self._index_key(hold.show_session_id)
+            index = self.cache.get(index_key, {})
+            for place in hold.seats:
+                index.pop(tuple(place), None)
+            self.cache.set(index_key, index, get_hold_ttl().total_seconds())
+
+    def held_seats(self, show_session_id, exclude_user_id=None):
+        index = self._active(
+            self.cache.get(self._index_key(show_session_id), {})
+        )
+        return {
+            place
+            for place, (user_id, _) in index.items()
+            if user_id != exclude_user_id
+        }
+
+    def reap_expired(self):
+        # Entries expire on their own, only the per-session indexes
+        # may keep stale seats until they are rewritten
+        return 0
+
+
+@lru_cache(maxsize=None)
+def get_hold_store():
+    path = getattr(
+        settings,
+        "PLANETARIUM_SEAT_HOLD_STORE",
+        "planetarium.holds.DatabaseSeatHoldStore",
+    )
+    return import_string(path)()
+
+
+@receiver(setting_changed)
+def reset_hold_store(setting, **kwargs):
+    if setting == "PLANETARIUM_SEAT_HOLD_STORE":
+        get_hold_store.cache_clear()
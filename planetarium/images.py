@@ -0,0 +1,152 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from planetarium.cache import bump_version
+from planetarium.conditional import record_change
+from planetarium.models import AstronomyShow
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> bounding box the image is shrunk to fit into
+VARIANTS = {
+    "small": (320, 320),
+    "large": (1280, 1280),
+}
+
+WEBP_QUALITY = 80
+
+
+def render_variant(image, size):
+    """Shrink image to fit size and encode it as WebP"""
+    variant = image.copy()
+    variant.thumbnail(size, Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    variant.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def render_variants(file):
+    """WebP bytes of every variant of an uploaded image file"""
+    with Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            mode = "RGBA" if "A" in image.getbands() else "RGB"
+            image = image.convert(mode)
+        return {
+            name: render_variant(image, size)
+            for name, size in VARIANTS.items()
+        }
+
+
+def delete_files(names):
+    storage = AstronomyShow._meta.get_field("image_small").storage
+    for name in names:
+        if name:
+            storage.delete(name)
+
+
+def process_show_image(astronomy_show_id, image_name):
+    """Build the variants of one uploaded image and store them
+
+    Does nothing when the show got another image meanwhile, so a slow
+    job can never overwrite the variants of a newer upload.
+    """
+    astronomy_show = AstronomyShow.objects.filter(
+        pk=astronomy_show_id, image=image_name
+    ).first()
+    if astronomy_show is None:
+        return
+
+    current = AstronomyShow.objects.filter(
+        pk=astronomy_show_id, image=image_name
+    )
+    try:
+        with astronomy_show.image.open("rb") as file:
+            variants = render_variants(file)
+    except Exception:
+        logger.exception("Could not process image %s", image_name)
+        current.update(
+            image_status=AstronomyShow.ImageStatus.FAILED,
+            updated_at=timezone.now(),
+        )
+        record_change(AstronomyShow)
+        bump_version(AstronomyShow)
+        return
+
+    stem, _ = os.path.splitext(os.path.basename(image_name))
+    fields = {
+        "image_status": AstronomyShow.ImageStatus.READY,
+        "updated_at": timezone.now(),
+    }
+    for name, content in variants.items():
+        field = AstronomyShow._meta.get_field(f"image_{name}")
+        fields[field.name] = field.storage.save(
+            field.generate_filename(astronomy_show, f"{stem}-{name}.webp"),
+            ContentFile(content),
+        )
+
+    variant_fields = [f"image_{name}" for name in variants]
+    if current.update(**fields):
+        delete_files(
+            getattr(astronomy_show, field).name for field in variant_fields
+        )
+    else:
+        # Another image was uploaded while this one was processed
+        delete_files(fields[field] for field in variant_fields)
+    record_change(AstronomyShow)
+    bump_version(AstronomyShow)
+
+
+def run_image_job(astronomy_show_id, image_name):
+    try:
+        process_show_image(astronomy_show_id, image_name)
+    finally:
+        close_old_connections()
+
+
+@lru_cache(maxsize=None)
+def get_image_executor():
+    workers = getattr(settings, "PLANETARIUM_IMAGE_WORKERS", 2)
+    if not workers:
+        return None
+    return ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="planetarium-images"
+    )
+
+
+@receiver(setting_changed)
+def reset_image_executor(setting, **kwargs):
+    if setting == "PLANETARIUM_IMAGE_WORKERS":
+        get_image_executor.cache_clear()
+
+
+def schedule_image_processing(astronomy_show, stale=()):
+    """Queue variant generation once the uploaded image is committed
+
+    stale names the variant files of the replaced image. With
+    PLANETARIUM_IMAGE_WORKERS = 0 the variants are built inline.
+    """
+    astronomy_show_id = astronomy_show.pk
+    image_name = astronomy_show.image.name
+    stale = list(stale)
+
+    def submit():
+        delete_files(stale)
+        executor = get_image_executor()
+        if executor is None:
+            process_show_image(astronomy_show_id, image_name)
+        else:
+            executor.submit(run_image_job, astronomy_show_id, image_name)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,204 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from rest_framework.reverse import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from planetarium.benchmarks import summarize
+from planetarium.cache import get_cache
+from planetarium.models import AstronomyShow, ShowSession
+from planetarium.throttling import get_throttle_store
+from user.models import User
+
+DEBUG_TOOLBAR = "debug_toolbar.middleware.DebugToolbarMiddleware"
+
+ENDPOINTS = {
+    "show_sessions": ("showsession-list", None),
+    "show_session_detail": ("showsession-detail", ShowSession),
+    "astronomy_shows": ("astronomyshow-list", None),
+    "astronomy_show_detail": ("astronomyshow-detail", AstronomyShow),
+    "show_themes": ("showtheme-list", None),
+    "planetarium_domes": ("planetariumdome-list", None),
+}
+
+
+class Command(BaseCommand):
+    """Compare the WSGI and the async ASGI read path under concurrency
+
+    The WSGI path serves the regular viewsets with one thread per
+    in-flight request, the ASGI path serves the async views from one
+    event loop. Both go through the full middleware chain in process,
+    without the sync only debug toolbar. Memory is what tracemalloc
+    sees at the peak, the stack every WSGI thread reserves comes on top.
+    Run it against a database populated with seed_planetarium, every
+    thread opens its own connection, so the data has to be committed.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--endpoint", choices=ENDPOINTS, default="show_sessions"
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            nargs="+",
+            default=[1, 10, 50],
+            help="In-flight requests, one run per value",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=300,
+            help="Requests per run, stay below the user throttle rate",
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_active=True).order_by("id").first()
+        if user is None or not ShowSession.objects.exists():
+            raise CommandError(
+                "No data to serve, populate the database with "
+                "seed_planetarium first"
+            )
+        name, model = ENDPOINTS[options["endpoint"]]
+        url_args = ()
+        if model is not None:
+            url_args = (model.objects.order_by("id").first().id,)
+        paths = {
+            "wsgi": reverse(f"planetarium:{name}", args=url_args),
+            "asgi": reverse(f"planetarium:async-{name}", args=url_args),
+        }
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+        connections.close_all()
+
+        with override_settings(
+            DEBUG=False,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            MIDDLEWARE=[
+                path for path in settings.MIDDLEWARE if path != DEBUG_TOOLBAR
+            ],
+        ):
+            for concurrency in options["concurrency"]:
+                for label, run in (
+                    ("wsgi", self.run_threads),
+                    ("asgi", self.run_event_loop),
+                ):
+                    self.report(
+                        label,
+                        concurrency,
+                        self.measure(
+                            run,
+                            paths[label],
+                            headers,
+                            concurrency,
+                            options["requests"],
+                        ),
+                    )
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished"))
+
+    @staticmethod
+    def reset_caches():
+        # Cold response cache, and no throttle counts from earlier runs
+        get_cache().clear()
+        caches["default"].clear()
+        get_throttle_store().clear()
+
+    def measure(self, run, path, headers, concurrency, requests):
+        self.reset_caches()
+        started = time.perf_counter()
+        timings, statuses = run(path, headers, concurrency, requests)
+        elapsed = time.perf_counter() - started
+
+        # A shorter traced run, tracemalloc slows everything down
+        self.reset_caches()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        run(path, headers, concurrency, concurrency * 2)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            "requests_per_sec": round(requests / elapsed),
+            "kib_per_in_flight": round(
+                (peak - baseline) / concurrency / 1024, 1
+            ),
+            "statuses": dict(statuses),
+            **summarize(timings),
+        }
+
+    def report(self, label, concurrency, stats):
+        self.stdout.write(
+            f"{label} x{concurrency}: {stats['requests_per_sec']} req/s, "
+            f"p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, "
+            f"{stats['kib_per_in_flight']} KiB per in-flight request, "
+            f"statuses {stats['statuses']}"
+        )
+
+    @staticmethod
+    def run_threads(path, headers, concurrency, requests):
+        timings = []
+        statuses = Counter()
+        lock = threading.Lock()
+
+        def worker(count):
+            client = Client(headers=headers)
+            try:
+                for _ in range(count):
+                    start = time.perf_counter()
+                    response = client.get(path)
+                    duration = time.perf_counter() - start
+                    with lock:
+                        timings.append(duration)
+                        statuses[response.status_code] += 1
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=worker, args=(count,))
+            for count in split(requests, concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, statuses
+
+    @staticmethod
+    def run_event_loop(path, headers, concurrency, requests):
+        timings = []
+        statuses = Counter()
+
+        async def worker(client, count):
+            for _ in range(count):
+                start = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                timings.append(time.perf_counter() - start)
+                statuses[response.status_code] += 1
+
+        async def main():
+            client = AsyncClient()
+            await asyncio.gather(
+                *(
+                    worker(client, count)
+                    for count in split(requests, concurrency)
+                )
+            )
+
+        asyncio.run(main())
+        connections.close_all()
+        return timings, statuses
+
+
+def split(total, parts):
+    """total as parts near-equal counts"""
+    share, extra = divmod(total, parts)
+    return [share + (index < extra) for index in range(parts)]
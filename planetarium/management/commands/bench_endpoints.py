@@ -0,0 +1,252 @@
+import json
+import platform
+import subprocess
+from datetime import timedelta
+from itertools import count
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from planetarium.benchmarks import measure, rolled_back
+from planetarium.cache import get_cache
+from planetarium.models import ShowSession
+from planetarium.seeding import TIERS, Seeder
+from planetarium.throttling import get_throttle_store
+from user.models import User
+
+REGRESSION_RATIO = 1.2
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            cwd=settings.BASE_DIR,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """Benchmark the API endpoints on a seeded scale tier
+
+    Data is seeded inside a transaction that is rolled back afterwards.
+    Every request goes through the test client with cold caches, the
+    latency percentiles and query counts are written to a JSON file.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tier", choices=TIERS, default="small")
+        for size in TIERS["small"]:
+            parser.add_argument(
+                f"--{size}", type=int, help=f"Override the tier's {size}"
+            )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--output", help="Result file, benchmarks/ by default"
+        )
+        parser.add_argument(
+            "--compare", help="Earlier result file to compare against"
+        )
+
+    def handle(self, *args, **options):
+        sizes = dict(TIERS[options["tier"]])
+        for size in sizes:
+            if options[size] is not None:
+                sizes[size] = options[size]
+
+        seeder = Seeder(
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            log=self.stdout.write,
+        )
+        with rolled_back():
+            sizes = seeder.seed(**sizes)
+            endpoints = self.run(options["repeat"])
+
+        commit = current_commit()
+        result = {
+            "tier": options["tier"],
+            "sizes": sizes,
+            "repeat": options["repeat"],
+            "seed": options["seed"],
+            "vendor": connection.vendor,
+            "commit": commit,
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "endpoints": endpoints,
+        }
+
+        output = Path(
+            options["output"]
+            or Path(settings.BASE_DIR) / "benchmarks" / (
+                f"endpoints-{options['tier']}-{commit or 'local'}.json"
+            )
+        )
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(result, indent=2) + "\n")
+
+        if options["compare"]:
+            self.compare(
+                json.loads(Path(options["compare"]).read_text()), endpoints
+            )
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    def client(self):
+        host = next(
+            (
+                host.lstrip(".")
+                for host in settings.ALLOWED_HOSTS
+                if host != "*"
+            ),
+            "localhost",
+        )
+        client = APIClient(HTTP_HOST=host)
+        user = (
+            User.objects.filter(reservation__isnull=False)
+            .order_by("id")
+            .first()
+        )
+        client.force_authenticate(user)
+        return client
+
+    @staticmethod
+    def reset_caches():
+        # Cold response cache, and no throttle counts from earlier runs
+        get_cache().clear()
+        caches["default"].clear()
+        get_throttle_store().clear()
+
+    def reservation_payloads(self, repeat):
+        """Fresh two-seat reservations on the emptiest show session"""
+        show_session = (
+            ShowSession.objects.select_related("planetarium_dome")
+            .with_availability()
+            .order_by("-tickets_available", "id")
+            .first()
+        )
+        dome = show_session.planetarium_dome
+        # One warm-up request plus the timed ones
+        needed = (repeat + 1) * 2
+        if show_session.tickets_available < needed:
+            raise CommandError(
+                f"Not enough free seats for {repeat} reservations"
+            )
+        places = count(show_session.tickets_sold)
+        return (
+            {
+                "tickets": [
+                    {
+                        "row": place // dome.seats_in_row + 1,
+                        "seat": place % dome.seats_in_row + 1,
+                        "show_session": show_session.id,
+                    }
+                    for place in (next(places), next(places))
+                ]
+            }
+            for _ in range(needed // 2)
+        )
+
+    def endpoints(self, repeat):
+        show_session = ShowSession.objects.order_by("-tickets_sold").first()
+        day = timezone.localtime(show_session.show_time).date()
+        payloads = self.reservation_payloads(repeat)
+        sessions_url = reverse("planetarium:showsession-list")
+        shows_url = reverse("planetarium:astronomyshow-list")
+        reservations_url = reverse("planetarium:reservation-list")
+        return {
+            "show_sessions_list": ("get", sessions_url, {}),
+            "show_sessions_list_by_date": (
+                "get",
+                sessions_url,
+                {"date_from": day, "date_to": day + timedelta(days=6)},
+            ),
+            "show_session_detail": (
+                "get",
+                reverse(
+                    "planetarium:showsession-detail", args=(show_session.id,)
+                ),
+                {},
+            ),
+            "show_session_seats": (
+                "get",
+                reverse(
+                    "planetarium:showsession-seats", args=(show_session.id,)
+                ),
+                {},
+            ),
+            "astronomy_shows_list": ("get", shows_url, {}),
+            "astronomy_shows_search": ("get", shows_url, {"search": "stars"}),
+            "reservations_list": ("get", reservations_url, {}),
+            "reservations_create": ("post", reservations_url, payloads),
+        }
+
+    def run(self, repeat):
+        client = self.client()
+        results = {}
+        for name, (method, path, params) in self.endpoints(repeat).items():
+            if method == "post":
+                def request(payloads=params, path=path):
+                    return client.post(path, next(payloads), format="json")
+            else:
+                def request(params=params, path=path):
+                    return client.get(path, params)
+
+            self.reset_caches()
+            # Every request resets the query log, start from an empty one
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                response = request()
+            query_count = len(queries)
+            stats = measure(request, repeat, setup=self.reset_caches)
+            results[name] = {
+                "method": method.upper(),
+                "path": path,
+                "status": response.status_code,
+                "bytes": len(response.content),
+                "queries": query_count,
+                **stats,
+            }
+            self.stdout.write(
+                f"{name}: {response.status_code}, {query_count} queries, "
+                f"p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms"
+            )
+        return results
+
+    def compare(self, baseline, endpoints):
+        self.stdout.write(
+            f"Compared with {baseline.get('commit')} "
+            f"({baseline.get('tier')}, {baseline.get('vendor')}):"
+        )
+        previous = baseline.get("endpoints", {})
+        for name, current in endpoints.items():
+            before = previous.get(name)
+            if before is None:
+                continue
+            ratio = current["p50_ms"] / before["p50_ms"]
+            line = (
+                f"  {name}: p50 {before['p50_ms']} -> {current['p50_ms']} ms "
+                f"(x{ratio:.2f}), queries {before['queries']} -> "
+                f"{current['queries']}"
+            )
+            if (
+                ratio > REGRESSION_RATIO
+                or current["queries"] > before["queries"]
+            ):
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
@@ -0,0 +1,114 @@
+import io
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from planetarium.benchmarks import measure, rolled_back
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+from planetarium.renderers import FastJSONParser, FastJSONRenderer
+from planetarium.serializers import (
+    ReservationListSerializer,
+    ShowSessionListSerializer,
+)
+from planetarium.views import ReservationViewSet, ShowSessionViewSet
+from user.models import User
+
+
+class Command(BaseCommand):
+    """Compare stdlib and orjson rendering of list payloads"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sessions", type=int, default=500)
+        parser.add_argument("--reservations", type=int, default=100)
+        parser.add_argument("--tickets-per-reservation", type=int, default=4)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            payloads = self.seed(options)
+            self.run(payloads, options["repeat"])
+
+    def seed(self, options):
+        self.stdout.write(
+            f"Seeding {options['sessions']} sessions and "
+            f"{options['reservations']} reservations..."
+        )
+        dome = PlanetariumDome.objects.create(
+            name="Benchmark dome", rows=20, seats_in_row=30
+        )
+        show = AstronomyShow.objects.create(
+            title="Benchmark show", image="uploads/shows/benchmark.png"
+        )
+        start = timezone.now()
+        sessions = ShowSession.objects.bulk_create(
+            ShowSession(
+                astronomy_show=show,
+                planetarium_dome=dome,
+                show_time=start + timedelta(hours=index),
+            )
+            for index in range(options["sessions"])
+        )
+        user = User.objects.create_user(
+            email="benchmark@benchmark.test", password="benchmark"
+        )
+        reservations = Reservation.objects.bulk_create(
+            Reservation(user=user) for _ in range(options["reservations"])
+        )
+        per_reservation = options["tickets_per_reservation"]
+        Ticket.objects.bulk_create(
+            Ticket(
+                reservation=reservation,
+                show_session=sessions[index % len(sessions)],
+                row=seat // dome.seats_in_row + 1,
+                seat=seat % dome.seats_in_row + 1,
+            )
+            for index, reservation in enumerate(reservations)
+            for seat in range(
+                (index // len(sessions)) * per_reservation,
+                (index // len(sessions) + 1) * per_reservation,
+            )
+        )
+
+        request = RequestFactory().get(
+            "/api/planetarium/", HTTP_HOST="localhost"
+        )
+        context = {"request": Request(request)}
+        return {
+            "show_sessions": ShowSessionListSerializer(
+                ShowSessionViewSet.queryset.all(), many=True, context=context
+            ).data,
+            "reservations": ReservationListSerializer(
+                ReservationViewSet.queryset.filter(user=user),
+                many=True,
+                context=context,
+            ).data,
+        }
+
+    def run(self, payloads, repeat):
+        for name, data in payloads.items():
+            body = JSONRenderer().render(data)
+            self.stdout.write(f"{name}: {len(body)} bytes")
+            for label, renderer, parser in (
+                ("stdlib", JSONRenderer(), JSONParser()),
+                ("orjson", FastJSONRenderer(), FastJSONParser()),
+            ):
+                render = measure(lambda: renderer.render(data), repeat)
+                parse = measure(
+                    lambda: parser.parse(io.BytesIO(body)), repeat
+                )
+                self.stdout.write(
+                    f"  {label}: render {render}, parse {parse}"
+                )
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished"))
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.request import Request
+
+from planetarium.benchmarks import measure, rolled_back
+from planetarium.fast_serializers import (
+    AstronomyShowFastListSerializer,
+    ShowSessionFastListSerializer,
+)
+from planetarium.models import AstronomyShow, PlanetariumDome, ShowSession
+from planetarium.serializers import (
+    AstronomyShowListSerializer,
+    ShowSessionListSerializer,
+)
+from planetarium.views import ShowSessionViewSet
+
+
+class Command(BaseCommand):
+    """Compare rows/sec of the DRF and the fast list serializers"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.seed(options)
+            self.run(options["rows"], options["repeat"])
+
+    def seed(self, options):
+        rows = options["rows"]
+        self.stdout.write(f"Seeding {rows} shows and show sessions...")
+        dome = PlanetariumDome.objects.create(
+            name="Benchmark dome", rows=20, seats_in_row=30
+        )
+        shows = AstronomyShow.objects.bulk_create(
+            (
+                AstronomyShow(
+                    title=f"Show {index:07d}",
+                    image=f"uploads/shows/{index:07d}.png",
+                    image_small=(
+                        f"uploads/variants/{index:07d}-small.webp"
+                        if index % 2 else None
+                    ),
+                )
+                for index in range(rows)
+            ),
+            batch_size=options["batch_size"],
+        )
+        start = timezone.now()
+        ShowSession.objects.bulk_create(
+            (
+                ShowSession(
+                    astronomy_show=show,
+                    planetarium_dome=dome,
+                    show_time=start + timedelta(hours=index),
+                )
+                for index, show in enumerate(shows)
+            ),
+            batch_size=options["batch_size"],
+        )
+
+    def run(self, rows, repeat):
+        request = RequestFactory().get(
+            "/api/planetarium/", HTTP_HOST="localhost"
+        )
+        context = {"request": Request(request)}
+        shows = AstronomyShow.objects.order_by("title", "id")
+        sessions = ShowSessionViewSet.queryset.order_by("-show_time", "id")
+        cases = {
+            "astronomy_shows": (
+                lambda: AstronomyShowListSerializer(
+                    shows.all(), many=True, context=context
+                ).data,
+                lambda: AstronomyShowFastListSerializer(
+                    context
+                ).to_representation(
+                    AstronomyShowFastListSerializer.values(shows)
+                ),
+            ),
+            "show_sessions": (
+                lambda: ShowSessionListSerializer(
+                    sessions.all(), many=True, context=context
+                ).data,
+                lambda: ShowSessionFastListSerializer(
+                    context
+                ).to_representation(
+                    ShowSessionFastListSerializer.values(sessions.all())
+                ),
+            ),
+        }
+
+        for name, (regular, fast) in cases.items():
+            for label, func in (("drf", regular), ("fast", fast)):
+                stats = measure(func, repeat)
+                rows_per_sec = round(rows / (stats["p50_ms"] / 1000))
+                self.stdout.write(
+                    f"{name} {label}: {rows_per_sec} rows/sec, {stats}"
+                )
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished"))
@@ -0,0 +1,71 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from planetarium.benchmarks import measure, rolled_back
+from planetarium.models import AstronomyShow, ShowTheme
+
+
+class Command(BaseCommand):
+    """Compare JOIN + DISTINCT and semi-join theme filtering"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shows", type=int, default=100_000)
+        parser.add_argument("--themes", type=int, default=50)
+        parser.add_argument("--themes-per-show", type=int, default=3)
+        parser.add_argument("--filter-themes", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with rolled_back():
+            theme_ids = self.seed(rng, options)
+            self.run(
+                rng.sample(theme_ids, options["filter_themes"]),
+                options["repeat"],
+            )
+
+    def seed(self, rng, options):
+        self.stdout.write(
+            f"Seeding {options['shows']} shows x {options['themes']} themes..."
+        )
+        themes = ShowTheme.objects.bulk_create(
+            ShowTheme(name=f"Theme {index}")
+            for index in range(options["themes"])
+        )
+        theme_ids = [theme.id for theme in themes]
+        through = AstronomyShow.themes.through
+        batch_size = options["batch_size"]
+
+        for offset in range(0, options["shows"], batch_size):
+            shows = AstronomyShow.objects.bulk_create(
+                AstronomyShow(title=f"Show {index:07d}")
+                for index in range(
+                    offset, min(offset + batch_size, options["shows"])
+                )
+            )
+            through.objects.bulk_create(
+                through(astronomyshow_id=show.id, showtheme_id=theme_id)
+                for show in shows
+                for theme_id in rng.sample(
+                    theme_ids, options["themes_per_show"]
+                )
+            )
+        return theme_ids
+
+    def run(self, theme_ids, repeat):
+        shows = AstronomyShow.objects.order_by("title", "id")
+        strategies = {
+            "join_distinct_any": shows.filter(
+                themes__id__in=theme_ids
+            ).distinct(),
+            "semi_join_any": shows.with_themes(theme_ids, match="any"),
+            "semi_join_all": shows.with_themes(theme_ids, match="all"),
+        }
+
+        for name, queryset in strategies.items():
+            page = measure(lambda: list(queryset[:21]), repeat)
+            count = measure(queryset.count, repeat)
+            self.stdout.write(f"{name}: first page {page}, count {count}")
@@ -0,0 +1,95 @@
+import math
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F
+from django.utils import timezone
+
+from planetarium.benchmarks import measure, rolled_back
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+from user.models import User
+
+
+class Command(BaseCommand):
+    """Compare Count("tickets") and tickets_sold availability queries"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tickets", type=int, default=1_000_000)
+        parser.add_argument("--sessions", type=int, default=1_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.seed(options)
+            self.run(options["repeat"])
+
+    def seed(self, options):
+        sessions_count = options["sessions"]
+        per_session = math.ceil(options["tickets"] / sessions_count)
+        side = math.ceil(math.sqrt(per_session))
+        self.stdout.write(
+            f"Seeding {sessions_count} sessions with "
+            f"{per_session} tickets each..."
+        )
+
+        dome = PlanetariumDome.objects.create(
+            name="Benchmark dome", rows=side, seats_in_row=side
+        )
+        show = AstronomyShow.objects.create(title="Benchmark show")
+        start = timezone.now()
+        sessions = ShowSession.objects.bulk_create(
+            ShowSession(
+                astronomy_show=show,
+                planetarium_dome=dome,
+                show_time=start + timedelta(hours=index),
+                tickets_sold=per_session,
+            )
+            for index in range(sessions_count)
+        )
+        reservation = Reservation.objects.create(
+            user=User.objects.create_user(
+                email="benchmark@planetarium.test"
+            )
+        )
+
+        batch = []
+        for session in sessions:
+            for place in range(per_session):
+                batch.append(
+                    Ticket(
+                        show_session_id=session.id,
+                        reservation_id=reservation.id,
+                        row=place // side + 1,
+                        seat=place % side + 1,
+                    )
+                )
+                if len(batch) >= options["batch_size"]:
+                    Ticket.objects.bulk_create(batch)
+                    batch = []
+        Ticket.objects.bulk_create(batch)
+
+    def run(self, repeat):
+        base = ShowSession.objects.select_related(
+            "astronomy_show", "planetarium_dome"
+        )
+        strategies = {
+            "count_annotation": base.annotate(
+                tickets_available=(
+                    F("planetarium_dome__rows")
+                    * F("planetarium_dome__seats_in_row")
+                    - Count("tickets")
+                )
+            ),
+            "tickets_sold_counter": base.with_availability(),
+        }
+
+        for name, queryset in strategies.items():
+            stats = measure(lambda: list(queryset.all()), repeat)
+            self.stdout.write(f"{name}: {stats}")
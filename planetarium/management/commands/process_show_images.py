@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from planetarium.images import process_show_image
+from planetarium.models import AstronomyShow
+
+
+class Command(BaseCommand):
+    """Command to build missing image variants of astronomy shows"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild variants of every show, not only unprocessed ones",
+        )
+
+    def handle(self, *args, **options):
+        queryset = AstronomyShow.objects.exclude(image="").exclude(
+            image__isnull=True
+        )
+        if not options["all"]:
+            queryset = queryset.exclude(
+                image_status=AstronomyShow.ImageStatus.READY
+            )
+
+        processed = 0
+        for pk, image in queryset.values_list("pk", "image").iterator():
+            process_show_image(pk, image)
+            processed += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Processed images of {processed} show(s)")
+        )
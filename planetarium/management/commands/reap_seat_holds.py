@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from planetarium.holds import get_hold_store
+
+
+class Command(BaseCommand):
+    """Command to delete expired seat holds in bulk"""
+
+    def handle(self, *args, **options):
+        reaped = get_hold_store().reap_expired()
+        self.stdout.write(
+            self.style.SUCCESS(f"Released {reaped} expired seat hold(s)")
+        )
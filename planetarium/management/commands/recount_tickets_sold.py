@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from planetarium.models import ShowSession
+
+
+class Command(BaseCommand):
+    """Command to repair ShowSession.tickets_sold from Ticket rows"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--session",
+            type=int,
+            action="append",
+            dest="sessions",
+            help="Only recount the given show session id (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        queryset = ShowSession.objects.all()
+        if options["sessions"]:
+            queryset = queryset.filter(pk__in=options["sessions"])
+
+        repaired = queryset.recount_tickets_sold()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recounted tickets sold, repaired {repaired} session(s)"
+            )
+        )
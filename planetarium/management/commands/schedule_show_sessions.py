@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from planetarium.exceptions import ScheduleConflict
+from planetarium.serializers import ShowSessionRecurrenceSerializer
+
+
+class Command(BaseCommand):
+    """Command to create the show sessions of a weekly recurrence rule
+
+    Validated and inserted like a POST to show_sessions/bulk/.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--show", type=int, required=True)
+        parser.add_argument("--dome", type=int, required=True)
+        parser.add_argument(
+            "--weekdays",
+            type=int,
+            nargs="+",
+            required=True,
+            help="Days of the week, 0 is Monday",
+        )
+        parser.add_argument(
+            "--times",
+            nargs="+",
+            required=True,
+            help="Start times in the server time zone (ex. 18:00 20:30)",
+        )
+        parser.add_argument("--date-from", required=True)
+        parser.add_argument("--date-to", required=True)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only print the sessions the rule expands to",
+        )
+
+    def handle(self, *args, **options):
+        serializer = ShowSessionRecurrenceSerializer(
+            data={
+                "astronomy_show": options["show"],
+                "planetarium_dome": options["dome"],
+                "weekdays": options["weekdays"],
+                "times": options["times"],
+                "date_from": options["date_from"],
+                "date_to": options["date_to"],
+                "dry_run": options["dry_run"],
+            }
+        )
+        if not serializer.is_valid():
+            raise CommandError(serializer.errors)
+        try:
+            show_sessions = serializer.save()
+        except ScheduleConflict as error:
+            raise CommandError(error.detail)
+
+        if options["dry_run"]:
+            for show_session in show_sessions:
+                self.stdout.write(
+                    timezone.localtime(show_session.show_time).isoformat()
+                )
+            self.stdout.write(
+                f"Would create {len(show_sessions)} show session(s)"
+            )
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(show_sessions)} show session(s)"
+            )
+        )
@@ -0,0 +1,93 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from planetarium.seeding import Seeder
+
+
+class Command(BaseCommand):
+    """Populate the database with deterministic synthetic data
+
+    Rows are inserted with batched bulk_create, tickets with COPY on
+    PostgreSQL and executemany elsewhere, so millions of tickets load in
+    minutes. Every session sells --fill-ratio of its seats on distinct,
+    randomly picked seats. Users of an earlier run are reused.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--domes", type=int, default=10)
+        parser.add_argument("--shows", type=int, default=200)
+        parser.add_argument("--themes", type=int, default=20)
+        parser.add_argument("--users", type=int, default=1_000)
+        parser.add_argument("--days", type=int, default=30)
+        parser.add_argument(
+            "--sessions-per-day",
+            type=int,
+            default=6,
+            help="Sessions per dome and day",
+        )
+        parser.add_argument(
+            "--fill-ratio",
+            type=float,
+            default=0.8,
+            help="Share of every session's seats that is sold",
+        )
+        parser.add_argument(
+            "--min-capacity",
+            type=int,
+            default=100,
+            help="Smallest dome capacity, domes get up to 10 extra rows "
+            "and seats in a row",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--no-copy",
+            action="store_false",
+            dest="use_copy",
+            help="Insert tickets with executemany even on PostgreSQL",
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options["fill_ratio"] <= 1:
+            raise CommandError("--fill-ratio must be between 0 and 1")
+        for option in ("domes", "shows", "themes", "users"):
+            if options[option] < 1:
+                raise CommandError(f"--{option} must be at least 1")
+        if options["days"] < 1 or options["sessions_per_day"] < 1:
+            raise CommandError(
+                "--days and --sessions-per-day must be at least 1"
+            )
+
+        seeder = Seeder(
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            log=self.stdout.write,
+            # None lets the seeder pick COPY when running on PostgreSQL
+            use_copy=None if options["use_copy"] else False,
+        )
+        started = time.perf_counter()
+        with transaction.atomic():
+            theme_ids = seeder.seed_themes(options["themes"])
+            show_ids = seeder.seed_shows(options["shows"], theme_ids)
+            domes = seeder.seed_domes(
+                options["domes"], options["min_capacity"]
+            )
+            user_ids = seeder.seed_users(options["users"])
+            sessions = seeder.seed_schedule(
+                options["days"], options["sessions_per_day"], show_ids, domes
+            )
+            tickets = seeder.seed_filled_tickets(
+                options["fill_ratio"], sessions, user_ids
+            )
+            seeder.invalidate()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {len(sessions)} show sessions and {tickets} "
+                f"tickets in {elapsed:.1f}s "
+                f"({round(tickets / max(elapsed, 1e-9))} tickets/sec)"
+            )
+        )
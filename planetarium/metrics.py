@@ -0,0 +1,266 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from planetarium.cache import response_cache_stats
+
+# Timed phases of a request, reported in this order
+PHASES = ("db", "serialize", "render", "total")
+
+DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+_current_timings = ContextVar("planetarium_request_timings", default=None)
+
+
+class RequestTimings:
+    """Query count and per-phase durations of one request, in seconds"""
+
+    def __init__(self):
+        self.queries = 0
+        self.durations = defaultdict(float)
+        self._open = set()
+
+    @contextmanager
+    def phase(self, name):
+        # Nested timers of the same phase must not count twice
+        if name in self._open:
+            yield
+            return
+        self._open.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - start
+            self._open.discard(name)
+
+    def query(self, execute, sql, params, many, context):
+        self.queries += 1
+        with self.phase("db"):
+            return execute(sql, params, many, context)
+
+    def server_timing(self):
+        entries = []
+        for name in PHASES:
+            entry = f"{name};dur={self.durations[name] * 1000:.3f}"
+            if name == "db":
+                entry += f';desc="{self.queries} queries"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper reporting to the request in the current context
+
+    It is installed on every connection when it is opened, so queries
+    the async ORM runs on its worker thread are counted too, the
+    context follows the request into sync_to_async.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.query(execute, sql, params, many, context)
+
+
+def install_query_timer(connection):
+    if record_query not in connection.execute_wrappers:
+        # First in line, so execute_wrapper() blocks entered before the
+        # connection was opened still pop their own wrapper
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@contextmanager
+def timed(phase):
+    """Add the block's duration to phase of the current request, if any"""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    with timings.phase(phase):
+        yield
+
+
+def timed_serializer(serializer):
+    """Count the serializer's to_representation as serialize time"""
+    to_representation = serializer.to_representation
+
+    def timed_to_representation(*args, **kwargs):
+        with timed("serialize"):
+            return to_representation(*args, **kwargs)
+
+    serializer.to_representation = timed_to_representation
+    return serializer
+
+
+class TimedSerializerMixin:
+    """Report the time spent in get_serializer()'s serializers"""
+
+    def get_serializer(self, *args, **kwargs):
+        return timed_serializer(super().get_serializer(*args, **kwargs))
+
+
+class Histogram:
+    """Cumulative Prometheus style histogram"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestMetrics:
+    """Process-wide request histograms, keyed by view name and method
+
+    Every worker process keeps its own, so a scrape only covers the
+    process that answered it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def _histogram(self, metric, labels, buckets):
+        key = (metric, labels)
+        if key not in self.histograms:
+            self.histograms[key] = Histogram(buckets)
+        return self.histograms[key]
+
+    def observe(self, view, method, timings):
+        labels = (("view", view), ("method", method))
+        with self._lock:
+            for name in PHASES:
+                self._histogram(
+                    f"planetarium_request_{name}_seconds",
+                    labels,
+                    DURATION_BUCKETS,
+                ).observe(timings.durations[name])
+            self._histogram(
+                "planetarium_request_queries", labels, QUERY_BUCKETS
+            ).observe(timings.queries)
+
+    def export(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            lines = []
+            metric = None
+            for (name, labels), histogram in histograms:
+                if name != metric:
+                    metric = name
+                    lines.append(f"# TYPE {name} histogram")
+                label_text = ",".join(
+                    f'{key}="{_escape(value)}"' for key, value in labels
+                )
+                for bound, count in histogram.cumulative():
+                    lines.append(
+                        f'{name}_bucket{{{label_text},le="{bound}"}} {count}'
+                    )
+                lines.append(f"{name}_sum{{{label_text}}} {histogram.sum}")
+                lines.append(
+                    f"{name}_count{{{label_text}}} {histogram.count}"
+                )
+
+        for key, value in response_cache_stats.as_dict().items():
+            name = f"planetarium_response_cache_{key}_total"
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+request_metrics = RequestMetrics()
+
+
+class ServerTimingMiddleware:
+    """Time database, serializer and render work of every request
+
+    Queries are timed by record_query on every database. The timings
+    are added as a Server-Timing header, unless PLANETARIUM_SERVER_TIMING
+    is False, and recorded in request_metrics. Works in sync and async
+    middleware chains.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        try:
+            with timings.phase("total"):
+                response = self.get_response(request)
+                self.record_render(request, timings)
+        finally:
+            _current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        try:
+            with timings.phase("total"):
+                response = await self.get_response(request)
+                self.record_render(request, timings)
+        finally:
+            _current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    @staticmethod
+    def record_render(request, timings):
+        render_started = getattr(request, "_render_started", None)
+        if render_started is not None:
+            timings.durations["render"] = time.perf_counter() - render_started
+
+    @staticmethod
+    def finish(request, response, timings):
+        match = request.resolver_match
+        request_metrics.observe(
+            match.view_name if match else "unmatched",
+            request.method,
+            timings,
+        )
+        if getattr(settings, "PLANETARIUM_SERVER_TIMING", True):
+            response["Server-Timing"] = timings.server_timing()
+        return response
+
+    def process_template_response(self, request, response):
+        # Runs right before DRF renders the response
+        request._render_started = time.perf_counter()
+        return response
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:40
+
+from django.db import migrations
+
+FTS_TABLE = "planetarium_astronomyshow_fts"
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS planetarium_show_title_trgm "
+            "ON planetarium_astronomyshow USING gin (title gin_trgm_ops)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS planetarium_show_description_trgm "
+            "ON planetarium_astronomyshow "
+            "USING gin (description gin_trgm_ops)"
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(title, description)"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, description) "
+            f"SELECT id, title, description FROM planetarium_astronomyshow"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "DROP INDEX IF EXISTS planetarium_show_title_trgm"
+        )
+        schema_editor.execute(
+            "DROP INDEX IF EXISTS planetarium_show_description_trgm"
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planetarium", "0008_seathold"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planetarium", "0010_showsession_schedule_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="astronomyshow",
+            name="image_large",
+            field=models.ImageField(
+                blank=True, editable=False, null=True, upload_to="uploads/variants/"
+            ),
+        ),
+        migrations.AddField(
+            model_name="astronomyshow",
+            name="image_small",
+            field=models.ImageField(
+                blank=True, editable=False, null=True, upload_to="uploads/variants/"
+            ),
+        ),
+        migrations.AddField(
+            model_name="astronomyshow",
+            name="image_status",
+            field=models.CharField(
+                choices=[
+                    ("none", "None"),
+                    ("pending", "Pending"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="none",
+                editable=False,
+                max_length=16,
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:25
+
+import planetarium.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planetarium", "0011_astronomyshow_image_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="astronomyshow",
+            name="image",
+            field=models.ImageField(
+                null=True,
+                storage=planetarium.uploads.get_show_image_storage,
+                upload_to="uploads/shows/",
+            ),
+        ),
+    ]
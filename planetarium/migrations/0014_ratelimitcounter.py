@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-18 04:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planetarium", "0013_catalog_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RateLimitCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=255, unique=True)),
+                ("period", models.BigIntegerField()),
+                ("count", models.PositiveIntegerField()),
+                ("previous", models.PositiveIntegerField()),
+            ],
+        ),
+    ]
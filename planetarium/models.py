@@ -1,16 +1,26 @@
-import os
 import uuid
+from datetime import datetime, time, timedelta
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.utils.text import slugify
+from django.db.models import Count, F, Max, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from planetarium.uploads import get_show_image_storage
+
+
+def day_start(date):
+    """Aware midnight of a date in the current time zone"""
+    return timezone.make_aware(datetime.combine(date, time.min))
 
 
 class PlanetariumDome(models.Model):
     name = models.CharField(max_length=255)
     rows = models.IntegerField()
     seats_in_row = models.IntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     @property
     def capacity(self):
@@ -20,23 +30,61 @@ class PlanetariumDome(models.Model):
         return self.name
 
 
-def movie_image_file_path(instance, filename):
-    _, extension = os.path.splitext(filename)
-    filename = f"{slugify(instance.title)}-{uuid.uuid4()}{extension}"
+class AstronomyShowQuerySet(models.QuerySet):
+    def with_themes(self, theme_ids, match="any"):
+        """Shows having any or all of the themes, without a DISTINCT join
+
+        Both modes are semi-joins on the show-theme table, which the
+        database can drive from its (show, theme) unique index.
+        """
+        theme_ids = set(theme_ids)
+        show_themes = AstronomyShow.themes.through.objects.filter(
+            showtheme_id__in=theme_ids
+        ).values("astronomyshow_id")
 
-    return os.path.join("uploads/shows/", filename)
+        if match == "all":
+            show_themes = show_themes.annotate(
+                matched=Count("showtheme_id")
+            ).filter(matched=len(theme_ids))
+
+        return self.filter(
+            pk__in=show_themes.values("astronomyshow_id")
+        )
 
 
 class AstronomyShow(models.Model):
+    class ImageStatus(models.TextChoices):
+        NONE = "none"
+        PENDING = "pending"
+        READY = "ready"
+        FAILED = "failed"
+
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
-    image = models.ImageField(null=True, upload_to="movie_image_file_path")
+    image = models.ImageField(
+        null=True, upload_to="uploads/shows/", storage=get_show_image_storage
+    )
+    image_small = models.ImageField(
+        null=True, blank=True, editable=False, upload_to="uploads/variants/"
+    )
+    image_large = models.ImageField(
+        null=True, blank=True, editable=False, upload_to="uploads/variants/"
+    )
+    image_status = models.CharField(
+        max_length=16,
+        choices=ImageStatus.choices,
+        default=ImageStatus.NONE,
+        editable=False,
+    )
+    updated_at = models.DateTimeField(auto_now=True)
     themes = models.ManyToManyField(
         "ShowTheme",
         related_name="astronomy_shows",
         blank=True
     )
 
+    objects = AstronomyShowQuerySet.as_manager()
+
     class Meta:
         ordering = ["title",]
 
@@ -46,11 +94,79 @@ class AstronomyShow(models.Model):
 
 class ShowTheme(models.Model):
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
 
+class ShowSessionQuerySet(models.QuerySet):
+    def on_dates(self, date_from=None, date_to=None):
+        """Sessions between two local dates (both inclusive)
+
+        Compares show_time against a half-open timestamp range rather
+        than casting the column to a date, so indexes stay usable.
+        """
+        queryset = self
+        if date_from:
+            queryset = queryset.filter(show_time__gte=day_start(date_from))
+        if date_to:
+            queryset = queryset.filter(
+                show_time__lt=day_start(date_to + timedelta(days=1))
+            )
+        return queryset
+
+    def with_availability(self):
+        """Annotate tickets_available from the maintained sold counter"""
+        return self.annotate(
+            tickets_available=(
+                F("planetarium_dome__rows")
+                * F("planetarium_dome__seats_in_row")
+                - F("tickets_sold")
+            )
+        )
+
+    def calendar(self):
+        """Per day and dome session counts, show time span and free seats
+
+        One GROUP BY row for every (day, dome) pair, ordered by day.
+        """
+        return (
+            self.annotate(day=TruncDate("show_time"))
+            .order_by()
+            .values("day", "planetarium_dome_id", "planetarium_dome__name")
+            .annotate(
+                sessions=Count("id"),
+                first_show_time=Min("show_time"),
+                last_show_time=Max("show_time"),
+                tickets_available=Sum(
+                    F("planetarium_dome__rows")
+                    * F("planetarium_dome__seats_in_row")
+                    - F("tickets_sold")
+                ),
+            )
+            .order_by("day", "planetarium_dome_id")
+        )
+
+    def recount_tickets_sold(self):
+        """Re-derive tickets_sold from Ticket rows, return repaired count"""
+        sold = Coalesce(
+            Subquery(
+                Ticket.objects.filter(show_session=OuterRef("pk"))
+                .order_by()
+                .values("show_session")
+                .annotate(count=Count("id"))
+                .values("count")
+            ),
+            0,
+        )
+        return (
+            self.annotate(actual_tickets_sold=sold)
+            .exclude(tickets_sold=F("actual_tickets_sold"))
+            .update(tickets_sold=sold)
+        )
+
+
 class ShowSession(models.Model):
     astronomy_show = models.ForeignKey(
         AstronomyShow,
@@ -61,9 +177,22 @@ class ShowSession(models.Model):
         on_delete=models.CASCADE
     )
     show_time = models.DateTimeField()
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ShowSessionQuerySet.as_manager()
 
     class Meta:
         ordering = ["-show_time"]
+        indexes = [
+            models.Index(
+                fields=["show_time", "astronomy_show"],
+                name="showsession_time_show_idx",
+            ),
+            models.Index(
+                fields=["planetarium_dome", "show_time"],
+                name="showsession_dome_time_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.astronomy_show} - {self.planetarium_dome} - {self.show_time}"
@@ -86,6 +215,15 @@ class Ticket(models.Model):
         Reservation, on_delete=models.CASCADE, related_name="tickets"
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The session whose tickets_sold counts this row, see signals
+        instance._counted_show_session_id = instance.__dict__.get(
+            "show_session_id"
+        )
+        return instance
+
     @staticmethod
     def validate_ticket(row, seat, planetarium_dome, error_to_raise):
         for (
@@ -139,3 +277,55 @@ class Ticket(models.Model):
     class Meta:
         unique_together = ("show_session", "row", "seat")
         ordering = ["row", "seat"]
+
+
+class SeatHold(models.Model):
+    """Temporary claim on a seat while its owner completes a reservation"""
+
+    token = models.UUIDField(default=uuid.uuid4, db_index=True)
+    show_session = models.ForeignKey(
+        ShowSession, on_delete=models.CASCADE, related_name="holds"
+    )
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ("show_session", "row", "seat")
+        ordering = ["row", "seat"]
+
+    def __str__(self):
+        return (
+            f"{str(self.show_session)} (row: {self.row}, seat: {self.seat}) "
+            f"held until {self.expires_at}"
+        )
+
+
+class RateLimitCounter(models.Model):
+    """Requests of one throttle key in its current and previous window"""
+
+    key = models.CharField(max_length=255, unique=True)
+    period = models.BigIntegerField()
+    count = models.PositiveIntegerField()
+    previous = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.key}: {self.count} in period {self.period}"
+
+
+class ModelChange(models.Model):
+    """Changes of one model, the validators of its conditional GETs
+
+    Bumped in the transaction of every write, including deletes, which
+    leave no updated_at behind.
+    """
+
+    label = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.label}: version {self.version}"
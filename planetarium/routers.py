@@ -0,0 +1,241 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import SynchronousOnlyOperation
+from django.db import DatabaseError, connections
+from django.utils.functional import LazyObject, empty
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY = "default"
+PIN_COOKIE = "planetarium_primary"
+
+_current_routing = ContextVar("planetarium_replica_routing", default=None)
+
+
+def get_pin_seconds():
+    return getattr(settings, "PLANETARIUM_PRIMARY_PIN_SECONDS", 5)
+
+
+def get_pin_cache():
+    """Cache pinning users across their clients, None for cookies only"""
+    alias = getattr(settings, "PLANETARIUM_PRIMARY_PIN_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def _pin_key(user_id):
+    return f"primary-pin:{user_id}"
+
+
+def resolved_user(request):
+    """request.user if authentication already ran, without running it"""
+    user = vars(request).get("user")
+    if isinstance(user, LazyObject):
+        user = user._wrapped
+        if user is empty:
+            return None
+    return user
+
+
+class RequestRouting:
+    """Where the reads of one request may go
+
+    Only safe requests read from replicas, and only until the request
+    writes or when the client wrote within the pin window, known from
+    the pin cookie. With PLANETARIUM_PRIMARY_PIN_CACHE, a write also
+    pins the other clients of an authenticated user.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.use_replicas = request.method in SAFE_METHODS
+        self.wrote = False
+        self.read_replica = False
+        self._pinned = None
+
+    def pinned(self):
+        if self._pinned is None:
+            if self.request.COOKIES.get(PIN_COOKIE):
+                self._pinned = True
+                return True
+            cache = get_pin_cache()
+            if cache is None:
+                self._pinned = False
+                return False
+            user = resolved_user(self.request)
+            if user is None:
+                # Not authenticated yet, ask again on the next read
+                return False
+            self._pinned = bool(
+                user.is_authenticated and cache.get(_pin_key(user.pk))
+            )
+        return self._pinned
+
+    def pin(self, response):
+        """Keep the client's reads on the primary for the pin window"""
+        seconds = get_pin_seconds()
+        response.set_cookie(
+            PIN_COOKIE, "1", max_age=seconds, httponly=True, samesite="Lax"
+        )
+        cache = get_pin_cache()
+        user = resolved_user(self.request)
+        if cache is not None and user is not None and user.is_authenticated:
+            cache.set(_pin_key(user.pk), True, seconds)
+
+
+def read_from_replica():
+    """Whether the current request has read anything from a replica"""
+    routing = _current_routing.get()
+    return routing is not None and routing.read_replica
+
+
+class ReplicaLag:
+    """Replication lag of every replica, measured at most every interval
+
+    A replica that lags more than the pin window, or cannot be asked,
+    gets no reads until it catches up.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}
+
+    def reset(self):
+        with self._lock:
+            self._checked = {}
+
+    def healthy(self, alias):
+        interval = getattr(
+            settings, "PLANETARIUM_REPLICA_LAG_CHECK_INTERVAL", 5
+        )
+        now = time.monotonic()
+        with self._lock:
+            checked_at, lag = self._checked.get(alias, (None, None))
+        if checked_at is None or now - checked_at >= interval:
+            lag = self.measure(alias)
+            with self._lock:
+                self._checked[alias] = (now, lag)
+        return lag is not None and lag <= get_pin_seconds()
+
+    @staticmethod
+    def measure(alias):
+        """Seconds the replica is behind, None if it cannot be asked"""
+        connection = connections[alias]
+        if connection.vendor != "postgresql":
+            return 0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() "
+                    "= pg_last_wal_replay_lsn() THEN 0 ELSE EXTRACT("
+                    "EPOCH FROM now() - pg_last_xact_replay_timestamp()"
+                    ") END"
+                )
+                lag = cursor.fetchone()[0]
+        except (DatabaseError, SynchronousOnlyOperation):
+            return None
+        # NULL when the server is not replicating at all
+        return float(lag or 0)
+
+
+replica_lag = ReplicaLag()
+
+
+class ReplicaRouter:
+    """Send safe catalog and schedule reads to PLANETARIUM_READ_REPLICAS
+
+    Reservations, tickets, seat holds, users and every write stay on
+    the primary, so do all queries outside a request, like management
+    commands. ReplicaRoutingMiddleware provides the request context.
+    """
+
+    replica_models = {
+        "planetarium.showtheme",
+        "planetarium.planetariumdome",
+        "planetarium.astronomyshow",
+        "planetarium.astronomyshow_themes",
+        "planetarium.showsession",
+        # The validators of those reads
+        "planetarium.modelchange",
+    }
+    # Bookkeeping that no read of the client depends on
+    unpinned_models = {"planetarium.ratelimitcounter"}
+
+    def db_for_read(self, model, **hints):
+        routing = _current_routing.get()
+        if (
+            routing is None
+            or not routing.use_replicas
+            or routing.wrote
+            or model._meta.label_lower not in self.replica_models
+            or routing.pinned()
+        ):
+            return PRIMARY
+        replicas = [
+            alias
+            for alias in getattr(settings, "PLANETARIUM_READ_REPLICAS", ())
+            if replica_lag.healthy(alias)
+        ]
+        if not replicas:
+            return PRIMARY
+        routing.read_replica = True
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        routing = _current_routing.get()
+        if (
+            routing is not None
+            and model._meta.label_lower not in self.unpinned_models
+        ):
+            routing.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        return db == PRIMARY
+
+
+class ReplicaRoutingMiddleware:
+    """Give ReplicaRouter the request, pin clients that wrote to primary"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = RequestRouting(request)
+        token = _current_routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_routing.reset(token)
+        return self.finish(routing, response)
+
+    async def __acall__(self, request):
+        routing = RequestRouting(request)
+        token = _current_routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_routing.reset(token)
+        return self.finish(routing, response)
+
+    @staticmethod
+    def finish(routing, response):
+        if routing.wrote:
+            routing.pin(response)
+        return response
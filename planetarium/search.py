@@ -0,0 +1,202 @@
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    TrigramSimilarity,
+    TrigramWordSimilarity,
+)
+from django.core.signals import setting_changed
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Cast, Greatest
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from planetarium.models import AstronomyShow
+
+FTS_TABLE = "planetarium_astronomyshow_fts"
+
+TITLE_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+def tokenize(text):
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def get_search_limit():
+    return getattr(settings, "PLANETARIUM_SEARCH_LIMIT", 500)
+
+
+def rank_by_ids(queryset, ranked):
+    """Keep the ranked (pk, score) pairs and annotate search_rank"""
+    if not ranked:
+        return queryset.none().annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+    return queryset.filter(pk__in=[pk for pk, _ in ranked]).annotate(
+        search_rank=Case(
+            *[When(pk=pk, then=Value(float(score))) for pk, score in ranked],
+            output_field=FloatField(),
+        )
+    )
+
+
+class BaseSearchBackend(ABC):
+    @abstractmethod
+    def search(self, queryset, query):
+        """Filter queryset to matches annotated with search_rank"""
+
+    def index(self, astronomy_show):
+        """Add or refresh one show in the index"""
+
+    def remove(self, pk):
+        """Drop one show from the index"""
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """pg_trgm similarity served by GIN indexes on title and description"""
+
+    def search(self, queryset, query):
+        rank = Greatest(
+            TrigramSimilarity("title", query) * TITLE_WEIGHT,
+            TrigramWordSimilarity(query, "description") * DESCRIPTION_WEIGHT,
+        )
+        return queryset.filter(
+            Q(title__trigram_word_similar=query)
+            | Q(description__trigram_word_similar=query)
+        ).annotate(search_rank=Cast(rank, FloatField()))
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5 virtual table ranked with bm25, kept in sync on save"""
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return rank_by_ids(queryset, [])
+        match = " ".join(f'"{token}"*' for token in tokens)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, -bm25({FTS_TABLE}, %s, %s) AS score "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY score DESC LIMIT %s",
+                [TITLE_WEIGHT, DESCRIPTION_WEIGHT, match, get_search_limit()],
+            )
+            return rank_by_ids(queryset, cursor.fetchall())
+
+    def index(self, astronomy_show):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                [astronomy_show.pk],
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description) "
+                f"VALUES (%s, %s, %s)",
+                [
+                    astronomy_show.pk,
+                    astronomy_show.title,
+                    astronomy_show.description,
+                ],
+            )
+
+    def remove(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+
+class InMemorySearchBackend(BaseSearchBackend):
+    """In-process inverted index with prefix matching, for tests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._documents = {}
+
+    def _ensure_loaded(self):
+        if self._postings is not None:
+            return
+        self._postings = defaultdict(dict)
+        for astronomy_show in AstronomyShow.objects.only(
+            "id", "title", "description"
+        ):
+            self._add(astronomy_show)
+
+    def _add(self, astronomy_show):
+        weights = defaultdict(float)
+        for token in tokenize(astronomy_show.title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(astronomy_show.description):
+            weights[token] += DESCRIPTION_WEIGHT
+        for token, weight in weights.items():
+            self._postings[token][astronomy_show.pk] = weight
+        self._documents[astronomy_show.pk] = set(weights)
+
+    def _discard(self, pk):
+        for token in self._documents.pop(pk, ()):
+            self._postings[token].pop(pk, None)
+            if not self._postings[token]:
+                del self._postings[token]
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        with self._lock:
+            self._ensure_loaded()
+            scores = None
+            for token in tokens:
+                matches = defaultdict(float)
+                for term, postings in self._postings.items():
+                    if term.startswith(token):
+                        for pk, weight in postings.items():
+                            matches[pk] += weight
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {
+                        pk: score + matches[pk]
+                        for pk, score in scores.items()
+                        if pk in matches
+                    }
+        ranked = sorted(
+            (scores or {}).items(), key=lambda item: (-item[1], item[0])
+        )
+        return rank_by_ids(queryset, ranked[: get_search_limit()])
+
+    def index(self, astronomy_show):
+        with self._lock:
+            if self._postings is None:
+                return
+            self._discard(astronomy_show.pk)
+            self._add(astronomy_show)
+
+    def remove(self, pk):
+        with self._lock:
+            if self._postings is not None:
+                self._discard(pk)
+
+
+DEFAULT_BACKENDS = {
+    "postgresql": "planetarium.search.PostgresSearchBackend",
+    "sqlite": "planetarium.search.SQLiteSearchBackend",
+}
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    path = getattr(settings, "PLANETARIUM_SEARCH_BACKEND", None)
+    if path is None:
+        path = DEFAULT_BACKENDS.get(
+            connection.vendor, "planetarium.search.InMemorySearchBackend"
+        )
+    return import_string(path)()
+
+
+@receiver(setting_changed)
+def reset_search_backend(setting, **kwargs):
+    if setting == "PLANETARIUM_SEARCH_BACKEND":
+        get_search_backend.cache_clear()
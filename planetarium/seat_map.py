@@ -0,0 +1,107 @@
+import base64
+import hashlib
+
+from planetarium.holds import get_hold_store
+from planetarium.models import Ticket
+
+
+class SeatMap:
+    """Compact rows x seats_in_row bitsets of taken and held seats"""
+
+    def __init__(self, rows, seats_in_row):
+        self.rows = rows
+        self.seats_in_row = seats_in_row
+        self.bits = bytearray((rows * seats_in_row + 7) // 8)
+        self.held_bits = bytearray(len(self.bits))
+
+    @classmethod
+    def for_show_session(cls, show_session):
+        """Build the seat map of a show session from tickets and holds"""
+        dome = show_session.planetarium_dome
+        seat_map = cls(dome.rows, dome.seats_in_row)
+        seat_map.mark_many(
+            Ticket.objects.filter(show_session=show_session)
+            .order_by()
+            .values_list("row", "seat")
+        )
+        for row, seat in get_hold_store().held_seats(show_session.id):
+            seat_map.mark(row, seat, bits=seat_map.held_bits)
+        return seat_map
+
+    def _index(self, row, seat):
+        return (row - 1) * self.seats_in_row + (seat - 1)
+
+    def mark(self, row, seat, bits=None):
+        bits = self.bits if bits is None else bits
+        index = self._index(row, seat)
+        bits[index >> 3] |= 1 << (index & 7)
+
+    def mark_many(self, places):
+        for row, seat in places:
+            self.mark(row, seat)
+
+    def is_taken(self, row, seat, bits=None):
+        bits = self.bits if bits is None else bits
+        index = self._index(row, seat)
+        return bool(bits[index >> 3] & (1 << (index & 7)))
+
+    def is_held(self, row, seat):
+        return self.is_taken(row, seat, bits=self.held_bits)
+
+    @property
+    def taken_count(self):
+        return sum(bin(byte).count("1") for byte in self.bits)
+
+    @property
+    def held_count(self):
+        return sum(bin(byte).count("1") for byte in self.held_bits)
+
+    @property
+    def etag(self):
+        digest = hashlib.md5(
+            self.bits + self.held_bits, usedforsecurity=False
+        ).hexdigest()
+        return f'"{self.rows}x{self.seats_in_row}-{digest}"'
+
+    @staticmethod
+    def _bitmap(bits):
+        return base64.b64encode(bytes(bits)).decode("ascii")
+
+    def to_bitmap(self):
+        """Base64 encoded bitmap, row-major, least significant bit first"""
+        return self._bitmap(self.bits)
+
+    def to_runs(self, bits=None):
+        """Marked seats of every row as [first_seat, length] runs"""
+        runs = []
+        for row in range(1, self.rows + 1):
+            row_runs = []
+            start = None
+            for seat in range(1, self.seats_in_row + 2):
+                taken = (
+                    seat <= self.seats_in_row
+                    and self.is_taken(row, seat, bits=bits)
+                )
+                if taken and start is None:
+                    start = seat
+                elif not taken and start is not None:
+                    row_runs.append([start, seat - start])
+                    start = None
+            runs.append(row_runs)
+        return runs
+
+    def to_representation(self, encoding="bitmap"):
+        data = {
+            "rows": self.rows,
+            "seats_in_row": self.seats_in_row,
+            "taken_count": self.taken_count,
+            "held_count": self.held_count,
+            "encoding": encoding,
+        }
+        if encoding == "rle":
+            data["taken"] = self.to_runs()
+            data["held"] = self.to_runs(bits=self.held_bits)
+        else:
+            data["taken"] = self.to_bitmap()
+            data["held"] = self._bitmap(self.held_bits)
+        return data
@@ -0,0 +1,330 @@
+import csv
+import io
+import math
+import random
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.utils import timezone
+
+from planetarium.cache import bump_version
+from planetarium.conditional import record_change
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+from planetarium.search import get_search_backend
+from user.models import User
+
+TIERS = {
+    "small": {
+        "themes": 20,
+        "shows": 200,
+        "domes": 5,
+        "sessions": 1_000,
+        "tickets": 50_000,
+        "users": 100,
+    },
+    "medium": {
+        "themes": 50,
+        "shows": 1_000,
+        "domes": 10,
+        "sessions": 10_000,
+        "tickets": 500_000,
+        "users": 1_000,
+    },
+    "large": {
+        "themes": 50,
+        "shows": 2_000,
+        "domes": 20,
+        "sessions": 10_000,
+        "tickets": 5_000_000,
+        "users": 10_000,
+    },
+}
+
+TICKETS_PER_RESERVATION = 4
+USER_PASSWORD = "planetarium"
+
+WORDS = (
+    "stars", "moon", "galaxy", "nebula", "comet", "planet", "orbit",
+    "eclipse", "aurora", "cosmos", "quasar", "pulsar", "meteor", "saturn",
+    "jupiter", "mars", "venus", "black", "hole", "light", "dark", "matter",
+)
+
+
+class Seeder:
+    """Deterministic synthetic catalog, schedule and reservations
+
+    The same seed and sizes always produce the same rows. Every show
+    session gets its tickets on distinct seats. Tickets skip the ORM,
+    they are loaded with COPY on PostgreSQL unless use_copy is turned
+    off and with executemany everywhere else.
+    """
+
+    def __init__(self, seed=0, batch_size=10_000, log=None, use_copy=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.start = timezone.make_aware(datetime(2030, 1, 1, 10, 0))
+        if use_copy is None:
+            use_copy = connection.vendor == "postgresql"
+        self.use_copy = use_copy
+
+    def sentence(self, words):
+        return " ".join(self.rng.choice(WORDS) for _ in range(words))
+
+    def seed(self, themes, shows, domes, sessions, tickets, users):
+        """Seed every table, return the sizes that were created"""
+        theme_ids = self.seed_themes(themes)
+        show_ids = self.seed_shows(shows, theme_ids)
+        dome_list = self.seed_domes(domes, math.ceil(tickets / sessions))
+        user_ids = self.seed_users(users)
+        session_list = self.seed_sessions(sessions, show_ids, dome_list)
+        tickets = self.seed_tickets(tickets, session_list, user_ids)
+        self.invalidate()
+        return {
+            "themes": themes,
+            "shows": shows,
+            "domes": domes,
+            "sessions": sessions,
+            "tickets": tickets,
+            "users": users,
+        }
+
+    @staticmethod
+    def invalidate():
+        # bulk_create sends no signals, drop cached responses explicitly
+        record_change(ShowTheme, AstronomyShow, PlanetariumDome)
+        bump_version(
+            ShowTheme, AstronomyShow, PlanetariumDome, ShowSession, Ticket
+        )
+
+    def seed_themes(self, count):
+        self.log(f"Seeding {count} themes...")
+        themes = ShowTheme.objects.bulk_create(
+            ShowTheme(name=f"{self.sentence(1).title()} {index}")
+            for index in range(count)
+        )
+        return [theme.id for theme in themes]
+
+    def seed_shows(self, count, theme_ids):
+        self.log(f"Seeding {count} astronomy shows...")
+        show_ids = []
+        through = AstronomyShow.themes.through
+        search_backend = get_search_backend()
+        for offset in range(0, count, self.batch_size):
+            shows = AstronomyShow.objects.bulk_create(
+                AstronomyShow(
+                    title=f"{self.sentence(3).title()} {index}",
+                    description=self.sentence(30),
+                )
+                for index in range(
+                    offset, min(offset + self.batch_size, count)
+                )
+            )
+            for show in shows:
+                search_backend.index(show)
+            through.objects.bulk_create(
+                through(astronomyshow_id=show.id, showtheme_id=theme_id)
+                for show in shows
+                for theme_id in self.rng.sample(
+                    theme_ids, min(3, len(theme_ids))
+                )
+            )
+            show_ids.extend(show.id for show in shows)
+        return show_ids
+
+    def seed_domes(self, count, min_capacity):
+        self.log(f"Seeding {count} planetarium domes...")
+        side = max(10, math.ceil(math.sqrt(min_capacity)))
+        return PlanetariumDome.objects.bulk_create(
+            PlanetariumDome(
+                name=f"Dome {index}",
+                rows=side + self.rng.randint(0, 10),
+                seats_in_row=side + self.rng.randint(0, 10),
+            )
+            for index in range(count)
+        )
+
+    def seed_users(self, count):
+        self.log(f"Seeding {count} users...")
+        # Hashing once keeps seeding fast, every user shares the password
+        password = make_password(USER_PASSWORD)
+        emails = [f"user{index}@planetarium.test" for index in range(count)]
+        # Users of an earlier run are reused, ignore_conflicts leaves the
+        # created ones without ids, so every id is read back
+        User.objects.bulk_create(
+            (User(email=email, password=password) for email in emails),
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        user_ids = []
+        for offset in range(0, count, self.batch_size):
+            user_ids.extend(
+                User.objects.filter(
+                    email__in=emails[offset:offset + self.batch_size]
+                )
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+        return user_ids
+
+    def seed_sessions(self, count, show_ids, domes):
+        self.log(f"Seeding {count} show sessions...")
+        sessions = []
+        for offset in range(0, count, self.batch_size):
+            sessions.extend(
+                ShowSession.objects.bulk_create(
+                    ShowSession(
+                        astronomy_show_id=self.rng.choice(show_ids),
+                        planetarium_dome=domes[index % len(domes)],
+                        show_time=self.start + timedelta(hours=index),
+                    )
+                    for index in range(
+                        offset, min(offset + self.batch_size, count)
+                    )
+                )
+            )
+        return sessions
+
+    def seed_schedule(self, days, sessions_per_day, show_ids, domes):
+        """sessions_per_day evenly spaced sessions in every dome per day"""
+        count = days * sessions_per_day * len(domes)
+        self.log(f"Seeding {count} show sessions...")
+        step = timedelta(days=1) / sessions_per_day
+        slots = (
+            (dome, self.start + timedelta(days=day) + step * slot)
+            for day in range(days)
+            for slot in range(sessions_per_day)
+            for dome in domes
+        )
+        sessions = []
+        while batch := list(islice(slots, self.batch_size)):
+            sessions.extend(
+                ShowSession.objects.bulk_create(
+                    ShowSession(
+                        astronomy_show_id=self.rng.choice(show_ids),
+                        planetarium_dome=dome,
+                        show_time=show_time,
+                    )
+                    for dome, show_time in batch
+                )
+            )
+        return sessions
+
+    def seed_tickets(self, count, sessions, user_ids):
+        """Spread count tickets evenly over sessions, without collisions"""
+        self.log(f"Seeding {count} tickets...")
+        per_session, extra = divmod(count, len(sessions))
+
+        def placements():
+            for index, session in enumerate(sessions):
+                sold = per_session + (index < extra)
+                capacity = session.planetarium_dome.capacity
+                if sold > capacity:
+                    raise ValueError(
+                        f"{sold} tickets do not fit into {capacity} seats"
+                    )
+                yield session, range(sold)
+
+        return self.write_tickets(placements(), user_ids)
+
+    def seed_filled_tickets(self, fill_ratio, sessions, user_ids):
+        """Sell fill_ratio of every session's seats, picked at random"""
+        self.log(f"Seeding tickets for {fill_ratio:.0%} of every session...")
+
+        def placements():
+            for session in sessions:
+                capacity = session.planetarium_dome.capacity
+                sold = round(capacity * fill_ratio)
+                yield session, sorted(self.rng.sample(range(capacity), sold))
+
+        return self.write_tickets(placements(), user_ids)
+
+    def write_tickets(self, placements, user_ids):
+        """Insert tickets for (session, seat places) pairs in batches
+
+        A place is the zero-based seat index in the dome, so distinct
+        places always map to distinct (row, seat) pairs.
+        """
+        pending = []
+        created = 0
+        for session, places in placements:
+            seats_in_row = session.planetarium_dome.seats_in_row
+            pending.extend(
+                (
+                    session.id,
+                    place // seats_in_row + 1,
+                    place % seats_in_row + 1,
+                )
+                for place in places
+            )
+            if len(pending) >= self.batch_size:
+                created += self.flush_tickets(pending, user_ids)
+                pending = []
+        created += self.flush_tickets(pending, user_ids)
+
+        # bulk_create skips the signals that maintain the counter
+        ShowSession.objects.recount_tickets_sold()
+        return created
+
+    def flush_tickets(self, places, user_ids):
+        if not places:
+            return 0
+        reservations = Reservation.objects.bulk_create(
+            Reservation(user_id=self.rng.choice(user_ids))
+            for _ in range(math.ceil(len(places) / TICKETS_PER_RESERVATION))
+        )
+        rows = (
+            (
+                show_session_id,
+                row,
+                seat,
+                reservations[index // TICKETS_PER_RESERVATION].id,
+            )
+            for index, (show_session_id, row, seat) in enumerate(places)
+        )
+        if self.use_copy:
+            self.copy_tickets(rows)
+        else:
+            self.insert_tickets(rows)
+        return len(places)
+
+    @staticmethod
+    def ticket_columns():
+        return [
+            Ticket._meta.get_field(name).column
+            for name in ("show_session", "row", "seat", "reservation")
+        ]
+
+    def insert_tickets(self, rows):
+        """Plain executemany, skipping bulk_create's per-object overhead"""
+        quote = connection.ops.quote_name
+        columns = ", ".join(quote(column) for column in self.ticket_columns())
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {quote(Ticket._meta.db_table)} ({columns}) "
+                "VALUES (%s, %s, %s, %s)",
+                list(rows),
+            )
+
+    def copy_tickets(self, rows):
+        """Stream ticket rows through PostgreSQL's COPY FROM STDIN"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        columns = ", ".join(quote(column) for column in self.ticket_columns())
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {quote(Ticket._meta.db_table)} ({columns}) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
@@ -1,7 +1,24 @@
-from django.db import transaction
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import F
+from django.utils import timezone
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from planetarium.cache import bump_version
+from planetarium.exceptions import (
+    ReservationUnavailable,
+    ScheduleConflict,
+    SeatConflict,
+)
+from planetarium.holds import get_hold_store, taken_seats
 from planetarium.models import (
     AstronomyShow,
     ShowTheme,
@@ -24,6 +41,20 @@ class PlanetariumDomeSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "rows", "seats_in_row")
 
 
+class ImageVariantField(serializers.ImageField):
+    """URL of a resized show image, the original until it is processed"""
+
+    def __init__(self, variant, **kwargs):
+        self.variant = variant
+        kwargs.setdefault("source", "*")
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, astronomy_show):
+        image = getattr(astronomy_show, f"image_{self.variant}")
+        return super().to_representation(image or astronomy_show.image)
+
+
 class AstronomyShowSerializer(serializers.ModelSerializer):
     class Meta:
         model = AstronomyShow
@@ -34,6 +65,7 @@ class AstronomyShowListSerializer(AstronomyShowSerializer):
     show_themes = serializers.SlugRelatedField(
         many=True, read_only=True, slug_field="name"
     )
+    image = ImageVariantField("small")
 
     class Meta:
         model = AstronomyShow
@@ -42,6 +74,7 @@ class AstronomyShowListSerializer(AstronomyShowSerializer):
 
 class AstronomyShowDetailSerializer(AstronomyShowSerializer):
     show_themes = ShowThemeSerializer(many=True, read_only=True)
+    image = ImageVariantField("large")
 
     class Meta:
         model = AstronomyShow
@@ -51,7 +84,15 @@ class AstronomyShowDetailSerializer(AstronomyShowSerializer):
 class AstronomyShowImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = AstronomyShow
-        fields = ("id", "image")
+        fields = ("id", "image", "image_status")
+        read_only_fields = ("image_status",)
+
+
+class AstronomyShowImageStatusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AstronomyShow
+        fields = ("id", "image_status", "image", "image_small", "image_large")
+        read_only_fields = fields
 
 
 class ShowSessionSerializer(serializers.ModelSerializer):
@@ -60,12 +101,114 @@ class ShowSessionSerializer(serializers.ModelSerializer):
         fields = ("id", "astronomy_show", "planetarium_dome", "show_time")
 
 
+class ShowSessionRecurrenceSerializer(serializers.Serializer):
+    """Weekly rule expanded into sessions of one show in one dome
+
+    The whole batch is checked against the dome's existing sessions and
+    inserted in one transaction, or with dry_run only expanded.
+    """
+
+    astronomy_show = serializers.PrimaryKeyRelatedField(
+        queryset=AstronomyShow.objects.all()
+    )
+    planetarium_dome = serializers.PrimaryKeyRelatedField(
+        queryset=PlanetariumDome.objects.all()
+    )
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        allow_empty=False,
+        help_text="Days of the week, 0 is Monday",
+    )
+    times = serializers.ListField(
+        child=serializers.TimeField(),
+        allow_empty=False,
+        help_text="Start times in the server time zone",
+    )
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if attrs["date_from"] > attrs["date_to"]:
+            raise ValidationError(
+                {"date_to": "Date must not be before date_from."}
+            )
+
+        limit = settings.PLANETARIUM_BULK_SCHEDULE_LIMIT
+        show_times = list(islice(self.expand(attrs), limit + 1))
+        if not show_times:
+            raise ValidationError("The rule matches no day in the range.")
+        if len(show_times) > limit:
+            raise ValidationError(
+                f"The rule expands to more than {limit} show sessions."
+            )
+        attrs["show_times"] = show_times
+        return attrs
+
+    @staticmethod
+    def expand(attrs):
+        """Aware show times of the rule, in order"""
+        weekdays = set(attrs["weekdays"])
+        times = sorted(set(attrs["times"]))
+        day = attrs["date_from"]
+        while day <= attrs["date_to"]:
+            if day.weekday() in weekdays:
+                for start in times:
+                    yield timezone.make_aware(datetime.combine(day, start))
+            day += timedelta(days=1)
+
+    @staticmethod
+    def conflicts(planetarium_dome, show_times):
+        """Show times the dome already has sessions at"""
+        return set(
+            ShowSession.objects.filter(
+                planetarium_dome=planetarium_dome,
+                show_time__range=(show_times[0], show_times[-1]),
+            )
+            .order_by()
+            .values_list("show_time", flat=True)
+        ) & set(show_times)
+
+    def create(self, validated_data):
+        dome = validated_data["planetarium_dome"]
+        show_times = validated_data["show_times"]
+        show_sessions = [
+            ShowSession(
+                astronomy_show=validated_data["astronomy_show"],
+                planetarium_dome=dome,
+                show_time=show_time,
+            )
+            for show_time in show_times
+        ]
+
+        if validated_data["dry_run"]:
+            conflicts = self.conflicts(dome, show_times)
+            if conflicts:
+                raise ScheduleConflict(conflicts)
+            return show_sessions
+
+        with transaction.atomic():
+            # One schedule change per dome at a time
+            list(
+                PlanetariumDome.objects.select_for_update()
+                .filter(pk=dome.pk)
+                .values_list("pk", flat=True)
+            )
+            conflicts = self.conflicts(dome, show_times)
+            if conflicts:
+                raise ScheduleConflict(conflicts)
+            ShowSession.objects.bulk_create(show_sessions, batch_size=1000)
+        # bulk_create sends no post_save
+        bump_version(ShowSession)
+        return show_sessions
+
+
 class ShowSessionListSerializer(ShowSessionSerializer):
     astronomy_show_title = serializers.CharField(
         source="astronomy_show.title", read_only=True
     )
-    astronomy_show_image = serializers.ImageField(
-        source="astronomy_show.image", read_only=True
+    astronomy_show_image = ImageVariantField(
+        "small", source="astronomy_show"
     )
     planetarium_dome_name = serializers.CharField(
         source="planetarium_dome.name", read_only=True
@@ -87,7 +230,86 @@ class ShowSessionListSerializer(ShowSessionSerializer):
         )
 
 
+class ShowSessionPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """Resolves show sessions from a preloaded map when one is available"""
+
+    preloaded = None
+
+    def to_internal_value(self, data):
+        # int(True) is 1, a boolean is never an id
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if self.preloaded is not None:
+            try:
+                return self.preloaded[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
+
+class BulkTicketSerializer(serializers.ListSerializer):
+    """Validates a batch of tickets with a fixed number of queries"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            session_ids = set()
+            for item in data:
+                try:
+                    show_session = item["show_session"]
+                    if not isinstance(show_session, bool):
+                        session_ids.add(int(show_session))
+                except (KeyError, TypeError, ValueError):
+                    continue
+            self.child.fields["show_session"].preloaded = (
+                ShowSession.objects.select_related("planetarium_dome")
+                .order_by()
+                .in_bulk(session_ids)
+            )
+        attrs = super().to_internal_value(data)
+        self.check_seats(attrs)
+        return attrs
+
+    def check_seats(self, attrs):
+        """Reject duplicated seats per ticket and seats held by others"""
+        errors = [{} for _ in attrs]
+        seen = {}
+
+        for index, ticket in enumerate(attrs):
+            key = (ticket["show_session"].id, ticket["row"], ticket["seat"])
+            if key in seen:
+                errors[index] = {
+                    "non_field_errors": [
+                        "Seat is duplicated within the reservation."
+                    ]
+                }
+            seen.setdefault(key, index)
+
+        if any(errors):
+            raise ValidationError(errors)
+
+        request = self.context.get("request")
+        user_id = request.user.id if request else None
+        store = get_hold_store()
+        held = set()
+        for show_session_id in {key[0] for key in seen}:
+            held.update(
+                (show_session_id, row, seat)
+                for row, seat in store.held_seats(
+                    show_session_id, exclude_user_id=user_id
+                )
+            )
+        if held & seen.keys():
+            raise SeatConflict(
+                held & seen.keys(),
+                "Some of the requested seats are held by another customer.",
+            )
+
+
 class TicketSerializer(serializers.ModelSerializer):
+    show_session = ShowSessionPrimaryKeyField(
+        queryset=ShowSession.objects.select_related("planetarium_dome")
+    )
+
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs)
         Ticket.validate_ticket(
@@ -101,6 +323,10 @@ class TicketSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ticket
         fields = ("id", "row", "seat", "show_session")
+        list_serializer_class = BulkTicketSerializer
+        # Seat uniqueness is checked for the whole batch at once
+        # in BulkTicketSerializer.check_seats
+        validators = []
 
 
 class TicketListSerializer(TicketSerializer):
@@ -116,9 +342,7 @@ class TicketSeatsSerializer(TicketSerializer):
 class ShowSessionDetailSerializer(ShowSessionSerializer):
     astronomy_show = ShowSessionListSerializer(many=False, read_only=True)
     planetarium_dome = PlanetariumDomeSerializer(many=False, read_only=True)
-    taken_places = TicketSeatsSerializer(
-        source="tickets", many=True, read_only=True
-    )
+    taken_places = serializers.SerializerMethodField()
 
     class Meta:
         model = ShowSession
@@ -130,21 +354,165 @@ class ShowSessionDetailSerializer(ShowSessionSerializer):
             "taken_places",
         )
 
+    @extend_schema_field(TicketSeatsSerializer(many=True))
+    def get_taken_places(self, obj):
+        if hasattr(obj, "taken_places"):
+            # Loaded up front by the async views, which cannot query here
+            return obj.taken_places
+        return list(obj.tickets.values("row", "seat"))
+
+
+class SeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    seat = serializers.IntegerField()
+
+
+class SeatHoldSerializer(serializers.Serializer):
+    token = serializers.UUIDField(read_only=True)
+    show_session = serializers.IntegerField(
+        source="show_session_id", read_only=True
+    )
+    seats = SeatSerializer(many=True, allow_empty=False)
+    expires_at = serializers.DateTimeField(read_only=True)
+
+    def validate_seats(self, seats):
+        planetarium_dome = self.context["show_session"].planetarium_dome
+        places = []
+        for place in seats:
+            Ticket.validate_ticket(
+                place["row"], place["seat"], planetarium_dome, ValidationError
+            )
+            places.append((place["row"], place["seat"]))
+        if len(set(places)) != len(places):
+            raise ValidationError("Seats must not repeat.")
+        return places
+
+    def to_representation(self, hold):
+        return {
+            "token": str(hold.token),
+            "show_session": hold.show_session_id,
+            "seats": [{"row": row, "seat": seat} for row, seat in hold.seats],
+            "expires_at": self.fields["expires_at"].to_representation(
+                hold.expires_at
+            ),
+        }
+
+
+class CalendarDomeSerializer(serializers.Serializer):
+    planetarium_dome = serializers.IntegerField(source="planetarium_dome_id")
+    planetarium_dome_name = serializers.CharField(
+        source="planetarium_dome__name"
+    )
+    sessions = serializers.IntegerField()
+    first_show_time = serializers.DateTimeField()
+    last_show_time = serializers.DateTimeField()
+    tickets_available = serializers.IntegerField()
+
+
+class CalendarDaySerializer(serializers.Serializer):
+    date = serializers.DateField()
+    sessions = serializers.IntegerField()
+    first_show_time = serializers.DateTimeField()
+    last_show_time = serializers.DateTimeField()
+    tickets_available = serializers.IntegerField()
+    domes = CalendarDomeSerializer(many=True)
+
 
 class ReservationSerializer(serializers.ModelSerializer):
-    tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
+    tickets = TicketSerializer(
+        many=True, read_only=False, allow_empty=False, required=False
+    )
+    hold = serializers.UUIDField(
+        write_only=True,
+        required=False,
+        help_text="Token of a seat hold to turn into tickets",
+    )
 
     class Meta:
         model = Reservation
-        fields = ("id", "tickets", "created_at")
+        fields = ("id", "tickets", "hold", "created_at")
+
+    def validate(self, attrs):
+        token = attrs.pop("hold", None)
+        if (token is None) == ("tickets" not in attrs):
+            raise ValidationError(
+                "Provide either a list of tickets or a seat hold."
+            )
+        if token is None:
+            return attrs
+
+        hold = get_hold_store().get(token, self.context["request"].user.id)
+        if hold is None:
+            raise ValidationError(
+                {"hold": "Seat hold has expired or does not exist."}
+            )
+        show_session = ShowSession.objects.select_related(
+            "planetarium_dome"
+        ).get(pk=hold.show_session_id)
+        attrs["tickets"] = [
+            {"show_session": show_session, "row": row, "seat": seat}
+            for row, seat in hold.seats
+        ]
+        attrs["hold"] = hold
+        return attrs
 
     def create(self, validated_data):
+        attempts = settings.PLANETARIUM_RESERVATION_ATTEMPTS
+        # A failed statement dooms an enclosing transaction,
+        # so only retry when this call owns the whole transaction
+        if transaction.get_connection().in_atomic_block:
+            attempts = 1
+
+        for attempt in range(1, attempts + 1):
+            try:
+                return self.admit(dict(validated_data))
+            except OperationalError:
+                if attempt == attempts:
+                    raise ReservationUnavailable()
+                delay = settings.PLANETARIUM_RESERVATION_BACKOFF * 2 ** (
+                    attempt - 1
+                )
+                time.sleep(delay + random.uniform(0, delay))
+
+    def admit(self, validated_data):
+        """Lock the sessions in id order, re-check seats and insert"""
+        tickets_data = validated_data.pop("tickets")
+        hold = validated_data.pop("hold", None)
+        places = {
+            (ticket["show_session"].id, ticket["row"], ticket["seat"])
+            for ticket in tickets_data
+        }
+        sold = Counter(ticket["show_session"].id for ticket in tickets_data)
+
         with transaction.atomic():
-            tickets_data = validated_data.pop("tickets")
+            list(
+                ShowSession.objects.select_for_update()
+                .filter(pk__in=sold)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            conflicts = taken_seats(places)
+            if conflicts:
+                raise SeatConflict(conflicts)
+
             reservation = Reservation.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(reservation=reservation, **ticket_data)
-            return reservation
+            try:
+                with transaction.atomic():
+                    Ticket.objects.bulk_create(
+                        Ticket(reservation=reservation, **ticket_data)
+                        for ticket_data in tickets_data
+                    )
+            except IntegrityError:
+                raise SeatConflict(taken_seats(places))
+
+            for show_session_id, count in sold.items():
+                ShowSession.objects.filter(pk=show_session_id).update(
+                    tickets_sold=F("tickets_sold") + count
+                )
+            if hold is not None:
+                get_hold_store().release(hold.token)
+        bump_version(Ticket, ShowSession)
+        return reservation
 
 
 class ReservationListSerializer(ReservationSerializer):
@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from planetarium.cache import bump_version
+from planetarium.conditional import record_change
+from planetarium.metrics import install_query_timer
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+from planetarium.search import get_search_backend
+
+CACHED_MODELS = (
+    AstronomyShow,
+    PlanetariumDome,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+CONDITIONAL_MODELS = (AstronomyShow, PlanetariumDome, ShowTheme)
+
+
+def counted_show_session_id(ticket):
+    """Id of the session whose tickets_sold includes the ticket's row"""
+    return getattr(ticket, "_counted_show_session_id", ticket.show_session_id)
+
+
+@receiver(post_save, sender=Ticket)
+def count_tickets_sold(sender, instance, created, **kwargs):
+    previous = None if created else counted_show_session_id(instance)
+    if previous != instance.show_session_id:
+        if previous is not None:
+            ShowSession.objects.filter(
+                pk=previous, tickets_sold__gt=0
+            ).update(tickets_sold=F("tickets_sold") - 1)
+        ShowSession.objects.filter(pk=instance.show_session_id).update(
+            tickets_sold=F("tickets_sold") + 1
+        )
+    instance._counted_show_session_id = instance.show_session_id
+
+
+@receiver(post_delete, sender=Ticket)
+def decrement_tickets_sold(sender, instance, **kwargs):
+    ShowSession.objects.filter(
+        pk=counted_show_session_id(instance), tickets_sold__gt=0
+    ).update(tickets_sold=F("tickets_sold") - 1)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_cached_responses(sender, **kwargs):
+    if sender in CONDITIONAL_MODELS:
+        # Committed or rolled back together with the write
+        record_change(sender)
+    if sender in CACHED_MODELS:
+        # After commit, a list built before it would otherwise be
+        # cached under the new version
+        transaction.on_commit(lambda: bump_version(sender))
+
+
+@receiver(m2m_changed, sender=AstronomyShow.themes.through)
+def invalidate_show_themes(sender, action, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    record_change(AstronomyShow)
+    transaction.on_commit(lambda: bump_version(AstronomyShow))
+
+
+@receiver(post_save, sender=AstronomyShow)
+def index_astronomy_show(sender, instance, **kwargs):
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=AstronomyShow)
+def unindex_astronomy_show(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    install_query_timer(connection)
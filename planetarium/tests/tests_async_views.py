@@ -0,0 +1,165 @@
+from datetime import datetime
+
+import pytz
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.sync_client = APIClient()
+        self.sync_client.force_authenticate(self.user)
+        self.async_client = AsyncClient()
+        self.headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(self.user)}"
+        }
+
+        self.dome = PlanetariumDome.objects.create(
+            name="Blue", rows=10, seats_in_row=12
+        )
+        theme = ShowTheme.objects.create(name="Space")
+        self.sessions = []
+        for index in range(3):
+            show = AstronomyShow.objects.create(
+                title=f"Stars {index}", description="Bright stars"
+            )
+            show.themes.add(theme)
+            self.sessions.append(
+                ShowSession.objects.create(
+                    astronomy_show=show,
+                    planetarium_dome=self.dome,
+                    show_time=datetime(
+                        2024, 12, 6 + index, 18, tzinfo=pytz.UTC
+                    ),
+                )
+            )
+        reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.create(
+            show_session=self.sessions[0],
+            reservation=reservation,
+            row=2,
+            seat=3,
+        )
+
+    async def assert_same_response(self, name, args=(), params=None):
+        sync_response = await self.get_sync(
+            reverse(f"planetarium:{name}", args=args), params
+        )
+        async_response = await self.get(
+            reverse(f"planetarium:async-{name}", args=args), params
+        )
+
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.json(), sync_response.json())
+        return async_response
+
+    async def get(self, url, params=None):
+        # AsyncClient(headers=...) does not reach ASGI requests in Django 5.0
+        return await self.async_client.get(url, params, headers=self.headers)
+
+    async def get_sync(self, url, params=None):
+        return await sync_to_async(self.sync_client.get)(url, params)
+
+    async def test_lists_match_sync_endpoints(self):
+        for name in (
+            "showtheme-list",
+            "planetariumdome-list",
+            "astronomyshow-list",
+            "showsession-list",
+        ):
+            with self.subTest(name):
+                await self.assert_same_response(name)
+
+    async def test_filtered_lists_match_sync_endpoints(self):
+        await self.assert_same_response(
+            "astronomyshow-list", params={"title": "stars 1"}
+        )
+        await self.assert_same_response(
+            "astronomyshow-list", params={"search": "stars"}
+        )
+        await self.assert_same_response(
+            "showsession-list", params={"date": "2024-12-07"}
+        )
+
+    async def test_details_match_sync_endpoints(self):
+        session = self.sessions[0]
+        response = await self.assert_same_response(
+            "showsession-detail", args=(session.id,)
+        )
+        self.assertEqual(
+            response.json()["taken_places"], [{"row": 2, "seat": 3}]
+        )
+        await self.assert_same_response(
+            "astronomyshow-detail", args=(session.astronomy_show_id,)
+        )
+        await self.assert_same_response(
+            "astronomyshow-detail",
+            args=(session.astronomy_show_id,),
+            params={"search": "stars"},
+        )
+
+    async def test_pagination_links_stay_on_async_endpoint(self):
+        url = reverse("planetarium:async-showsession-list")
+
+        response = await self.get(url, {"page_size": 2})
+
+        body = response.json()
+        self.assertEqual(len(body["results"]), 2)
+        self.assertIn(url, body["next"])
+        response = await self.get(body["next"])
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    async def test_missing_object(self):
+        response = await self.get(
+            reverse("planetarium:async-showsession-detail", args=(0,))
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_invalid_filter(self):
+        response = await self.get(
+            reverse("planetarium:async-showsession-list"), {"date": "today"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("date", response.json())
+
+    async def test_auth_required(self):
+        url = reverse("planetarium:async-showsession-list")
+
+        response = await AsyncClient().get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("Bearer", response["WWW-Authenticate"])
+
+        response = await AsyncClient(
+            headers={"Authorization": "Bearer invalid"}
+        ).get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_post_not_allowed(self):
+        response = await self.async_client.post(
+            reverse("planetarium:async-showsession-list"),
+            {},
+            headers=self.headers,
+        )
+
+        self.assertEqual(
+            response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED
+        )
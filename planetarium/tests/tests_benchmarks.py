@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    ShowSession,
+    Ticket,
+)
+
+
+class BenchEndpointsTests(TestCase):
+    def run_bench(self, *args):
+        output = os.path.join(tempfile.mkdtemp(), "result.json")
+        self.addCleanup(os.remove, output)
+        call_command(
+            "bench_endpoints",
+            "--themes=3",
+            "--shows=5",
+            "--domes=2",
+            "--sessions=10",
+            "--tickets=40",
+            "--users=3",
+            "--repeat=2",
+            f"--output={output}",
+            *args,
+            stdout=StringIO(),
+        )
+        with open(output) as file:
+            return json.load(file)
+
+    def test_results_written_and_data_rolled_back(self):
+        result = self.run_bench()
+
+        self.assertEqual(result["sizes"]["tickets"], 40)
+        self.assertEqual(
+            set(result["endpoints"]),
+            {
+                "show_sessions_list",
+                "show_sessions_list_by_date",
+                "show_session_detail",
+                "show_session_seats",
+                "astronomy_shows_list",
+                "astronomy_shows_search",
+                "reservations_list",
+                "reservations_create",
+            },
+        )
+        for name, endpoint in result["endpoints"].items():
+            self.assertIn(endpoint["status"], (200, 201), name)
+            self.assertGreater(endpoint["queries"], 0, name)
+            self.assertEqual(endpoint["runs"], 2)
+        self.assertFalse(AstronomyShow.objects.exists())
+        self.assertFalse(ShowSession.objects.exists())
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_compare_with_baseline(self):
+        baseline = self.run_bench()
+        path = os.path.join(tempfile.mkdtemp(), "baseline.json")
+        with open(path, "w") as file:
+            json.dump(baseline, file)
+        self.addCleanup(os.remove, path)
+
+        out = StringIO()
+        call_command(
+            "bench_endpoints",
+            "--sessions=10",
+            "--tickets=40",
+            "--shows=5",
+            "--repeat=1",
+            f"--output={path}",
+            f"--compare={path}",
+            stdout=out,
+        )
+
+        self.assertIn("reservations_create: p50", out.getvalue())
+
+
+class BenchConcurrencyTests(TransactionTestCase):
+    def test_both_paths_served(self):
+        get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        dome = PlanetariumDome.objects.create(
+            name="Blue", rows=10, seats_in_row=10
+        )
+        ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(title="Stars"),
+            planetarium_dome=dome,
+            show_time=timezone.now(),
+        )
+        out = StringIO()
+
+        call_command(
+            "bench_concurrency",
+            "--concurrency",
+            "1",
+            "2",
+            "--requests=4",
+            stdout=out,
+        )
+
+        lines = out.getvalue().splitlines()
+        for label in ("wsgi x1", "asgi x1", "wsgi x2", "asgi x2"):
+            line = next(line for line in lines if line.startswith(label))
+            self.assertIn("statuses {200: 4}", line)
+
+    def test_requires_data(self):
+        with self.assertRaises(CommandError):
+            call_command("bench_concurrency", stdout=StringIO())
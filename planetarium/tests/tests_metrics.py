@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from planetarium.cache import get_cache
+from planetarium.metrics import request_metrics
+from planetarium.models import AstronomyShow, PlanetariumDome, ShowSession
+
+SHOW_SESSION_URL = reverse("planetarium:showsession-list")
+METRICS_URL = reverse("planetarium:metrics")
+
+
+def server_timing(response):
+    """Server-Timing entries as {name: (duration in ms, description)}"""
+    entries = {}
+    for entry in response["Server-Timing"].split(", "):
+        name, *params = entry.split(";")
+        params = dict(param.split("=", 1) for param in params)
+        entries[name] = (float(params["dur"]), params.get("desc"))
+    return entries
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        dome = PlanetariumDome.objects.create(
+            name="Blue", rows=10, seats_in_row=10
+        )
+        show = AstronomyShow.objects.create(title="Stars")
+        ShowSession.objects.create(
+            astronomy_show=show,
+            planetarium_dome=dome,
+            show_time=datetime(2024, 12, 6, 18, 0, tzinfo=pytz.UTC),
+        )
+        request_metrics.reset()
+        get_cache().clear()
+
+    def test_server_timing_header(self):
+        response = self.client.get(SHOW_SESSION_URL)
+
+        entries = server_timing(response)
+        self.assertEqual(
+            list(entries), ["db", "serialize", "render", "total"]
+        )
+        self.assertNotEqual(entries["db"][1], '"0 queries"')
+        for name in ("db", "serialize", "render"):
+            self.assertGreater(entries[name][0], 0, name)
+            self.assertLessEqual(entries[name][0], entries["total"][0], name)
+
+    @override_settings(PLANETARIUM_SERVER_TIMING=False)
+    def test_server_timing_header_disabled(self):
+        response = self.client.get(SHOW_SESSION_URL)
+
+        self.assertNotIn("Server-Timing", response)
+
+    def test_metrics_require_staff(self):
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_histograms(self):
+        self.client.get(SHOW_SESSION_URL)
+        self.client.get(SHOW_SESSION_URL)
+        self.user.is_staff = True
+        self.user.save()
+
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        labels = 'view="planetarium:showsession-list",method="GET"'
+        self.assertIn("# TYPE planetarium_request_db_seconds histogram", body)
+        self.assertIn(
+            f'planetarium_request_total_seconds_bucket{{{labels},le="+Inf"}} 2',
+            body,
+        )
+        self.assertIn(
+            f"planetarium_request_serialize_seconds_count{{{labels}}} 2",
+            body,
+        )
+        # The second request is a response cache hit, its one query
+        # counts the request for the throttle
+        self.assertIn(
+            f'planetarium_request_queries_bucket{{{labels},le="1"}} 1', body
+        )
+        self.assertIn("planetarium_response_cache_misses_total", body)
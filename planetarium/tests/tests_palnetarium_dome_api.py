@@ -1,12 +1,15 @@
 import os
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
 
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
-from planetarium.models import PlanetariumDome
+from planetarium.models import ModelChange, PlanetariumDome
 from planetarium.serializers import PlanetariumDomeSerializer
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Planetarium_API_Service.settings")
@@ -61,3 +64,54 @@ class PrivatePlanetariumDomeApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
+
+    def test_conditional_get_not_modified(self):
+        """Test that a matching ETag short-circuits to 304"""
+        sample_planetarium_dome()
+        res = self.client.get(PLANETARIUM_DOME_URL)
+        self.assertIn("Last-Modified", res)
+
+        # The throttle counter and the validators
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                PLANETARIUM_DOME_URL, HTTP_IF_NONE_MATCH=res["ETag"]
+            )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        res = self.client.get(
+            PLANETARIUM_DOME_URL, HTTP_IF_MODIFIED_SINCE=res["Last-Modified"]
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_conditional_get_after_change(self):
+        """Test that creating or deleting a dome changes the ETag"""
+        dome = sample_planetarium_dome()
+        etag = self.client.get(PLANETARIUM_DOME_URL)["ETag"]
+
+        sample_planetarium_dome(name="Another Dome")
+        res = self.client.get(PLANETARIUM_DOME_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 2)
+
+        etag = res["ETag"]
+        dome.delete()
+        res = self.client.get(PLANETARIUM_DOME_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_conditional_get_after_delete(self):
+        """Test that deleting a dome moves Last-Modified"""
+        dome = sample_planetarium_dome()
+        sample_planetarium_dome(name="Another Dome")
+        # Last-Modified has whole seconds, make the creates older
+        ModelChange.objects.update(
+            changed_at=timezone.now() - timedelta(hours=1)
+        )
+        last_modified = self.client.get(PLANETARIUM_DOME_URL)["Last-Modified"]
+
+        dome.delete()
+        res = self.client.get(
+            PLANETARIUM_DOME_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertNotEqual(res["Last-Modified"], last_modified)
@@ -1,9 +1,18 @@
+import io
+import os
+import shutil
+import tempfile
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
+from planetarium.cache import get_cache, response_cache_stats
+from planetarium.images import process_show_image
 from planetarium.models import AstronomyShow, ShowTheme
 from planetarium.serializers import (
     AstronomyShowListSerializer,
@@ -20,6 +29,26 @@ def detail_url(astronomy_show_id):
     )
 
 
+def image_upload_url(astronomy_show_id):
+    return reverse(
+        "planetarium:astronomyshow-upload-image",
+        args=(astronomy_show_id,)
+    )
+
+
+def image_status_url(astronomy_show_id):
+    return reverse(
+        "planetarium:astronomyshow-image-status",
+        args=(astronomy_show_id,)
+    )
+
+
+def sample_image(name="show.png", size=(2000, 1000)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "navy").save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/png")
+
+
 def sample_astronomy_show(**params) -> AstronomyShow:
     defaults = {
         "title": "test title",
@@ -46,6 +75,7 @@ class AuthenticatedPlanetariumApiTests(TestCase):
             "testpassword",
         )
         self.client.force_authenticate(self.user)
+        get_cache().clear()
 
     def test_astronomy_shows_list(self):
         sample_astronomy_show()
@@ -60,7 +90,9 @@ class AuthenticatedPlanetariumApiTests(TestCase):
         serializer = AstronomyShowListSerializer(astronomy_shows, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        for res_item, serializer_item in zip(res.data, serializer.data):
+        for res_item, serializer_item in zip(
+            res.data["results"], serializer.data
+        ):
             self.assertEqual(res_item, serializer_item)
 
     def test_filter_astronomy_shows_by_themes(self):
@@ -83,9 +115,47 @@ class AuthenticatedPlanetariumApiTests(TestCase):
         serializer2 = AstronomyShowListSerializer(astronomy_show2)
         serializer3 = AstronomyShowListSerializer(astronomy_show3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
+
+    def test_filter_astronomy_shows_by_all_themes(self):
+        theme1 = ShowTheme.objects.create(name="Theme 1")
+        theme2 = ShowTheme.objects.create(name="Theme 2")
+
+        astronomy_show1 = sample_astronomy_show(title="Astronomy Show 1")
+        astronomy_show2 = sample_astronomy_show(title="Astronomy Show 2")
+
+        astronomy_show1.themes.add(theme1, theme2)
+        astronomy_show2.themes.add(theme2)
+
+        res = self.client.get(
+            PLANETARIUM_URL,
+            {"themes": f"{theme1.id},{theme2.id}", "themes_match": "all"},
+        )
+
+        self.assertEqual(
+            [item["id"] for item in res.data["results"]],
+            [astronomy_show1.id],
+        )
+
+        res = self.client.get(
+            PLANETARIUM_URL,
+            {"themes": f"{theme1.id},{theme2.id}", "themes_match": "any"},
+        )
+
+        # A show matching several themes is listed once
+        self.assertEqual(
+            [item["id"] for item in res.data["results"]],
+            [astronomy_show1.id, astronomy_show2.id],
+        )
+
+    def test_filter_astronomy_shows_invalid_themes_match(self):
+        res = self.client.get(
+            PLANETARIUM_URL, {"themes": "1", "themes_match": "some"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_filter_astronomy_shows_by_titles(self):
         astronomy_show1 = sample_astronomy_show(title="Stars")
@@ -98,9 +168,61 @@ class AuthenticatedPlanetariumApiTests(TestCase):
         serializer2 = AstronomyShowListSerializer(astronomy_show2)
         serializer3 = AstronomyShowListSerializer(astronomy_show3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
+
+    def test_search_astronomy_shows(self):
+        sample_astronomy_show(
+            title="Black holes", description="Gravity bends light"
+        )
+        sample_astronomy_show(
+            title="Northern lights", description="Solar wind and gravity"
+        )
+        sample_astronomy_show(title="Moon", description="Craters")
+
+        res = self.client.get(PLANETARIUM_URL, {"search": "gravity"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        titles = [item["title"] for item in res.data["results"]]
+        self.assertCountEqual(titles, ["Black holes", "Northern lights"])
+
+        res = self.client.get(PLANETARIUM_URL, {"search": "light"})
+
+        # Title matches rank above description matches
+        titles = [item["title"] for item in res.data["results"]]
+        self.assertEqual(titles, ["Northern lights", "Black holes"])
+
+    def test_search_index_follows_updates(self):
+        astronomy_show = sample_astronomy_show(title="Comets")
+        res = self.client.get(PLANETARIUM_URL, {"search": "comets"})
+        self.assertEqual(len(res.data["results"]), 1)
+
+        astronomy_show.title = "Asteroids"
+        with self.captureOnCommitCallbacks(execute=True):
+            astronomy_show.save()
+        res = self.client.get(PLANETARIUM_URL, {"search": "comets"})
+        self.assertEqual(res.data["results"], [])
+
+        res = self.client.get(PLANETARIUM_URL, {"search": "aster"})
+        self.assertEqual(len(res.data["results"]), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            astronomy_show.delete()
+        res = self.client.get(PLANETARIUM_URL, {"search": "aster"})
+        self.assertEqual(res.data["results"], [])
+
+    @override_settings(
+        PLANETARIUM_SEARCH_BACKEND="planetarium.search.InMemorySearchBackend"
+    )
+    def test_search_with_in_memory_backend(self):
+        self.test_search_astronomy_shows()
+
+    @override_settings(
+        PLANETARIUM_SEARCH_BACKEND="planetarium.search.InMemorySearchBackend"
+    )
+    def test_in_memory_index_follows_updates(self):
+        self.test_search_index_follows_updates()
 
     def test_retrieve_astronomy_show_detail(self):
         astronomy_show = sample_astronomy_show()
@@ -116,6 +238,108 @@ class AuthenticatedPlanetariumApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_astronomy_shows_list_is_cached(self):
+        sample_astronomy_show(title="Stars")
+        response_cache_stats.reset()
+
+        res = self.client.get(PLANETARIUM_URL, {"themes": "2,1"})
+        self.assertEqual(res["X-Cache"], "MISS")
+
+        res = self.client.get(PLANETARIUM_URL, {"themes": "1,2"})
+        self.assertEqual(res["X-Cache"], "HIT")
+        self.assertEqual(
+            response_cache_stats.as_dict(), {"hits": 1, "misses": 1}
+        )
+
+    def test_astronomy_shows_cache_invalidated_on_write(self):
+        astronomy_show = sample_astronomy_show(title="Stars")
+        self.client.get(PLANETARIUM_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            astronomy_show.themes.add(ShowTheme.objects.create(name="Moon"))
+        res = self.client.get(PLANETARIUM_URL)
+        self.assertEqual(res["X-Cache"], "MISS")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_astronomy_show(title="Comets")
+        res = self.client.get(PLANETARIUM_URL)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(len(res.data["results"]), 2)
+
+    def test_astronomy_shows_cache_invalidated_after_commit(self):
+        self.client.get(PLANETARIUM_URL)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            sample_astronomy_show(title="Comets")
+            # Not committed yet, a miss would cache the new row under
+            # the version readers of the old data still use
+            res = self.client.get(PLANETARIUM_URL)
+            self.assertEqual(res["X-Cache"], "HIT")
+
+        for callback in callbacks:
+            callback()
+        res = self.client.get(PLANETARIUM_URL)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_astronomy_shows_conditional_get(self):
+        astronomy_show = sample_astronomy_show(title="Stars")
+        etag = self.client.get(PLANETARIUM_URL)["ETag"]
+
+        # The throttle counter, then the validators of both models
+        with self.assertNumQueries(2):
+            res = self.client.get(PLANETARIUM_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+        res = self.client.get(
+            PLANETARIUM_URL, {"title": "Stars"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        astronomy_show.themes.add(ShowTheme.objects.create(name="Moon"))
+        res = self.client.get(PLANETARIUM_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_astronomy_show_detail_conditional_get(self):
+        astronomy_show = sample_astronomy_show(title="Stars")
+        url = detail_url(astronomy_show.id)
+        etag = self.client.get(url)["ETag"]
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.assertNotEqual(
+            self.client.get(detail_url(sample_astronomy_show().id))["ETag"],
+            etag,
+        )
+
+    def test_fast_list_serializer_parity(self):
+        for index in range(5):
+            sample_astronomy_show(
+                title=f"Stars {index}",
+                image=f"uploads/shows/ab/{index}.png" if index % 2 else "",
+                image_small=(
+                    f"uploads/variants/{index}-small.webp" if index == 1
+                    else None
+                ),
+            )
+
+        for params in (
+            {"page_size": 2},
+            {"search": "stars", "page_size": 3},
+            {"title": "stars 1"},
+        ):
+            responses = []
+            for fast in (False, True):
+                get_cache().clear()
+                with self.settings(PLANETARIUM_FAST_LIST_SERIALIZERS=fast):
+                    res = self.client.get(PLANETARIUM_URL, params)
+                self.assertEqual(res["X-Cache"], "MISS")
+                responses.append(res.content)
+            self.assertEqual(responses[0], responses[1])
+
     def test_create_astronomy_show_forbidden(self):
         payload = {
             "title": "Test Title",
@@ -180,3 +404,144 @@ class AdminAstronomyShowTests(TestCase):
 
 
 
+
+
+@override_settings(PLANETARIUM_IMAGE_WORKERS=0)
+class AstronomyShowImageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@admin.test",
+            "testpassword",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.astronomy_show = sample_astronomy_show()
+
+    def upload(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                image_upload_url(self.astronomy_show.id),
+                {"image": image},
+                format="multipart",
+            )
+
+    def test_upload_image_builds_variants(self):
+        res = self.upload(sample_image())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["image_status"], "pending")
+
+        self.astronomy_show.refresh_from_db()
+        self.assertEqual(self.astronomy_show.image_status, "ready")
+        for variant, width in (("image_small", 320), ("image_large", 1280)):
+            with Image.open(
+                getattr(self.astronomy_show, variant).path
+            ) as image:
+                self.assertEqual(image.format, "WEBP")
+                self.assertEqual(image.size, (width, width // 2))
+
+    def test_list_serves_small_and_detail_large_variant(self):
+        self.upload(sample_image())
+        self.astronomy_show.refresh_from_db()
+
+        res = self.client.get(PLANETARIUM_URL)
+        self.assertTrue(
+            res.data["results"][0]["image"].endswith(
+                self.astronomy_show.image_small.url
+            )
+        )
+
+        res = self.client.get(detail_url(self.astronomy_show.id))
+        self.assertTrue(
+            res.data["image"].endswith(self.astronomy_show.image_large.url)
+        )
+
+    def test_original_served_until_variants_are_ready(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.client.post(
+                image_upload_url(self.astronomy_show.id),
+                {"image": sample_image()},
+                format="multipart",
+            )
+        self.astronomy_show.refresh_from_db()
+
+        res = self.client.get(image_status_url(self.astronomy_show.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["image_status"], "pending")
+        self.assertIsNone(res.data["image_small"])
+        res = self.client.get(detail_url(self.astronomy_show.id))
+        self.assertTrue(
+            res.data["image"].endswith(self.astronomy_show.image.url)
+        )
+
+    def test_new_upload_replaces_variants(self):
+        self.upload(sample_image())
+        self.astronomy_show.refresh_from_db()
+        old_small = self.astronomy_show.image_small
+
+        self.upload(sample_image("other.png", size=(100, 100)))
+        self.astronomy_show.refresh_from_db()
+
+        self.assertFalse(old_small.storage.exists(old_small.name))
+        self.assertEqual(self.astronomy_show.image_status, "ready")
+        with Image.open(self.astronomy_show.image_small.path) as image:
+            self.assertEqual(image.size, (100, 100))
+
+    def test_unreadable_image_marks_failed(self):
+        self.upload(sample_image())
+        self.astronomy_show.refresh_from_db()
+        with open(self.astronomy_show.image.path, "wb") as file:
+            file.write(b"not an image")
+
+        with self.assertLogs("planetarium.images", "ERROR"):
+            process_show_image(
+                self.astronomy_show.id, self.astronomy_show.image.name
+            )
+
+        res = self.client.get(image_status_url(self.astronomy_show.id))
+        self.assertEqual(res.data["image_status"], "failed")
+
+    def stored_originals(self):
+        return [
+            os.path.join(root, name)
+            for root, _, names in os.walk(
+                os.path.join(self.media_root, "uploads", "shows")
+            )
+            for name in names
+        ]
+
+    def test_identical_uploads_share_one_file(self):
+        other_show = sample_astronomy_show(title="other")
+        self.upload(sample_image())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                image_upload_url(other_show.id),
+                {"image": sample_image("copy.png")},
+                format="multipart",
+            )
+        self.upload(sample_image("again.png"))
+
+        self.astronomy_show.refresh_from_db()
+        other_show.refresh_from_db()
+        self.assertEqual(self.astronomy_show.image.name, other_show.image.name)
+        self.assertEqual(len(self.stored_originals()), 1)
+        self.assertTrue(self.astronomy_show.image.name.endswith(".png"))
+
+    @override_settings(PLANETARIUM_MAX_IMAGE_UPLOAD_SIZE=1024)
+    def test_upload_over_size_cap_rejected(self):
+        res = self.upload(sample_image())
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.assertEqual(self.stored_originals(), [])
+        self.astronomy_show.refresh_from_db()
+        self.assertFalse(self.astronomy_show.image)
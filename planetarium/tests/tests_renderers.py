@@ -0,0 +1,92 @@
+import io
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from planetarium.models import AstronomyShow, PlanetariumDome, ShowSession
+from planetarium.renderers import FastJSONParser, FastJSONRenderer
+
+SHOW_SESSION_URL = reverse("planetarium:showsession-list")
+
+
+def sample_payload():
+    return {
+        "id": 1,
+        "show_time": datetime(2024, 12, 6, 18, 0, 0, 123456, pytz.UTC),
+        "date": date(2024, 12, 6),
+        "price": Decimal("12.50"),
+        "title": gettext_lazy("Stars"),
+        "token": uuid.UUID(int=1),
+        "note": "Łuna\u2028line\u2029",
+        "seats": [{"row": 1, "seat": 2}, (3, 4)],
+        "empty": None,
+    }
+
+
+class FastJSONRendererTests(TestCase):
+    def test_output_matches_stdlib_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(sample_payload()),
+            JSONRenderer().render(sample_payload()),
+        )
+
+    def test_indent_falls_back_to_stdlib_renderer(self):
+        media_type = "application/json; indent=4"
+
+        self.assertEqual(
+            FastJSONRenderer().render(sample_payload(), media_type),
+            JSONRenderer().render(sample_payload(), media_type),
+        )
+
+    def test_big_integers_fall_back_to_stdlib_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render({"big": 2 ** 70}),
+            JSONRenderer().render({"big": 2 ** 70}),
+        )
+
+    def test_parser(self):
+        parsed = FastJSONParser().parse(
+            io.BytesIO('{"title": "Łuna", "seats": [1, 2.5]}'.encode())
+        )
+
+        self.assertEqual(parsed, {"title": "Łuna", "seats": [1, 2.5]})
+
+    def test_parser_rejects_invalid_json(self):
+        for body in (b"{", b'{"value": NaN}'):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(body))
+
+
+class RendererSelectionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="test@test.com", password="testpass"
+            )
+        )
+        ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(title="Stars"),
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Dome", rows=5, seats_in_row=5
+            ),
+            show_time=datetime(2024, 12, 6, 18, 0, tzinfo=pytz.UTC),
+        )
+
+    def test_renderers_selectable_per_request(self):
+        fast = self.client.get(SHOW_SESSION_URL)
+        stdlib = self.client.get(SHOW_SESSION_URL, {"format": "stdjson"})
+
+        self.assertIsInstance(fast.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(stdlib.accepted_renderer.format, "stdjson")
+        self.assertEqual(stdlib["Content-Type"], "application/json")
+        self.assertEqual(fast.content, stdlib.content)
@@ -1,8 +1,12 @@
 import pytz
+import threading
+from io import StringIO
 from datetime import datetime
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
@@ -134,6 +138,136 @@ class PrivateReservationTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(Reservation.objects.count(), 0)
 
+    def test_create_reservation_with_boolean_show_session(self):
+        """Test that true is not taken for the show session with id 1"""
+        sample_show_session(id=1)
+        payload = {
+            "tickets": [{"row": 1, "seat": 1, "show_session": True}]
+        }
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("show_session", res.data["tickets"][0])
+        self.assertEqual(Reservation.objects.count(), 0)
+
+    def test_create_reservation_query_count_is_flat(self):
+        """Test that the number of queries does not grow with group size"""
+        show_session = sample_show_session()
+
+        for seats in (2, 10):
+            payload = {
+                "tickets": [
+                    {"row": seats, "seat": seat, "show_session": show_session.id}
+                    for seat in range(1, seats + 1)
+                ]
+            }
+            # The user and reservations throttles count one query each
+            with self.assertNumQueries(14):
+                res = self.client.post(RESERVATION_URL, payload, format="json")
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(Ticket.objects.count(), 12)
+
+    def test_create_reservation_with_duplicated_seat(self):
+        """Test that a seat repeated in one request is rejected"""
+        show_session = sample_show_session()
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "show_session": show_session.id},
+                {"row": 1, "seat": 1, "show_session": show_session.id},
+            ]
+        }
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["tickets"][0], {})
+        self.assertIn("non_field_errors", res.data["tickets"][1])
+        self.assertEqual(Ticket.objects.count(), 0)
+
+    def test_create_reservation_with_taken_seat(self):
+        """Test that an already sold seat is reported as a conflict"""
+        show_session = sample_show_session()
+        sample_ticket(
+            reservation=sample_reservation(user=self.user),
+            show_session=show_session,
+            row=2,
+            seat=3,
+        )
+        payload = {
+            "tickets": [
+                {"row": 2, "seat": 3, "show_session": show_session.id},
+                {"row": 2, "seat": 4, "show_session": show_session.id},
+            ]
+        }
+
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            res.data["seats"],
+            [{"show_session": show_session.id, "row": 2, "seat": 3}],
+        )
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_tickets_sold_counter(self):
+        """Test that reservations and ticket deletion keep the counter"""
+        show_session = sample_show_session()
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "show_session": show_session.id},
+                {"row": 1, "seat": 2, "show_session": show_session.id},
+            ]
+        }
+
+        self.client.post(RESERVATION_URL, payload, format="json")
+        show_session.refresh_from_db()
+        self.assertEqual(show_session.tickets_sold, 2)
+
+        Ticket.objects.first().delete()
+        show_session.refresh_from_db()
+        self.assertEqual(show_session.tickets_sold, 1)
+
+        Reservation.objects.all().delete()
+        show_session.refresh_from_db()
+        self.assertEqual(show_session.tickets_sold, 0)
+
+    def test_tickets_sold_follows_reassigned_ticket(self):
+        """Test that moving a ticket moves its count to the new session"""
+        show_session = sample_show_session()
+        other_session = sample_show_session()
+        sample_ticket(sample_reservation(self.user), show_session)
+
+        ticket = Ticket.objects.get()
+        ticket.show_session = other_session
+        ticket.save()
+        # Saving again counts nothing twice
+        ticket.save()
+
+        show_session.refresh_from_db()
+        other_session.refresh_from_db()
+        self.assertEqual(show_session.tickets_sold, 0)
+        self.assertEqual(other_session.tickets_sold, 1)
+
+        ticket.delete()
+        other_session.refresh_from_db()
+        self.assertEqual(other_session.tickets_sold, 0)
+
+    def test_recount_tickets_sold_command(self):
+        """Test that the recount command repairs a drifted counter"""
+        show_session = sample_show_session()
+        reservation = sample_reservation(user=self.user)
+        sample_ticket(reservation=reservation, show_session=show_session)
+        ShowSession.objects.filter(pk=show_session.pk).update(
+            tickets_sold=42
+        )
+
+        call_command("recount_tickets_sold", stdout=StringIO())
+
+        show_session.refresh_from_db()
+        self.assertEqual(show_session.tickets_sold, 1)
+
     def test_list_reservations(self):
         """Test retrieving a list of reservations"""
         show_session = sample_show_session()
@@ -150,5 +284,96 @@ class PrivateReservationTests(TestCase):
         self.assertEqual(len(res.data['results']), 2)
         self.assertIn('id', res.data['results'][0])
         self.assertIn('tickets', res.data['results'][0])
-        self.assertEqual(len(res.data['results'][0]['tickets']), 2)
-        self.assertEqual(len(res.data['results'][1]['tickets']), 1)
+        # Newest reservations come first
+        self.assertEqual(len(res.data['results'][0]['tickets']), 1)
+        self.assertEqual(len(res.data['results'][1]['tickets']), 2)
+
+    def test_list_reservations_query_count_is_bounded(self):
+        """Test that history queries do not grow with reservations"""
+        show_sessions = [sample_show_session() for _ in range(3)]
+
+        for total in (1, 10, 100):
+            Reservation.objects.all().delete()
+            for index in range(total):
+                reservation = sample_reservation(user=self.user)
+                show_session = show_sessions[index % len(show_sessions)]
+                first_place = index // len(show_sessions) * 2
+                Ticket.objects.bulk_create(
+                    Ticket(
+                        reservation=reservation,
+                        show_session=show_session,
+                        row=place // 15 + 1,
+                        seat=place % 15 + 1,
+                    )
+                    for place in (first_place, first_place + 1)
+                )
+
+            # throttle counter, reservations page, their tickets,
+            # the tickets' sessions
+            with self.assertNumQueries(4):
+                res = self.client.get(RESERVATION_URL)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data["results"]), min(total, 10))
+            ticket = res.data["results"][0]["tickets"][0]
+            self.assertIn("tickets_available", ticket["show_session"])
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    """Hammer one show session from several threads"""
+
+    threads = 8
+
+    def reserve(self, user, seats, results):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            res = client.post(
+                RESERVATION_URL,
+                {
+                    "tickets": [
+                        {
+                            "row": row,
+                            "seat": seat,
+                            "show_session": self.show_session.id,
+                        }
+                        for row, seat in seats
+                    ]
+                },
+                format="json",
+            )
+            results.append(res.status_code)
+        finally:
+            connection.close()
+
+    def test_concurrent_reservations_of_the_same_seat(self):
+        self.show_session = sample_show_session()
+        users = [
+            sample_user(email=f"user{index}@test.com", password="testpass")
+            for index in range(self.threads)
+        ]
+        results = []
+        workers = [
+            threading.Thread(
+                target=self.reserve,
+                args=(user, [(1, 1), (2, index + 1)], results),
+            )
+            for index, user in enumerate(users)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(len(results), self.threads)
+        self.assertEqual(results.count(status.HTTP_201_CREATED), 1)
+        self.assertEqual(
+            results.count(status.HTTP_409_CONFLICT), self.threads - 1
+        )
+        self.assertEqual(
+            Ticket.objects.filter(row=1, seat=1).count(), 1
+        )
+        self.show_session.refresh_from_db()
+        self.assertEqual(
+            self.show_session.tickets_sold, Ticket.objects.count()
+        )
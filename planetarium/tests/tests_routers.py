@@ -0,0 +1,201 @@
+from datetime import datetime
+from unittest import mock
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils.functional import SimpleLazyObject
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+from planetarium.routers import (
+    PIN_COOKIE,
+    ReplicaLag,
+    ReplicaRouter,
+    ReplicaRoutingMiddleware,
+    replica_lag,
+)
+
+
+@override_settings(PLANETARIUM_READ_REPLICAS=["replica"])
+@mock.patch.object(ReplicaLag, "measure", return_value=0)
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        replica_lag.reset()
+        caches["default"].clear()
+
+    def route(self, request, view=None):
+        """Databases the router picks during request, and the response"""
+        decisions = {}
+
+        def get_response(request):
+            for model in (ShowSession, AstronomyShow, Ticket, Reservation):
+                decisions[model] = self.router.db_for_read(model)
+            if view is not None:
+                view(request)
+                decisions["after_view"] = self.router.db_for_read(
+                    ShowSession
+                )
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(get_response)(request)
+        return decisions, response
+
+    def test_safe_catalog_reads_go_to_replica(self, measure):
+        decisions, response = self.route(self.factory.get("/"))
+
+        self.assertEqual(decisions[ShowSession], "replica")
+        self.assertEqual(decisions[AstronomyShow], "replica")
+        self.assertEqual(decisions[Ticket], "default")
+        self.assertEqual(decisions[Reservation], "default")
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_unsafe_requests_read_from_primary(self, measure):
+        decisions, _ = self.route(self.factory.post("/"))
+
+        self.assertEqual(decisions[ShowSession], "default")
+
+    def test_write_pins_client_to_primary(self, measure):
+        request = self.factory.get("/")
+        request.user = self.user
+
+        decisions, response = self.route(
+            request, view=lambda request: self.router.db_for_write(Ticket)
+        )
+
+        self.assertEqual(decisions[ShowSession], "replica")
+        self.assertEqual(decisions["after_view"], "default")
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], 5)
+        self.assertTrue(cookie["httponly"])
+
+    def test_pin_cookie_reads_from_primary(self, measure):
+        request = self.factory.get("/")
+        request.COOKIES[PIN_COOKIE] = "1"
+
+        decisions, _ = self.route(request)
+
+        self.assertEqual(decisions[ShowSession], "default")
+
+    def test_pin_is_per_client_without_pin_cache(self, measure):
+        request = self.factory.post("/")
+        request.user = self.user
+        self.route(
+            request, view=lambda request: self.router.db_for_write(Ticket)
+        )
+
+        request = self.factory.get("/")
+        request.user = self.user
+        decisions, _ = self.route(request)
+        self.assertEqual(decisions[ShowSession], "replica")
+
+    @override_settings(PLANETARIUM_PRIMARY_PIN_CACHE="default")
+    def test_pinned_user_reads_from_primary(self, measure):
+        request = self.factory.post("/")
+        request.user = self.user
+        self.route(
+            request, view=lambda request: self.router.db_for_write(Ticket)
+        )
+
+        # Another client of the same user, without the cookie
+        request = self.factory.get("/")
+        request.user = self.user
+        decisions, _ = self.route(request)
+        self.assertEqual(decisions[ShowSession], "default")
+
+        request = self.factory.get("/")
+        request.user = AnonymousUser()
+        decisions, _ = self.route(request)
+        self.assertEqual(decisions[ShowSession], "replica")
+
+    def test_unauthenticated_lazy_user_is_not_resolved(self, measure):
+        get_user = mock.Mock(return_value=self.user)
+        request = self.factory.get("/")
+        request.user = SimpleLazyObject(get_user)
+
+        decisions, _ = self.route(request)
+
+        self.assertEqual(decisions[ShowSession], "replica")
+        get_user.assert_not_called()
+
+    def test_reads_outside_requests_go_to_primary(self, measure):
+        self.assertEqual(self.router.db_for_read(ShowSession), "default")
+        self.assertEqual(self.router.db_for_write(ShowSession), "default")
+
+    def test_lagging_replica_gets_no_reads(self, measure):
+        measure.return_value = 30
+
+        decisions, _ = self.route(self.factory.get("/"))
+
+        self.assertEqual(decisions[ShowSession], "default")
+        measure.assert_called_once_with("replica")
+
+    def test_unreachable_replica_gets_no_reads(self, measure):
+        measure.return_value = None
+
+        decisions, _ = self.route(self.factory.get("/"))
+
+        self.assertEqual(decisions[ShowSession], "default")
+
+    def test_migrations_only_on_primary(self, measure):
+        self.assertTrue(self.router.allow_migrate("default", "planetarium"))
+        self.assertFalse(self.router.allow_migrate("replica", "planetarium"))
+
+
+@override_settings(PLANETARIUM_READ_REPLICAS=["default"])
+class ReplicaRoutingApiTests(TestCase):
+    """The test database stands in for its own replica"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        dome = PlanetariumDome.objects.create(
+            name="Blue", rows=10, seats_in_row=10
+        )
+        show = AstronomyShow.objects.create(title="Stars")
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=show,
+            planetarium_dome=dome,
+            show_time=datetime(2024, 12, 6, 18, 0, tzinfo=pytz.UTC),
+        )
+        replica_lag.reset()
+        caches["default"].clear()
+
+    def test_reads_do_not_pin(self):
+        response = self.client.get(reverse("planetarium:showsession-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_reservation_pins_client(self):
+        response = self.client.post(
+            reverse("planetarium:reservation-list"),
+            {
+                "tickets": [
+                    {"row": 1, "seat": 1, "show_session": self.show_session.id}
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(PIN_COOKIE, response.cookies)
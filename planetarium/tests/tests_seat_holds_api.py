@@ -0,0 +1,196 @@
+from datetime import datetime
+from io import StringIO
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    SeatHold,
+    ShowSession,
+    Ticket,
+)
+
+RESERVATION_URL = reverse("planetarium:reservation-list")
+
+
+def holds_url(show_session_id):
+    return reverse("planetarium:showsession-holds", args=(show_session_id,))
+
+
+def seats_url(show_session_id):
+    return reverse("planetarium:showsession-seats", args=(show_session_id,))
+
+
+def sample_user(**params):
+    """Create and return a sample user"""
+    return get_user_model().objects.create_user(**params)
+
+
+def sample_show_session(**params):
+    defaults = {
+        "astronomy_show": AstronomyShow.objects.create(title="Sample Show"),
+        "planetarium_dome": PlanetariumDome.objects.create(
+            name="Sample Dome", rows=10, seats_in_row=15
+        ),
+        "show_time": datetime(2024, 12, 6, 18, 0, tzinfo=pytz.UTC),
+    }
+    defaults.update(params)
+    return ShowSession.objects.create(**defaults)
+
+
+class SeatHoldTests(TestCase):
+    """Test temporary seat holds"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user(email="test@test.com", password="testpass")
+        self.other = sample_user(email="other@test.com", password="testpass")
+        self.client.force_authenticate(self.user)
+        self.show_session = sample_show_session()
+
+    def place_hold(self, *seats):
+        return self.client.post(
+            holds_url(self.show_session.id),
+            {"seats": [{"row": row, "seat": seat} for row, seat in seats]},
+            format="json",
+        )
+
+    def test_place_hold(self):
+        res = self.place_hold((1, 1), (1, 2))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn("token", res.data)
+        self.assertEqual(
+            res.data["seats"],
+            [{"row": 1, "seat": 1}, {"row": 1, "seat": 2}],
+        )
+        self.assertEqual(SeatHold.objects.count(), 2)
+
+        res = self.client.get(seats_url(self.show_session.id))
+        self.assertEqual(res.data["held_count"], 2)
+        self.assertEqual(res.data["taken_count"], 0)
+
+    def test_place_hold_out_of_range(self):
+        res = self.place_hold((11, 1))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_held_seat_conflict(self):
+        self.place_hold((1, 1))
+        self.client.force_authenticate(self.other)
+
+        res = self.place_hold((1, 1), (1, 2))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            res.data["seats"],
+            [{"show_session": self.show_session.id, "row": 1, "seat": 1}],
+        )
+        self.assertEqual(SeatHold.objects.count(), 1)
+
+    def test_reserve_seat_held_by_another_user(self):
+        self.place_hold((1, 1))
+        self.client.force_authenticate(self.other)
+
+        res = self.client.post(
+            RESERVATION_URL,
+            {
+                "tickets": [
+                    {"row": 1, "seat": 1, "show_session": self.show_session.id}
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Ticket.objects.count(), 0)
+
+    def test_reserve_from_hold(self):
+        token = self.place_hold((2, 3), (2, 4)).data["token"]
+
+        res = self.client.post(RESERVATION_URL, {"hold": token}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        reservation = Reservation.objects.get(id=res.data["id"])
+        self.assertEqual(
+            list(reservation.tickets.values_list("row", "seat")),
+            [(2, 3), (2, 4)],
+        )
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_reserve_from_hold_of_another_user(self):
+        token = self.place_hold((2, 3)).data["token"]
+        self.client.force_authenticate(self.other)
+
+        res = self.client.post(RESERVATION_URL, {"hold": token}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Ticket.objects.count(), 0)
+
+    @override_settings(PLANETARIUM_SEAT_HOLD_TTL=-1)
+    def test_expired_holds_are_reaped(self):
+        token = self.place_hold((1, 1)).data["token"]
+
+        res = self.client.post(RESERVATION_URL, {"hold": token}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        call_command("reap_seat_holds", stdout=StringIO())
+        self.assertFalse(SeatHold.objects.exists())
+
+
+@override_settings(
+    PLANETARIUM_SEAT_HOLD_STORE="planetarium.holds.CacheSeatHoldStore"
+)
+class CacheSeatHoldStoreTests(SeatHoldTests):
+    """Run the seat hold tests against the local cache store"""
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def test_place_hold(self):
+        res = self.place_hold((1, 1), (1, 2))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(SeatHold.objects.exists())
+        res = self.client.get(seats_url(self.show_session.id))
+        self.assertEqual(res.data["held_count"], 2)
+
+    def test_held_seat_conflict(self):
+        self.place_hold((1, 1))
+        self.client.force_authenticate(self.other)
+
+        res = self.place_hold((1, 1), (1, 2))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(len(res.data["seats"]), 1)
+
+    def test_reserve_from_hold(self):
+        token = self.place_hold((2, 3), (2, 4)).data["token"]
+
+        res = self.client.post(RESERVATION_URL, {"hold": token}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = self.client.get(seats_url(self.show_session.id))
+        self.assertEqual(res.data["held_count"], 0)
+        self.assertEqual(res.data["taken_count"], 2)
+
+    @override_settings(PLANETARIUM_SEAT_HOLD_TTL=-1)
+    def test_expired_holds_are_reaped(self):
+        """Expiry is handled by the cache timeout"""
+        token = self.place_hold((1, 1)).data["token"]
+
+        res = self.client.post(RESERVATION_URL, {"hold": token}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(seats_url(self.show_session.id))
+        self.assertEqual(res.data["held_count"], 0)
@@ -0,0 +1,94 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.test import TestCase
+
+from planetarium.benchmarks import rolled_back
+from planetarium.models import ShowSession, Ticket
+
+
+class SeedPlanetariumTests(TestCase):
+    def seed(self, *args):
+        call_command(
+            "seed_planetarium",
+            "--domes=2",
+            "--shows=4",
+            "--themes=3",
+            "--users=5",
+            "--days=2",
+            "--sessions-per-day=3",
+            "--batch-size=50",
+            *args,
+            stdout=StringIO(),
+        )
+
+    @staticmethod
+    def snapshot():
+        return list(
+            Ticket.objects.order_by(
+                "show_session__show_time",
+                "show_session__planetarium_dome__name",
+                "row",
+                "seat",
+            ).values_list(
+                "show_session__show_time",
+                "show_session__planetarium_dome__name",
+                "show_session__astronomy_show__title",
+                "row",
+                "seat",
+                "reservation__user__email",
+            )
+        )
+
+    def test_same_seed_produces_same_data(self):
+        snapshots = []
+        for seed in ("--seed=1", "--seed=1", "--seed=2"):
+            with rolled_back():
+                self.seed(seed)
+                snapshots.append(self.snapshot())
+
+        self.assertTrue(snapshots[0])
+        self.assertEqual(snapshots[0], snapshots[1])
+        self.assertNotEqual(snapshots[0], snapshots[2])
+
+    def test_seats_do_not_collide_and_match_fill_ratio(self):
+        self.seed("--fill-ratio=0.5")
+
+        sessions = ShowSession.objects.select_related("planetarium_dome")
+        self.assertEqual(sessions.count(), 2 * 2 * 3)
+        for session in sessions:
+            dome = session.planetarium_dome
+            self.assertEqual(
+                session.tickets_sold, round(dome.capacity * 0.5)
+            )
+            self.assertEqual(session.tickets.count(), session.tickets_sold)
+        self.assertFalse(
+            Ticket.objects.values("show_session", "row", "seat")
+            .annotate(count=Count("id"))
+            .filter(count__gt=1)
+            .exists()
+        )
+        self.assertFalse(
+            Ticket.objects.filter(
+                row__gt=F("show_session__planetarium_dome__rows")
+            ).exists()
+        )
+        self.assertFalse(
+            Ticket.objects.filter(
+                seat__gt=F("show_session__planetarium_dome__seats_in_row")
+            ).exists()
+        )
+
+    def test_seeding_twice_reuses_users(self):
+        self.seed()
+        self.seed("--seed=1")
+
+        self.assertEqual(get_user_model().objects.count(), 5)
+        self.assertEqual(ShowSession.objects.count(), 2 * 2 * 2 * 3)
+
+    def test_invalid_fill_ratio_rejected(self):
+        with self.assertRaises(CommandError):
+            self.seed("--fill-ratio=1.5")
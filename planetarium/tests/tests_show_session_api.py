@@ -1,14 +1,29 @@
+import base64
+import pytz
 from datetime import datetime
+from io import StringIO
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
-from planetarium.models import ShowSession, AstronomyShow, PlanetariumDome
+from planetarium.cache import get_cache
+from planetarium.models import (
+    ShowSession,
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    Ticket,
+)
 from planetarium.serializers import ShowSessionListSerializer
 
 SHOW_SESSION_URL = reverse("planetarium:showsession-list")
+CALENDAR_URL = reverse("planetarium:showsession-calendar")
+BULK_URL = reverse("planetarium:showsession-bulk")
 
 
 def sample_user(is_staff=False, **params):
@@ -69,6 +84,7 @@ class PrivateShowSessionTests(TestCase):
         self.client = APIClient()
         self.user = sample_user(email="test@test.com", password="testpass")
         self.client.force_authenticate(self.user)
+        get_cache().clear()
 
     def test_retrieve_showsessions(self):
         """Test retrieving a list of ShowSessions"""
@@ -84,7 +100,9 @@ class PrivateShowSessionTests(TestCase):
         show_sessions = ShowSession.objects.all()
         serializer = ShowSessionListSerializer(show_sessions, many=True)
 
-        res_data_sorted = sorted(res.data, key=lambda x: x['id'])
+        res_data_sorted = sorted(
+            res.data["results"], key=lambda x: x['id']
+        )
         serializer_data_sorted = sorted(serializer.data, key=lambda x: x['id'])
 
         for item in res_data_sorted:
@@ -92,3 +110,553 @@ class PrivateShowSessionTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res_data_sorted, serializer_data_sorted)
+
+    def test_list_cache_invalidated_by_reservation(self):
+        """Test that a sold ticket never leaves stale availability"""
+        show_session = sample_show_session()
+        self.client.get(SHOW_SESSION_URL)
+        res = self.client.get(SHOW_SESSION_URL)
+        self.assertEqual(res["X-Cache"], "HIT")
+
+        self.client.post(
+            reverse("planetarium:reservation-list"),
+            {
+                "tickets": [
+                    {"row": 1, "seat": 1, "show_session": show_session.id}
+                ]
+            },
+            format="json",
+        )
+        res = self.client.get(SHOW_SESSION_URL)
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(
+            res.data["results"][0]["tickets_available"],
+            show_session.planetarium_dome.capacity - 1,
+        )
+
+
+def seats_url(show_session_id):
+    return reverse("planetarium:showsession-seats", args=(show_session_id,))
+
+
+class ShowSessionSeatMapTests(TestCase):
+    """Test the compact seat map endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user(email="test@test.com", password="testpass")
+        self.client.force_authenticate(self.user)
+        self.show_session = sample_show_session(
+            planetarium_dome=sample_planetarium_dome(rows=2, seats_in_row=5)
+        )
+        reservation = Reservation.objects.create(user=self.user)
+        for row, seat in ((1, 1), (1, 2), (2, 5)):
+            Ticket.objects.create(
+                row=row,
+                seat=seat,
+                show_session=self.show_session,
+                reservation=reservation,
+            )
+
+    def test_seat_map_bitmap(self):
+        res = self.client.get(seats_url(self.show_session.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["rows"], 2)
+        self.assertEqual(res.data["seats_in_row"], 5)
+        self.assertEqual(res.data["taken_count"], 3)
+        bits = base64.b64decode(res.data["taken"])
+        self.assertEqual(bits, bytes([0b00000011, 0b00000010]))
+
+    def test_seat_map_run_length(self):
+        res = self.client.get(
+            seats_url(self.show_session.id), {"encoding": "rle"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["taken"], [[[1, 2]], [[5, 1]]])
+
+    def test_seat_map_etag_revalidation(self):
+        res = self.client.get(seats_url(self.show_session.id))
+        etag = res["ETag"]
+
+        res = self.client.get(
+            seats_url(self.show_session.id), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Ticket.objects.create(
+            row=2,
+            seat=1,
+            show_session=self.show_session,
+            reservation=Reservation.objects.create(user=self.user),
+        )
+        res = self.client.get(
+            seats_url(self.show_session.id), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_seat_map_invalid_encoding(self):
+        res = self.client.get(
+            seats_url(self.show_session.id), {"encoding": "png"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ShowSessionPaginationTests(TestCase):
+    """Test keyset pagination of the show session list"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user(email="test@test.com", password="testpass")
+        self.client.force_authenticate(self.user)
+        get_cache().clear()
+
+    def test_walk_pages_with_cursor(self):
+        dome = sample_planetarium_dome()
+        show = sample_astronomy_show()
+        for day in range(1, 6):
+            sample_show_session(
+                astronomy_show=show,
+                planetarium_dome=dome,
+                show_time=datetime(2024, 12, day, 18, 0, tzinfo=pytz.UTC),
+            )
+
+        ids = []
+        res = self.client.get(SHOW_SESSION_URL, {"page_size": 2})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data["results"]), 2)
+            ids.extend(item["id"] for item in res.data["results"])
+            if not res.data["next"]:
+                break
+            res = self.client.get(res.data["next"])
+
+        expected = list(
+            ShowSession.objects.order_by("-show_time", "id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_walk_tied_show_times_without_offset(self):
+        show = sample_astronomy_show()
+        for index in range(5):
+            sample_show_session(
+                astronomy_show=show,
+                planetarium_dome=sample_planetarium_dome(name=f"{index}"),
+                show_time=datetime(2024, 12, 6, 18, 0, tzinfo=pytz.UTC),
+            )
+        expected = list(
+            ShowSession.objects.order_by("-show_time", "id")
+            .values_list("id", flat=True)
+        )
+
+        pages = [self.client.get(SHOW_SESSION_URL, {"page_size": 2})]
+        while pages[-1].data["next"]:
+            with CaptureQueriesContext(connection) as queries:
+                pages.append(self.client.get(pages[-1].data["next"]))
+            self.assertFalse(
+                any("OFFSET" in query["sql"] for query in queries)
+            )
+        self.assertEqual(
+            [item["id"] for page in pages for item in page.data["results"]],
+            expected,
+        )
+
+        res = self.client.get(pages[-1].data["previous"])
+        self.assertEqual(
+            [item["id"] for item in res.data["results"]], expected[2:4]
+        )
+
+
+class ShowSessionFastListTests(TestCase):
+    """Test the fast list serializer matches ShowSessionListSerializer"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user(email="test@test.com", password="testpass")
+        self.client.force_authenticate(self.user)
+
+    def test_fast_list_serializer_parity(self):
+        dome = sample_planetarium_dome(rows=4, seats_in_row=6)
+        shows = [
+            sample_astronomy_show(title="No image"),
+            sample_astronomy_show(title="Original", image="uploads/a.png"),
+            sample_astronomy_show(
+                title="Variant",
+                image="uploads/b.png",
+                image_small="uploads/variants/b-small.webp",
+            ),
+        ]
+        for day in range(1, 8):
+            show_session = sample_show_session(
+                astronomy_show=shows[day % 3],
+                planetarium_dome=dome,
+                show_time=datetime(2024, 12, day, 18, 0, tzinfo=pytz.UTC),
+            )
+        reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.create(
+            row=1, seat=1, show_session=show_session, reservation=reservation
+        )
+
+        for params in ({"page_size": 3}, {"date": "2024-12-07"}):
+            responses = []
+            for fast in (False, True):
+                get_cache().clear()
+                with self.settings(PLANETARIUM_FAST_LIST_SERIALIZERS=fast):
+                    res = self.client.get(SHOW_SESSION_URL, params)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                responses.append(res.content)
+            self.assertEqual(responses[0], responses[1])
+
+    @override_settings(PLANETARIUM_FAST_LIST_SERIALIZERS=True)
+    def test_fast_list_pagination_walk(self):
+        dome = sample_planetarium_dome()
+        show = sample_astronomy_show()
+        for day in range(1, 6):
+            sample_show_session(
+                astronomy_show=show,
+                planetarium_dome=dome,
+                show_time=datetime(2024, 12, day, 18, 0, tzinfo=pytz.UTC),
+            )
+
+        ids = []
+        url = SHOW_SESSION_URL + "?page_size=2"
+        while url:
+            res = self.client.get(url)
+            ids.extend(item["id"] for item in res.data["results"])
+            url = res.data["next"]
+
+        self.assertEqual(
+            ids,
+            list(
+                ShowSession.objects.order_by("-show_time").values_list(
+                    "id", flat=True
+                )
+            ),
+        )
+
+
+class ShowSessionScheduleFilterTests(TestCase):
+    """Test date range and dome filters of the show session list"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user(email="test@test.com", password="testpass")
+        self.client.force_authenticate(self.user)
+        self.dome = sample_planetarium_dome()
+        self.show = sample_astronomy_show()
+        self.sessions = [
+            sample_show_session(
+                astronomy_show=self.show,
+                planetarium_dome=self.dome,
+                show_time=show_time,
+            )
+            for show_time in (
+                datetime(2024, 12, 5, 23, 59, tzinfo=pytz.UTC),
+                datetime(2024, 12, 6, 0, 0, tzinfo=pytz.UTC),
+                datetime(2024, 12, 6, 23, 59, tzinfo=pytz.UTC),
+                datetime(2024, 12, 7, 0, 0, tzinfo=pytz.UTC),
+            )
+        ]
+
+    def result_ids(self, params):
+        res = self.client.get(SHOW_SESSION_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return sorted(item["id"] for item in res.data["results"])
+
+    def test_filter_by_date(self):
+        self.assertEqual(
+            self.result_ids({"date": "2024-12-06"}),
+            [self.sessions[1].id, self.sessions[2].id],
+        )
+
+    def test_filter_by_date_range(self):
+        self.assertEqual(
+            self.result_ids(
+                {"date_from": "2024-12-06", "date_to": "2024-12-07"}
+            ),
+            [session.id for session in self.sessions[1:]],
+        )
+        self.assertEqual(
+            self.result_ids({"date_to": "2024-12-05"}),
+            [self.sessions[0].id],
+        )
+
+    def test_filter_by_planetarium_dome(self):
+        other = sample_show_session()
+
+        self.assertEqual(
+            self.result_ids({"planetarium_dome": other.planetarium_dome_id}),
+            [other.id],
+        )
+
+    def test_invalid_date(self):
+        res = self.client.get(SHOW_SESSION_URL, {"date": "06.12.2024"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_date_filter_uses_schedule_index(self):
+        queryset = ShowSession.objects.on_dates(
+            datetime(2024, 12, 6).date(), datetime(2024, 12, 6).date()
+        )
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+
+        self.assertIn("showsession_time_show_idx", plan)
+
+    def test_dome_filter_uses_schedule_index(self):
+        queryset = ShowSession.objects.filter(
+            planetarium_dome=self.dome
+        ).on_dates(datetime(2024, 12, 6).date())
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+
+        self.assertIn("showsession_dome_time_idx", plan)
+
+
+class ShowSessionCalendarTests(TestCase):
+    """Test the month calendar of show sessions"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user(email="test@test.com", password="testpass")
+        self.client.force_authenticate(self.user)
+        self.show = sample_astronomy_show()
+        self.small_dome = sample_planetarium_dome(
+            name="Small", rows=2, seats_in_row=5
+        )
+        self.large_dome = sample_planetarium_dome(
+            name="Large", rows=10, seats_in_row=10
+        )
+        for dome, show_time in (
+            (self.small_dome, datetime(2024, 11, 30, 20, 0, tzinfo=pytz.UTC)),
+            (self.small_dome, datetime(2024, 12, 6, 12, 0, tzinfo=pytz.UTC)),
+            (self.small_dome, datetime(2024, 12, 6, 18, 0, tzinfo=pytz.UTC)),
+            (self.large_dome, datetime(2024, 12, 6, 10, 0, tzinfo=pytz.UTC)),
+            (self.large_dome, datetime(2024, 12, 31, 23, 0, tzinfo=pytz.UTC)),
+            (self.large_dome, datetime(2025, 1, 1, 0, 0, tzinfo=pytz.UTC)),
+        ):
+            sample_show_session(
+                astronomy_show=self.show,
+                planetarium_dome=dome,
+                show_time=show_time,
+            )
+        self.session = ShowSession.objects.get(
+            show_time=datetime(2024, 12, 6, 12, 0, tzinfo=pytz.UTC)
+        )
+        get_cache().clear()
+
+    def test_calendar_groups_by_day_and_dome(self):
+        reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.create(
+            row=1, seat=1, show_session=self.session, reservation=reservation
+        )
+
+        res = self.client.get(CALENDAR_URL, {"month": "2024-12"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["month"], "2024-12")
+        days = res.data["days"]
+        self.assertEqual(
+            [day["date"] for day in days], ["2024-12-06", "2024-12-31"]
+        )
+        self.assertEqual(days[0]["sessions"], 3)
+        self.assertEqual(days[0]["tickets_available"], 10 + 9 + 100)
+        self.assertEqual(days[0]["first_show_time"], "2024-12-06T10:00:00Z")
+        self.assertEqual(days[0]["last_show_time"], "2024-12-06T18:00:00Z")
+        self.assertEqual(
+            [
+                (
+                    dome["planetarium_dome_name"],
+                    dome["sessions"],
+                    dome["tickets_available"],
+                )
+                for dome in days[0]["domes"]
+            ],
+            [("Small", 2, 19), ("Large", 1, 100)],
+        )
+        self.assertEqual(days[1]["sessions"], 1)
+
+    def test_calendar_runs_one_query(self):
+        self.client.get(CALENDAR_URL, {"month": "2024-12"})
+
+        # The throttle counter and the calendar
+        with self.assertNumQueries(2):
+            res = self.client.get(CALENDAR_URL, {"month": "2024-11"})
+
+        self.assertEqual(len(res.data["days"]), 1)
+
+    def test_calendar_is_cached_and_invalidated(self):
+        res = self.client.get(CALENDAR_URL, {"month": "2024-12"})
+        self.assertEqual(res["X-Cache"], "MISS")
+
+        # Only the throttle counter
+        with self.assertNumQueries(1):
+            res = self.client.get(CALENDAR_URL, {"month": "2024-12"})
+        self.assertEqual(res["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation = Reservation.objects.create(user=self.user)
+            Ticket.objects.create(
+                row=2,
+                seat=5,
+                show_session=self.session,
+                reservation=reservation,
+            )
+        res = self.client.get(CALENDAR_URL, {"month": "2024-12"})
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["days"][0]["tickets_available"], 119)
+
+    def test_calendar_requires_valid_month(self):
+        for params in ({}, {"month": "2024-13"}, {"month": "12.2024"}):
+            res = self.client.get(CALENDAR_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ShowSessionBulkTests(TestCase):
+    """Test weekly recurrence rules expanded into show sessions"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user(
+            email="admin@test.com", password="testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        get_cache().clear()
+        self.astronomy_show = sample_astronomy_show()
+        self.planetarium_dome = sample_planetarium_dome()
+
+    def rule(self, **params):
+        # Mondays and Fridays of two weeks, 2024-12-02 is a Monday
+        rule = {
+            "astronomy_show": self.astronomy_show.id,
+            "planetarium_dome": self.planetarium_dome.id,
+            "weekdays": [0, 4],
+            "times": ["20:30", "18:00"],
+            "date_from": "2024-12-02",
+            "date_to": "2024-12-15",
+        }
+        rule.update(params)
+        return rule
+
+    def test_bulk_create(self):
+        self.client.get(SHOW_SESSION_URL)
+
+        res = self.client.post(BULK_URL, self.rule(), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(res.data["dry_run"])
+        self.assertEqual(res.data["count"], 8)
+        self.assertEqual(
+            [session["show_time"] for session in res.data["show_sessions"]][
+                :3
+            ],
+            [
+                "2024-12-02T18:00:00Z",
+                "2024-12-02T20:30:00Z",
+                "2024-12-06T18:00:00Z",
+            ],
+        )
+        self.assertEqual(
+            sorted(session["id"] for session in res.data["show_sessions"]),
+            list(
+                ShowSession.objects.order_by("id").values_list(
+                    "id", flat=True
+                )
+            ),
+        )
+        # bulk_create sends no signals, the list cache is still dropped
+        res = self.client.get(SHOW_SESSION_URL)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(len(res.data["results"]), 8)
+
+    def test_dry_run(self):
+        res = self.client.post(
+            BULK_URL, self.rule(dry_run=True), format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data["dry_run"])
+        self.assertEqual(res.data["count"], 8)
+        self.assertIsNone(res.data["show_sessions"][0]["id"])
+        self.assertFalse(ShowSession.objects.exists())
+
+    def test_conflict_rejects_whole_batch(self):
+        ShowSession.objects.create(
+            astronomy_show=sample_astronomy_show(title="Other"),
+            planetarium_dome=self.planetarium_dome,
+            show_time=datetime(2024, 12, 9, 20, 30, tzinfo=pytz.UTC),
+        )
+
+        for dry_run in (True, False):
+            res = self.client.post(
+                BULK_URL, self.rule(dry_run=dry_run), format="json"
+            )
+            self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+            self.assertEqual(
+                res.data["show_times"], ["2024-12-09T20:30:00Z"]
+            )
+        self.assertEqual(ShowSession.objects.count(), 1)
+
+    @override_settings(PLANETARIUM_BULK_SCHEDULE_LIMIT=4)
+    def test_invalid_rules(self):
+        for params in (
+            {"date_to": "2024-12-01"},
+            {"weekdays": [7]},
+            {"weekdays": []},
+            {"times": []},
+            {"weekdays": [2], "date_to": "2024-12-03"},
+            {"date_to": "2024-12-31"},
+        ):
+            with self.subTest(**params):
+                res = self.client.post(
+                    BULK_URL, self.rule(**params), format="json"
+                )
+                self.assertEqual(
+                    res.status_code, status.HTTP_400_BAD_REQUEST
+                )
+        self.assertFalse(ShowSession.objects.exists())
+
+    def test_staff_only(self):
+        self.client.force_authenticate(
+            sample_user(email="user@test.com", password="testpass")
+        )
+
+        res = self.client.post(BULK_URL, self.rule(), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_command(self):
+        rule = self.rule()
+        args = [
+            "schedule_show_sessions",
+            "--show", str(rule["astronomy_show"]),
+            "--dome", str(rule["planetarium_dome"]),
+            "--weekdays", "0", "4",
+            "--times", *rule["times"],
+            "--date-from", rule["date_from"],
+            "--date-to", rule["date_to"],
+        ]
+
+        out = StringIO()
+        call_command(*args, "--dry-run", stdout=out)
+        self.assertIn("Would create 8 show session(s)", out.getvalue())
+        self.assertIn("2024-12-13T20:30:00+00:00", out.getvalue())
+        self.assertFalse(ShowSession.objects.exists())
+
+        call_command(*args, stdout=StringIO())
+        self.assertEqual(ShowSession.objects.count(), 8)
+
+        with self.assertRaises(CommandError):
+            call_command(*args, stdout=StringIO())
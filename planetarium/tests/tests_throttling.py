@@ -0,0 +1,130 @@
+from datetime import datetime
+from unittest import mock
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from planetarium.models import AstronomyShow, PlanetariumDome, ShowSession
+from planetarium.throttling import (
+    CacheThrottleStore,
+    DatabaseThrottleStore,
+    ScopedRateThrottle,
+    UserRateThrottle,
+)
+
+RESERVATION_URL = reverse("planetarium:reservation-list")
+
+
+class ThrottleStoreTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+
+    def stores(self):
+        for store in (DatabaseThrottleStore(), CacheThrottleStore()):
+            with self.subTest(type(store).__name__):
+                yield store
+
+    def test_counts_roll_into_previous_period(self):
+        for store in self.stores():
+            self.assertEqual(tuple(store.hit("key", 10, 60)), (0, 1))
+            self.assertEqual(tuple(store.hit("key", 10, 60)), (0, 2))
+            self.assertEqual(tuple(store.hit("key", 11, 60)), (2, 1))
+            self.assertEqual(tuple(store.hit("other", 11, 60)), (0, 1))
+            # A skipped period leaves nothing to weigh in
+            self.assertEqual(tuple(store.hit("key", 13, 60)), (0, 1))
+
+    def test_undo(self):
+        for store in self.stores():
+            store.hit("key", 10, 60)
+            store.hit("key", 10, 60)
+            store.undo("key", 10)
+            self.assertEqual(tuple(store.hit("key", 10, 60)), (0, 2))
+
+
+@mock.patch.dict(UserRateThrottle.THROTTLE_RATES, {"user": "4/min"})
+class SlidingWindowRateThrottleTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.request = RequestFactory().get("/")
+        self.request.user = self.user
+
+    def allow(self, now):
+        throttle = UserRateThrottle()
+        throttle.timer = lambda: now
+        return throttle, throttle.allow_request(self.request, None)
+
+    def test_limit_within_period(self):
+        for _ in range(4):
+            self.assertTrue(self.allow(600)[1])
+
+        throttle, allowed = self.allow(615)
+        self.assertFalse(allowed)
+        # Back when the previous period weighs 3 / 4 at most
+        self.assertAlmostEqual(throttle.wait(), 45 + 15)
+
+    def test_previous_period_is_weighted(self):
+        for _ in range(4):
+            self.allow(600)
+
+        # Half of the previous period is still inside the window
+        self.assertTrue(self.allow(690)[1])
+        self.assertTrue(self.allow(690)[1])
+        throttle, allowed = self.allow(690)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 15)
+
+        # Rejected requests are not counted
+        self.assertTrue(self.allow(705)[1])
+
+
+@mock.patch.dict(
+    ScopedRateThrottle.THROTTLE_RATES, {"reservations": "1/hour"}
+)
+class ReservationThrottleTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        dome = PlanetariumDome.objects.create(
+            name="Blue", rows=10, seats_in_row=10
+        )
+        show = AstronomyShow.objects.create(title="Stars")
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=show,
+            planetarium_dome=dome,
+            show_time=datetime(2024, 12, 6, 18, 0, tzinfo=pytz.UTC),
+        )
+
+    def reserve(self, seat):
+        return self.client.post(
+            RESERVATION_URL,
+            {
+                "tickets": [
+                    {
+                        "row": 1,
+                        "seat": seat,
+                        "show_session": self.show_session.id,
+                    }
+                ]
+            },
+            format="json",
+        )
+
+    def test_reservations_have_stricter_rate(self):
+        self.assertEqual(self.reserve(1).status_code, status.HTTP_201_CREATED)
+
+        res = self.reserve(2)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", res)
+
+        res = self.client.get(RESERVATION_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
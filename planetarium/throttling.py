@@ -0,0 +1,207 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import OperationalError, connections, router
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework import throttling
+
+from planetarium.models import RateLimitCounter
+
+
+class BaseThrottleStore(ABC):
+    @abstractmethod
+    def hit(self, key, period, duration):
+        """Count a request in period, return (previous, current) counts
+
+        None when the counter cannot be written right now, the request
+        is let through rather than failed by the limiter.
+        """
+
+    @abstractmethod
+    def undo(self, key, period):
+        """Take back a request counted in period"""
+
+    @abstractmethod
+    def clear(self):
+        """Forget every counter"""
+
+
+class DatabaseThrottleStore(BaseThrottleStore):
+    """Counters in the RateLimitCounter table, shared by every process
+
+    One row per key. The statement that counts a request also moves the
+    row to a new period, one atomic round trip per request. A row locked
+    for too long, like SQLite with concurrent writers, counts nothing.
+    """
+
+    def hit(self, key, period, duration):
+        connection = connections[router.db_for_write(RateLimitCounter)]
+        quote = connection.ops.quote_name
+        table = quote(RateLimitCounter._meta.db_table)
+        key_column, period_column, count_column, previous_column = (
+            quote(name) for name in ("key", "period", "count", "previous")
+        )
+        # Postgres and SQLite 3.35+, the right hand sides see the old row
+        sql = (
+            f"INSERT INTO {table} "
+            f"({key_column}, {period_column}, {count_column}, "
+            f"{previous_column}) VALUES (%s, %s, 1, 0) "
+            f"ON CONFLICT ({key_column}) DO UPDATE SET "
+            f"{previous_column} = CASE {table}.{period_column} "
+            f"WHEN EXCLUDED.{period_column} THEN {table}.{previous_column} "
+            f"WHEN EXCLUDED.{period_column} - 1 THEN {table}.{count_column} "
+            f"ELSE 0 END, "
+            f"{count_column} = CASE {table}.{period_column} "
+            f"WHEN EXCLUDED.{period_column} THEN {table}.{count_column} + 1 "
+            f"ELSE 1 END, "
+            f"{period_column} = EXCLUDED.{period_column} "
+            f"RETURNING {previous_column}, {count_column}"
+        )
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [key, period])
+                return cursor.fetchone()
+        except OperationalError:
+            return None
+
+    def undo(self, key, period):
+        RateLimitCounter.objects.filter(
+            key=key, period=period, count__gt=0
+        ).update(count=F("count") - 1)
+
+    def clear(self):
+        RateLimitCounter.objects.all().delete()
+
+
+class CacheThrottleStore(BaseThrottleStore):
+    """Counters in a Django cache, one entry per key and period
+
+    Shared and atomic with a cache whose incr() is, like Redis or
+    Memcached. The default local-memory cache counts per process.
+    """
+
+    def __init__(self, alias="default"):
+        self.cache = caches[alias]
+
+    @staticmethod
+    def _key(key, period):
+        return f"{key}:{period}"
+
+    def hit(self, key, period, duration):
+        current_key = self._key(key, period)
+        # Kept through the next period, which weighs it in
+        timeout = duration * 2
+        if self.cache.add(current_key, 1, timeout):
+            current = 1
+        else:
+            try:
+                current = self.cache.incr(current_key)
+            except ValueError:
+                # Expired between add() and incr()
+                self.cache.set(current_key, 1, timeout)
+                current = 1
+        previous = self.cache.get(self._key(key, period - 1), 0)
+        return previous, current
+
+    def undo(self, key, period):
+        try:
+            self.cache.decr(self._key(key, period))
+        except ValueError:
+            pass
+
+    def clear(self):
+        self.cache.clear()
+
+
+@lru_cache(maxsize=None)
+def get_throttle_store():
+    path = getattr(
+        settings,
+        "PLANETARIUM_THROTTLE_STORE",
+        "planetarium.throttling.DatabaseThrottleStore",
+    )
+    return import_string(path)()
+
+
+@receiver(setting_changed)
+def reset_throttle_store(setting, **kwargs):
+    if setting == "PLANETARIUM_THROTTLE_STORE":
+        get_throttle_store.cache_clear()
+
+
+class SlidingWindowRateThrottle(throttling.SimpleRateThrottle):
+    """SimpleRateThrottle keeping two counters per key, not a history
+
+    Time is cut into periods of the rate's duration. The requests of the
+    last duration are estimated as the current period's count plus the
+    previous period's, weighted by the part of it that is still inside
+    the sliding window. Only allowed requests are counted.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        period, offset = divmod(self.timer(), self.duration)
+        self.period = int(period)
+        self.elapsed = offset / self.duration
+        store = get_throttle_store()
+        counts = store.hit(self.key, self.period, self.duration)
+        if counts is None:
+            return True
+        self.previous, self.current = counts
+        if self.previous * (1 - self.elapsed) + self.current <= (
+            self.num_requests
+        ):
+            return True
+
+        store.undo(self.key, self.period)
+        self.current -= 1
+        return self.throttle_failure()
+
+    def wait(self):
+        """Seconds until the estimate leaves room for one more request"""
+        room = self.num_requests - 1
+        if self.current <= room:
+            # Enough once the previous period weighs little enough
+            needed = 1 - (room - self.current) / self.previous
+            return max(needed - self.elapsed, 0) * self.duration
+        # The current period has to become the previous one first
+        needed = 1 - room / self.current
+        return (1 - self.elapsed + needed) * self.duration
+
+
+class AnonRateThrottle(
+    SlidingWindowRateThrottle, throttling.AnonRateThrottle
+):
+    pass
+
+
+class UserRateThrottle(
+    SlidingWindowRateThrottle, throttling.UserRateThrottle
+):
+    pass
+
+
+class ScopedRateThrottle(
+    SlidingWindowRateThrottle, throttling.ScopedRateThrottle
+):
+    """Rate of the view's throttle_scope, for views that opt in"""
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
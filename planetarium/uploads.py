@@ -0,0 +1,86 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+from planetarium.exceptions import UploadTooLarge
+
+CHUNK_SIZE = 64 * 1024
+
+
+def get_max_image_upload_size():
+    return getattr(
+        settings, "PLANETARIUM_MAX_IMAGE_UPLOAD_SIZE", 10 * 1024 * 1024
+    )
+
+
+def hash_file(file):
+    """Hex sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    if hasattr(file, "seek"):
+        file.seek(0)
+    for chunk in file.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return digest.hexdigest()
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploads to a temporary file, hashing and size-capping them
+
+    Memory use is one chunk per upload. The sha256 of the content is
+    left on the uploaded file as content_hash for ContentHashStorage.
+    """
+
+    chunk_size = CHUNK_SIZE
+
+    def __init__(self, *args, max_size=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_size = max_size or get_max_image_upload_size()
+
+    def handle_raw_input(self, input_data, meta, content_length, *args):
+        if content_length and content_length > self.max_size + CHUNK_SIZE:
+            # Leave room for the multipart framing around the file
+            raise UploadTooLarge(self.max_size)
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > self.max_size:
+            self.file.close()
+            raise UploadTooLarge(self.max_size)
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.content_hash = self.digest.hexdigest()
+        return file
+
+
+class ContentHashStorage(FileSystemStorage):
+    """Store files under their sha256, writing identical content once
+
+    Files may be shared by several rows, so callers must not delete
+    them when a row stops referencing one.
+    """
+
+    def save(self, name, content, max_length=None):
+        digest = getattr(content, "content_hash", None) or hash_file(content)
+        directory, filename = os.path.split(name)
+        _, extension = os.path.splitext(filename)
+        name = os.path.join(directory, digest[:2], digest + extension.lower())
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+def get_show_image_storage():
+    return ContentHashStorage()
@@ -1,12 +1,14 @@
 from django.urls import path, include
 from rest_framework import routers
 
+from planetarium import async_views
 from planetarium.views import (
     ShowThemeViewSet,
     PlanetariumDomeViewSet,
     AstronomyShowViewSet,
     ShowSessionViewSet,
     ReservationViewSet,
+    MetricsView,
 )
 
 router = routers.DefaultRouter()
@@ -16,6 +18,43 @@ router.register("astronomy_shows", AstronomyShowViewSet)
 router.register("show_sessions", ShowSessionViewSet)
 router.register("reservations", ReservationViewSet)
 
-urlpatterns = [path("", include(router.urls))]
+async_urlpatterns = [
+    path(
+        "show_theme/",
+        async_views.ShowThemeListView.as_view(),
+        name="async-showtheme-list",
+    ),
+    path(
+        "planetarium_domes/",
+        async_views.PlanetariumDomeListView.as_view(),
+        name="async-planetariumdome-list",
+    ),
+    path(
+        "astronomy_shows/",
+        async_views.AstronomyShowListView.as_view(),
+        name="async-astronomyshow-list",
+    ),
+    path(
+        "astronomy_shows/<int:pk>/",
+        async_views.AstronomyShowDetailView.as_view(),
+        name="async-astronomyshow-detail",
+    ),
+    path(
+        "show_sessions/",
+        async_views.ShowSessionListView.as_view(),
+        name="async-showsession-list",
+    ),
+    path(
+        "show_sessions/<int:pk>/",
+        async_views.ShowSessionDetailView.as_view(),
+        name="async-showsession-detail",
+    ),
+]
+
+urlpatterns = [
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    path("async/", include(async_urlpatterns)),
+    path("", include(router.urls)),
+]
 
 app_name = "planetarium"
@@ -1,23 +1,50 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from django.db.models import Count, F
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
+from planetarium.cache import CachedListMixin
+from planetarium.conditional import ConditionalGetMixin
+from planetarium.exceptions import SeatConflict
+from planetarium.fast_serializers import (
+    AstronomyShowFastListSerializer,
+    FastListMixin,
+    ShowSessionFastListSerializer,
+)
+from planetarium.holds import SeatsUnavailable, get_hold_store
+from planetarium.images import schedule_image_processing
+from planetarium.metrics import (
+    TimedSerializerMixin,
+    request_metrics,
+    timed_serializer,
+)
 from planetarium.models import (
     ShowTheme,
     PlanetariumDome,
     AstronomyShow,
-    ShowSession, Reservation,
+    ShowSession,
+    Reservation,
+    Ticket,
+)
+from planetarium.pagination import (
+    AstronomyShowPagination,
+    ReservationPagination,
+    ShowSessionPagination,
 )
 from planetarium.permissions import IsAdminOrIfAuthenticatedReadOnly
+from planetarium.renderers import PrometheusRenderer
+from planetarium.search import get_search_backend
+from planetarium.seat_map import SeatMap
 from planetarium.serializers import (
     ShowThemeSerializer,
     PlanetariumDomeSerializer,
@@ -25,15 +52,23 @@ from planetarium.serializers import (
     AstronomyShowListSerializer,
     AstronomyShowDetailSerializer,
     AstronomyShowImageSerializer,
+    AstronomyShowImageStatusSerializer,
     ShowSessionSerializer,
     ShowSessionListSerializer,
+    ShowSessionRecurrenceSerializer,
     ShowSessionDetailSerializer,
     ReservationSerializer,
     ReservationListSerializer,
+    SeatHoldSerializer,
+    CalendarDaySerializer,
 )
+from planetarium.uploads import HashingUploadHandler
+from planetarium.throttling import ScopedRateThrottle
 
 
 class ShowThemeViewSet(
+    TimedSerializerMixin,
+    ConditionalGetMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet
@@ -41,9 +76,13 @@ class ShowThemeViewSet(
     queryset = ShowTheme.objects.all()
     serializer_class = ShowThemeSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    claims_only_reads = True
+    conditional_models = (ShowTheme,)
 
 
 class PlanetariumDomeViewSet(
+    TimedSerializerMixin,
+    ConditionalGetMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -51,9 +90,15 @@ class PlanetariumDomeViewSet(
     queryset = PlanetariumDome.objects.all()
     serializer_class = PlanetariumDomeSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    claims_only_reads = True
+    conditional_models = (PlanetariumDome,)
 
 
 class AstronomyShowViewSet(
+    TimedSerializerMixin,
+    ConditionalGetMixin,
+    CachedListMixin,
+    FastListMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -61,7 +106,21 @@ class AstronomyShowViewSet(
 ):
     queryset = AstronomyShow.objects.all()
     serializer_class = AstronomyShowSerializer
+    pagination_class = AstronomyShowPagination
+    fast_list_serializer_class = AstronomyShowFastListSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    claims_only_reads = True
+    cache_models = (AstronomyShow, ShowTheme)
+    conditional_models = (AstronomyShow, ShowTheme)
+    cache_query_params = (
+        "title",
+        "themes",
+        "themes_match",
+        "search",
+        "cursor",
+        "page_size",
+    )
+    cache_list_params = ("themes",)
 
     @staticmethod
     def _params_to_ins(qs):
@@ -77,8 +136,12 @@ class AstronomyShowViewSet(
         """Retrieve the AstronomyShow with filters"""
         title = self.request.query_params.get("title")
         themes = self.request.query_params.get("themes")
+        search = self.request.query_params.get("search", "").strip()
 
-        queryset = self.queryset
+        queryset = self.queryset.all()
+
+        if search:
+            queryset = get_search_backend().search(queryset, search)
 
         if title:
             queryset = queryset.filter(title__icontains=title)
@@ -86,11 +149,17 @@ class AstronomyShowViewSet(
         if themes:
             try:
                 themes_ids = self._params_to_ins(themes)
-                queryset = queryset.filter(themes__id__in=themes_ids)
             except ValidationError as e:
                 raise ValidationError({"detail": str(e)})
 
-        return queryset.distinct()
+            themes_match = self.request.query_params.get("themes_match", "any")
+            if themes_match not in ("any", "all"):
+                raise ValidationError(
+                    {"themes_match": "Must be one of: any, all."}
+                )
+            queryset = queryset.with_themes(themes_ids, match=themes_match)
+
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -102,8 +171,18 @@ class AstronomyShowViewSet(
         if self.action == "upload_image":
             return AstronomyShowImageSerializer
 
+        if self.action == "image_status":
+            return AstronomyShowImageStatusSerializer
+
         return AstronomyShowSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            lambda: super(AstronomyShowViewSet, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
+
     @action(
         methods=["POST"],
         detail=True,
@@ -112,13 +191,30 @@ class AstronomyShowViewSet(
     )
     def upload_image(self, request, pk=None):
         """Endpoint for uploading image to specific movie"""
+        # Stream to disk with a size cap, the hash names the stored file
+        request.upload_handlers = [HashingUploadHandler(request)]
         astronomy_show = self.get_object()
         serializer = self.get_serializer(astronomy_show, data=request.data)
 
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        stale = [
+            astronomy_show.image_small.name,
+            astronomy_show.image_large.name,
+        ]
+        astronomy_show = serializer.save(
+            image_status=AstronomyShow.ImageStatus.PENDING,
+            image_small=None,
+            image_large=None,
+        )
+        schedule_image_processing(astronomy_show, stale=stale)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(methods=["GET"], detail=True, url_path="image-status")
+    def image_status(self, request, pk=None):
+        """Processing state and URLs of the image variants"""
+        serializer = self.get_serializer(self.get_object())
+        return Response(serializer.data)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -131,42 +227,96 @@ class AstronomyShowViewSet(
                 type={"type": "list", "items": {"type": "number"}},
                 description="Filter by theme ID (ex. ?themes=1,2,3)",
             ),
+            OpenApiParameter(
+                "themes_match",
+                type=OpenApiTypes.STR,
+                enum=["any", "all"],
+                description=(
+                    "Whether shows need any (default) or all of the themes "
+                    "(ex. ?themes=1,2&themes_match=all)"
+                ),
+            ),
+            OpenApiParameter(
+                "search",
+                type=OpenApiTypes.STR,
+                description=(
+                    "Ranked search over title and description "
+                    "(ex. ?search=dark matter)"
+                ),
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
 
-class ShowSessionViewSet(viewsets.ModelViewSet):
+class ShowSessionViewSet(
+    TimedSerializerMixin,
+    CachedListMixin,
+    FastListMixin,
+    viewsets.ModelViewSet,
+):
     queryset = (
         ShowSession.objects.all()
         .select_related("astronomy_show", "planetarium_dome")
-        .annotate(
-            tickets_available=(
-                F("planetarium_dome__rows")
-                * F("planetarium_dome__seats_in_row")
-                - Count("tickets")
-            )
-        )
+        .with_availability()
     )
     serializer_class = ShowSessionSerializer
+    pagination_class = ShowSessionPagination
+    fast_list_serializer_class = ShowSessionFastListSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    claims_only_reads = True
+    cache_models = (ShowSession, AstronomyShow, PlanetariumDome, Ticket)
+    cache_query_params = (
+        "date",
+        "date_from",
+        "date_to",
+        "astronomy_show",
+        "planetarium_dome",
+        "month",
+        "cursor",
+        "page_size",
+    )
+
+    def _date_param(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise ValidationError({name: "Date must be in YYYY-MM-DD format."})
+
+    def _id_param(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({name: "Must be an integer id."})
 
     def get_queryset(self):
-        date = self.request.query_params.get("date")
-        astronomy_show_id_str = self.request.query_params.get(
-            "astronomy_show"
-        )
+        date = self._date_param("date")
+        date_from = self._date_param("date_from")
+        date_to = self._date_param("date_to")
+        astronomy_show_id = self._id_param("astronomy_show")
+        planetarium_dome_id = self._id_param("planetarium_dome")
 
-        queryset = self.queryset
+        queryset = self.queryset.all()
 
         if date:
-            date = datetime.strptime(date, "%Y-%m-%d").date()
-            queryset = queryset.filter(show_time__date=date)
+            queryset = queryset.on_dates(date, date)
 
-        if astronomy_show_id_str:
+        if date_from or date_to:
+            queryset = queryset.on_dates(date_from, date_to)
+
+        if astronomy_show_id:
+            queryset = queryset.filter(astronomy_show_id=astronomy_show_id)
+
+        if planetarium_dome_id:
             queryset = queryset.filter(
-                astronomy_show__id=int(astronomy_show_id_str)
+                planetarium_dome_id=planetarium_dome_id
             )
 
         return queryset
@@ -178,8 +328,194 @@ class ShowSessionViewSet(viewsets.ModelViewSet):
         if self.action == "retrieve":
             return ShowSessionDetailSerializer
 
+        if self.action == "holds":
+            return SeatHoldSerializer
+
+        if self.action == "bulk":
+            return ShowSessionRecurrenceSerializer
+
         return ShowSessionSerializer
 
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    @action(methods=["POST"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        """Create the sessions of a weekly rule at once, or preview them"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        show_sessions = serializer.save()
+        dry_run = serializer.validated_data["dry_run"]
+        return Response(
+            {
+                "dry_run": dry_run,
+                "count": len(show_sessions),
+                "show_sessions": ShowSessionSerializer(
+                    show_sessions, many=True
+                ).data,
+            },
+            status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED,
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "encoding",
+                type=OpenApiTypes.STR,
+                enum=["bitmap", "rle"],
+                description=(
+                    "Encoding of taken seats: base64 bitmap (default) "
+                    "or run-length rows (ex. ?encoding=rle)"
+                ),
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    @action(methods=["GET"], detail=True, url_path="seats")
+    def seats(self, request, pk=None):
+        """Compact map of taken seats, supports If-None-Match"""
+        encoding = request.query_params.get("encoding", "bitmap")
+        if encoding not in ("bitmap", "rle"):
+            raise ValidationError(
+                {"encoding": "Encoding must be one of: bitmap, rle."}
+            )
+
+        show_session = get_object_or_404(
+            ShowSession.objects.select_related("planetarium_dome"), pk=pk
+        )
+        seat_map = SeatMap.for_show_session(show_session)
+        etag = seat_map.etag
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match and (
+            etag in parse_etags(if_none_match) or if_none_match == "*"
+        ):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+
+        return Response(seat_map.to_representation(encoding), headers=headers)
+
+    def _month_param(self):
+        value = self.request.query_params.get("month", "").strip()
+        try:
+            return datetime.strptime(value, "%Y-%m").date()
+        except ValueError:
+            raise ValidationError(
+                {"month": "Month must be in YYYY-MM format."}
+            )
+
+    @staticmethod
+    def _calendar_days(rows):
+        days = []
+        for row in rows:
+            if not days or days[-1]["date"] != row["day"]:
+                days.append(
+                    {
+                        "date": row["day"],
+                        "sessions": 0,
+                        "first_show_time": row["first_show_time"],
+                        "last_show_time": row["last_show_time"],
+                        "tickets_available": 0,
+                        "domes": [],
+                    }
+                )
+            day = days[-1]
+            day["sessions"] += row["sessions"]
+            day["tickets_available"] += row["tickets_available"]
+            day["first_show_time"] = min(
+                day["first_show_time"], row["first_show_time"]
+            )
+            day["last_show_time"] = max(
+                day["last_show_time"], row["last_show_time"]
+            )
+            day["domes"].append(row)
+        return days
+
+    def build_calendar(self):
+        first_day = self._month_param()
+        last_day = (first_day + timedelta(days=31)).replace(day=1) - (
+            timedelta(days=1)
+        )
+        astronomy_show_id = self._id_param("astronomy_show")
+        planetarium_dome_id = self._id_param("planetarium_dome")
+
+        queryset = ShowSession.objects.on_dates(first_day, last_day)
+        if astronomy_show_id:
+            queryset = queryset.filter(astronomy_show_id=astronomy_show_id)
+        if planetarium_dome_id:
+            queryset = queryset.filter(
+                planetarium_dome_id=planetarium_dome_id
+            )
+
+        days = self._calendar_days(queryset.calendar())
+        return Response(
+            {
+                "month": first_day.strftime("%Y-%m"),
+                "days": timed_serializer(
+                    CalendarDaySerializer(days, many=True)
+                ).data,
+            }
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "month",
+                type=OpenApiTypes.STR,
+                required=True,
+                description="Month to summarize (ex. ?month=2022-10)",
+            ),
+            OpenApiParameter(
+                "astronomy_show",
+                type=OpenApiTypes.INT,
+                description="Filter by astronomy_show id (ex. ?show=2)",
+            ),
+            OpenApiParameter(
+                "planetarium_dome",
+                type=OpenApiTypes.INT,
+                description=(
+                    "Filter by planetarium_dome id (ex. ?planetarium_dome=1)"
+                ),
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    @action(methods=["GET"], detail=False, url_path="calendar")
+    def calendar(self, request):
+        """Sessions and free seats of every day in a month, per dome"""
+        return self.cached_response("calendar", self.build_calendar)
+
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="holds",
+        permission_classes=[IsAuthenticated],
+    )
+    def holds(self, request, pk=None):
+        """Hold seats for a limited time before reserving them"""
+        show_session = get_object_or_404(
+            ShowSession.objects.select_related("planetarium_dome"), pk=pk
+        )
+        context = self.get_serializer_context()
+        context["show_session"] = show_session
+        serializer = self.get_serializer(data=request.data, context=context)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            hold = get_hold_store().place(
+                show_session.id,
+                serializer.validated_data["seats"],
+                request.user.id,
+            )
+        except SeatsUnavailable as error:
+            raise SeatConflict(
+                (show_session.id, row, seat) for row, seat in error.seats
+            )
+        return Response(
+            self.get_serializer(hold, context=context).data,
+            status=status.HTTP_201_CREATED,
+        )
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -187,6 +523,13 @@ class ShowSessionViewSet(viewsets.ModelViewSet):
                 type=OpenApiTypes.INT,
                 description="Filter by astronomy_show id (ex. ?show=2)",
             ),
+            OpenApiParameter(
+                "planetarium_dome",
+                type=OpenApiTypes.INT,
+                description=(
+                    "Filter by planetarium_dome id (ex. ?planetarium_dome=1)"
+                ),
+            ),
             OpenApiParameter(
                 "date",
                 type=OpenApiTypes.DATE,
@@ -195,32 +538,56 @@ class ShowSessionViewSet(viewsets.ModelViewSet):
                         "(ex. ?date=2022-10-23)"
                 ),
             ),
+            OpenApiParameter(
+                "date_from",
+                type=OpenApiTypes.DATE,
+                description=(
+                    "Sessions on or after this date "
+                    "(ex. ?date_from=2022-10-01)"
+                ),
+            ),
+            OpenApiParameter(
+                "date_to",
+                type=OpenApiTypes.DATE,
+                description=(
+                    "Sessions on or before this date "
+                    "(ex. ?date_to=2022-10-31)"
+                ),
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
 
-class ReservationPagination(PageNumberPagination):
-    page_size = 10
-    max_page_size = 100
-
-
 class ReservationViewSet(
+    TimedSerializerMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     GenericViewSet,
 ):
     queryset = Reservation.objects.prefetch_related(
-        "tickets__show_session__astronomy_show",
-        "tickets__show_session__planetarium_dome"
+        Prefetch("tickets", queryset=Ticket.objects.order_by("row", "seat")),
+        Prefetch(
+            "tickets__show_session",
+            queryset=ShowSession.objects.select_related(
+                "astronomy_show", "planetarium_dome"
+            ).with_availability(),
+        ),
     )
     serializer_class = ReservationSerializer
     pagination_class = ReservationPagination
     permission_classes = (IsAuthenticated,)
+    throttle_scope = "reservations"
 
     def get_queryset(self):
-        return Reservation.objects.filter(user=self.request.user)
+        return self.queryset.filter(user=self.request.user)
+
+    def get_throttles(self):
+        throttles = super().get_throttles()
+        if self.action == "create":
+            throttles.append(ScopedRateThrottle())
+        return throttles
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -230,3 +597,14 @@ class ReservationViewSet(
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+
+class MetricsView(APIView):
+    """Request histograms in the Prometheus text format, staff only"""
+
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (PrometheusRenderer,)
+
+    @extend_schema(exclude=True)
+    def get(self, request):
+        return Response(request_metrics.export())
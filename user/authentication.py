@@ -0,0 +1,186 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from planetarium.cache import bump_counter, get_counters
+
+
+def _version_key(user_id):
+    return f"user-version:{user_id}"
+
+
+def get_user_version(user_id):
+    """Current version of the user's row"""
+    return get_counters(caches["default"], _version_key(user_id))[0]
+
+
+def bump_user_version(user_id):
+    """Make every process drop its cached copy of the user"""
+    bump_counter(caches["default"], _version_key(user_id))
+
+
+class UserCache:
+    """Users by id with the version they were loaded at
+
+    The least recently used users are dropped past
+    PLANETARIUM_AUTH_USER_CACHE_SIZE. Entries also expire after
+    PLANETARIUM_AUTH_USER_CACHE_TTL seconds, which bounds how long a
+    change made in another process goes unseen when the default cache
+    holding the versions is per process. Every lookup gets its own copy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def get(self, user_id, version):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            expires_at, cached_version, user = entry
+            if expires_at <= now or cached_version != version:
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+        return copy.copy(user)
+
+    def set(self, user_id, version, user):
+        size = getattr(settings, "PLANETARIUM_AUTH_USER_CACHE_SIZE", 10_000)
+        ttl = getattr(settings, "PLANETARIUM_AUTH_USER_CACHE_TTL", 60)
+        with self._lock:
+            self._users[user_id] = (
+                time.monotonic() + ttl,
+                version,
+                copy.copy(user),
+            )
+            self._users.move_to_end(user_id)
+            while len(self._users) > size:
+                self._users.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication resolving users through user_cache
+
+    With PLANETARIUM_JWT_CLAIMS_ONLY_READS, safe requests to views with
+    claims_only_reads get a TokenUser built from the token alone. It has
+    the id but no row, so it is not checked for is_active either.
+
+    Saves and deletes of a user invalidate its cached copy once they
+    commit. QuerySet.update() sends no signal, code that changes
+    is_active, is_staff or password that way has to call
+    bump_user_version() for each user, or the old row keeps
+    authenticating until PLANETARIUM_AUTH_USER_CACHE_TTL runs out.
+    """
+
+    def authenticate(self, request):
+        self.claims_only = self.use_claims_only(request)
+        return super().authenticate(request)
+
+    @staticmethod
+    def use_claims_only(request):
+        view = (getattr(request, "parser_context", None) or {}).get("view")
+        return (
+            getattr(settings, "PLANETARIUM_JWT_CLAIMS_ONLY_READS", False)
+            and request.method in SAFE_METHODS
+            and getattr(view, "claims_only_reads", False)
+        )
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        if self.claims_only:
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+
+        version = get_user_version(user_id)
+        user = user_cache.get(user_id, version)
+        if user is not None:
+            self.check_user(user, validated_token)
+            return user
+
+        user = super().get_user(validated_token)
+        user_cache.set(user_id, version, user)
+        return user
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+    @staticmethod
+    def check_user(user, validated_token):
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."),
+                code="password_changed",
+            )
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """CachedJWTAuthentication for async views, misses load with aget()"""
+
+    async def aauthenticate(self, request):
+        self.claims_only = self.use_claims_only(request)
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        if self.claims_only:
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+
+        version = get_user_version(user_id)
+        user = user_cache.get(user_id, version)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(
+                    _("User not found"), code="user_not_found"
+                )
+            self.check_user(user, validated_token)
+            user_cache.set(user_id, version, user)
+            return user
+
+        self.check_user(user, validated_token)
+        return user
@@ -0,0 +1,7 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Bearer JWT scheme, the same one JWTAuthentication is documented with"""
+
+    target_class = "user.authentication.CachedJWTAuthentication"
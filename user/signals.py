@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.authentication import bump_user_version
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    # After commit, a miss before it would otherwise cache the old row
+    # under the new version. The pk is gone once a delete finishes.
+    user_id = instance.pk
+    transaction.on_commit(lambda: bump_user_version(user_id))
@@ -0,0 +1,144 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user.authentication import (
+    AsyncJWTAuthentication,
+    CachedJWTAuthentication,
+    bump_user_version,
+    user_cache,
+)
+
+MANAGE_URL = reverse("user:manage")
+
+
+class CatalogView:
+    claims_only_reads = True
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        user_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.factory = RequestFactory()
+
+    def request(self, user=None, method="get", view=None):
+        token = AccessToken.for_user(user or self.user)
+        return Request(
+            getattr(self.factory, method)(
+                "/", HTTP_AUTHORIZATION=f"Bearer {token}"
+            ),
+            parser_context={"view": view},
+        )
+
+    def authenticate(self, **kwargs):
+        user, _ = CachedJWTAuthentication().authenticate(
+            self.request(**kwargs)
+        )
+        return user
+
+    def test_user_is_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user, self.user)
+        self.assertIsNot(user, self.authenticate())
+
+    def test_saving_user_invalidates(self):
+        self.authenticate()
+
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save()
+            # The save may still roll back
+            self.assertTrue(self.authenticate().is_active)
+
+        for callback in callbacks:
+            callback()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_queryset_update_needs_explicit_invalidation(self):
+        self.authenticate()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            get_user_model().objects.filter(pk=self.user.pk).update(
+                is_active=False
+            )
+        # update() sends no signal, the cached copy is still active
+        self.assertTrue(self.authenticate().is_active)
+
+        bump_user_version(self.user.pk)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_manage_user_update_invalidates(self):
+        self.assertFalse(self.authenticate().first_name)
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = client.patch(MANAGE_URL, {"email": "new@test.com"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.authenticate().email, "new@test.com")
+
+    @override_settings(PLANETARIUM_AUTH_USER_CACHE_SIZE=2)
+    def test_least_recently_used_users_are_dropped(self):
+        users = [self.user] + [
+            get_user_model().objects.create_user(f"{index}@test.com", "pass")
+            for index in range(2)
+        ]
+        for user in users:
+            self.authenticate(user=user)
+
+        with self.assertNumQueries(0):
+            self.authenticate(user=users[2])
+        with self.assertNumQueries(1):
+            self.authenticate(user=users[0])
+
+    @override_settings(PLANETARIUM_AUTH_USER_CACHE_TTL=0)
+    def test_entries_expire(self):
+        self.authenticate()
+
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    @override_settings(PLANETARIUM_JWT_CLAIMS_ONLY_READS=True)
+    def test_claims_only_reads(self):
+        with self.assertNumQueries(0):
+            user = self.authenticate(view=CatalogView())
+        self.assertIsInstance(user, TokenUser)
+        self.assertEqual(user.id, self.user.id)
+
+        for kwargs in ({"method": "post", "view": CatalogView()}, {}):
+            with self.subTest(**kwargs):
+                user = self.authenticate(**kwargs)
+                self.assertIsInstance(user, get_user_model())
+
+    async def test_async_authentication_uses_cache(self):
+        request = self.request()
+        user, _ = await AsyncJWTAuthentication().aauthenticate(request)
+
+        with mock.patch.object(
+            get_user_model().objects, "aget"
+        ) as aget:
+            cached, _ = await AsyncJWTAuthentication().aauthenticate(request)
+        aget.assert_not_called()
+        self.assertEqual(cached, user)